@@ -0,0 +1,83 @@
+"""
+Batch scaling benchmark for palamedes. Times iter_hgvs_variants_batch over a synthetic library of random protein
+pairs with the thread and process executors, for an increasing number of workers, and reports the speedup over a
+single worker. On a GIL build, thread scaling reflects how much of the work is spent inside the C aligner, on a
+free-threaded build it should track the process pool without the start up and pickling costs. Run from the
+repository root:
+
+    python -m benchmarks.batch_scaling --pairs 2000 --length 300
+"""
+
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.config import EXECUTOR_TYPE_PROCESS, EXECUTOR_TYPE_THREAD
+from palamedes.models import SequencePair
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def make_pairs(count: int, length: int, seed: int = 0) -> list[SequencePair]:
+    """Generate a reproducible library of random proteins each with a handful of point mutations and indels"""
+    rng = random.Random(seed)
+    pairs = []
+    for idx in range(count):
+        reference = "".join(rng.choices(AMINO_ACIDS, k=length))
+        alternate = list(reference)
+        for _ in range(rng.randint(1, 5)):
+            position = rng.randrange(len(alternate))
+            if rng.random() < 0.6:
+                alternate[position] = rng.choice(AMINO_ACIDS)
+            elif rng.random() < 0.5:
+                alternate.insert(position, rng.choice(AMINO_ACIDS))
+            else:
+                del alternate[position]
+
+        pairs.append(SequencePair(str(idx), reference, "".join(alternate)))
+
+    return pairs
+
+
+def worker_counts(max_workers: int) -> list[int]:
+    """Powers of 2 up to max_workers, always including max_workers itself"""
+    counts = [1]
+    while counts[-1] * 2 < max_workers:
+        counts.append(counts[-1] * 2)
+
+    return counts if counts[-1] == max_workers else counts + [max_workers]
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compare thread and process scaling of the palamedes batch API")
+    parser.add_argument("--pairs", help="Number of pairs in the library", type=int, default=500)
+    parser.add_argument("--length", help="Length of the reference sequences", type=int, default=200)
+    parser.add_argument("--max-workers", help="Largest worker count to try", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", help="Pairs per chunk sent to the executor", type=int, default=16)
+    args = parser.parse_args()
+
+    pairs = make_pairs(args.pairs, args.length)
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled else 'disabled'}, {len(pairs)} pairs")
+    print(f"{'executor':<10}{'workers':>8}{'seconds':>10}{'pairs/s':>10}{'speedup':>9}")
+
+    for executor_type in (EXECUTOR_TYPE_THREAD, EXECUTOR_TYPE_PROCESS):
+        single_worker_seconds = None
+        for workers in worker_counts(args.max_workers):
+            start = time.perf_counter()
+            generate_hgvs_variants_batch(
+                pairs, executor_type=executor_type, max_workers=workers, chunk_size=args.chunk_size
+            )
+            seconds = time.perf_counter() - start
+            single_worker_seconds = single_worker_seconds or seconds
+            print(
+                f"{executor_type:<10}{workers:>8}{seconds:>10.2f}{len(pairs) / seconds:>10.0f}"
+                f"{single_worker_seconds / seconds:>8.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
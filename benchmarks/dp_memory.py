@@ -0,0 +1,64 @@
+"""
+Alignment memory benchmark for palamedes, the measurement behind DP_BYTES_PER_CELL in palamedes.config. Aligns random
+protein pairs of growing length with generate_variant_records, each in a fresh worker process after a warm up pair,
+and reports how much the peak address space (VmPeak) and peak resident memory (VmHWM) of the worker grew, per
+dynamic programming cell, next to the estimate the planner uses. Linux only, as it reads /proc/self/status. Run from
+the repository root:
+
+    python -m benchmarks.dp_memory --lengths 1000 2000 4000 8000
+"""
+
+import random
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+
+from palamedes import generate_variant_records
+from palamedes.config import DP_BYTES_PER_CELL
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def peak_memory_bytes() -> tuple[int, int]:
+    """Peak address space and peak resident memory of this process"""
+    peaks = {}
+    with open("/proc/self/status") as handle:
+        for line in handle:
+            if line.startswith(("VmPeak:", "VmHWM:")):
+                key, value, _ = line.split()
+                peaks[key] = int(value) * 1024
+
+    return peaks["VmPeak:"], peaks["VmHWM:"]
+
+
+def measure(length: int, seed: int) -> tuple[int, int]:
+    """Worker task, align one random pair and return how much the peaks grew"""
+    generate_variant_records("PFKISIHL", "PFKISIHA")
+    rng = random.Random(seed)
+    reference = "".join(rng.choices(AMINO_ACIDS, k=length))
+    alternate = "".join(rng.choices(AMINO_ACIDS, k=length))
+    address_space_before, resident_before = peak_memory_bytes()
+    generate_variant_records(reference, alternate)
+    address_space_after, resident_after = peak_memory_bytes()
+    return address_space_after - address_space_before, resident_after - resident_before
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Measure the peak memory of global alignments per dynamic programming cell")
+    parser.add_argument("--lengths", help="Lengths of the pairs", type=int, nargs="+", default=[1000, 2000, 4000, 8000])
+    args = parser.parse_args()
+
+    print(f"{'length':<8}{'cells':>14}{'VmPeak B/cell':>16}{'VmHWM B/cell':>16}{'estimate MiB':>14}{'VmHWM MiB':>12}")
+    for length in args.lengths:
+        # a fresh process per length, so the peaks of earlier alignments do not hide this one
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            address_space, resident = executor.submit(measure, length, length).result()
+
+        cells = (length + 1) ** 2
+        print(
+            f"{length:<8}{cells:>14}{address_space / cells:>16.2f}{resident / cells:>16.2f}"
+            f"{cells * DP_BYTES_PER_CELL / 2**20:>14.1f}{resident / 2**20:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
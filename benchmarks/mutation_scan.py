@@ -0,0 +1,47 @@
+"""
+Mutational scanning benchmark for palamedes. Times iter_mutation_scan generating a site saturation library (every
+substitution, plus single residue deletions and glycine insertions) of a random protein, against aligning a sample of
+the same designs with generate_variant_records, extrapolated to the whole library. Run from the repository root:
+
+    python -m benchmarks.mutation_scan --length 500 --sample 500
+"""
+
+import random
+import time
+from argparse import ArgumentParser
+
+from palamedes import generate_variant_records
+from palamedes.config import STANDARD_AMINO_ACIDS
+from palamedes.models import MutationScanSpec
+from palamedes.scan import check_mutation_scan, iter_mutation_scan
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compare alignment free mutational scanning with aligning every design")
+    parser.add_argument("--length", help="Length of the reference protein", type=int, default=300)
+    parser.add_argument("--sample", help="Number of designs aligned", type=int, default=200)
+    args = parser.parse_args()
+
+    reference = "".join(random.Random(0).choices(STANDARD_AMINO_ACIDS, k=args.length))
+    spec = MutationScanSpec(deletion_lengths=(1,), insertions=("G",))
+
+    start = time.perf_counter()
+    library = list(iter_mutation_scan(reference, spec))
+    scan_seconds = time.perf_counter() - start
+
+    sample = random.Random(1).sample(library, min(args.sample, len(library)))
+    start = time.perf_counter()
+    for scan_variant in sample:
+        generate_variant_records(reference, scan_variant.alternate)
+    align_seconds = (time.perf_counter() - start) * len(library) / len(sample)
+
+    print(f"{len(library)} designs of a {args.length} residue reference")
+    print(f"{'method':<12}{'seconds':>10}")
+    print(f"{'scan':<12}{scan_seconds:>10.2f}")
+    print(f"{'align':<12}{align_seconds:>10.2f}  (extrapolated from {len(sample)} designs)")
+
+    assert not check_mutation_scan(reference, sample, sample_size=None), "designs must match the aligned variants"
+
+
+if __name__ == "__main__":
+    main()
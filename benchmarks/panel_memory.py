@@ -0,0 +1,91 @@
+"""
+Reference panel memory benchmark for palamedes. Sends a panel of random protein references to every worker of a
+process pool, either as plain SeqRecords (pickled into each worker) or as SeqRecords from a shared memory
+ReferencePanel, has each worker align a short alternate against every reference, and reports how much private memory
+each worker gained. With the panel the sequences live once in shared memory, so the per-worker figure should stay
+flat as references are added. Linux only, as it reads /proc/self/smaps_rollup. Run from the repository root:
+
+    python -m benchmarks.panel_memory --references 2000 --length 5000 --workers 4
+"""
+
+import random
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from Bio.SeqRecord import SeqRecord
+
+from palamedes.align import generate_seq_record, make_aligner
+from palamedes.align import get_reversed_sequence
+from palamedes.panel import ReferencePanel
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+# keeps the references received by a worker alive while its memory is measured, and its memory before receiving them
+_WORKER_REFERENCES: list[Any] = []
+_WORKER_BASELINE: list[int] = []
+
+
+def private_memory_bytes() -> int:
+    """Memory only mapped by this process, the memory that grows with every worker"""
+    total = 0
+    with open("/proc/self/smaps_rollup") as handle:
+        for line in handle:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1]) * 1024
+
+    return total
+
+
+def record_baseline() -> None:
+    """Worker initializer, runs before any references are unpickled in the worker"""
+    make_aligner()
+    _WORKER_BASELINE.append(private_memory_bytes())
+
+
+def align_references(references: list[SeqRecord], barrier_seconds: float) -> int:
+    """Worker task, align against every reference and return the private memory gained since the worker started"""
+    _WORKER_REFERENCES[:] = references
+    aligner = make_aligner()
+    for seq_record in references:
+        aligner.score(get_reversed_sequence(seq_record), b"PFKISIHL")
+
+    gained = private_memory_bytes() - _WORKER_BASELINE[0]
+    # keep the worker busy so every task lands on a different worker
+    time.sleep(barrier_seconds)
+    return gained
+
+
+def run(references: list[SeqRecord], workers: int) -> list[int]:
+    with ProcessPoolExecutor(max_workers=workers, initializer=record_baseline) as executor:
+        futures = [executor.submit(align_references, references, 1.0) for _ in range(workers)]
+        return [future.result() for future in futures]
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compare per-worker memory of plain and shared memory references")
+    parser.add_argument("--references", help="Number of references in the panel", type=int, default=1000)
+    parser.add_argument("--length", help="Length of the references", type=int, default=2000)
+    parser.add_argument("--workers", help="Number of worker processes", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    references = [
+        generate_seq_record("".join(rng.choices(AMINO_ACIDS, k=args.length)), f"reference-{idx}")
+        for idx in range(args.references)
+    ]
+    print(f"{args.references} references x {args.length} residues, {args.workers} workers")
+    print(f"{'references':<12}{'MiB/worker':>12}")
+
+    plain = run(references, args.workers)
+    print(f"{'plain':<12}{sum(plain) / len(plain) / 2**20:>12.1f}")
+
+    with ReferencePanel(references) as panel:
+        shared = run(list(panel), args.workers)
+
+    print(f"{'panel':<12}{sum(shared) / len(shared) / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
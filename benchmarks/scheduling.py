@@ -0,0 +1,53 @@
+"""
+Scheduling benchmark for palamedes. Times iter_hgvs_variants_batch over a library mixing many short peptides with a
+few long proteins, with fixed size chunks and with cost based scheduling (schedule_by_cost=True). With fixed chunks a
+chunk holding long proteins can start last and leave the other workers idle, cost based scheduling dispatches long
+pairs on their own and first, so the wall time should approach the total work divided by the workers. Run from the
+repository root:
+
+    python -m benchmarks.scheduling --peptides 5000 --proteins 8 --protein-length 3000 --workers 4
+"""
+
+import os
+import time
+from argparse import ArgumentParser
+
+from benchmarks.batch_scaling import make_pairs
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.config import EXECUTOR_TYPE_PROCESS
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compare fixed size chunks with cost based scheduling on a mixed library")
+    parser.add_argument("--peptides", help="Number of short pairs", type=int, default=4000)
+    parser.add_argument("--peptide-length", help="Length of the short references", type=int, default=10)
+    parser.add_argument("--proteins", help="Number of long pairs", type=int, default=8)
+    parser.add_argument("--protein-length", help="Length of the long references", type=int, default=2000)
+    parser.add_argument("--workers", help="Number of worker processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", help="Pairs per chunk with fixed size chunks", type=int, default=16)
+    args = parser.parse_args()
+
+    # the long proteins at the end of the input is the worst case for fixed size chunks
+    pairs = make_pairs(args.peptides, args.peptide_length) + make_pairs(args.proteins, args.protein_length, seed=1)
+    print(
+        f"{args.peptides} x {args.peptide_length} and {args.proteins} x {args.protein_length}, {args.workers} workers"
+    )
+    print(f"{'scheduling':<12}{'seconds':>10}")
+
+    results = {}
+    for schedule_by_cost in (False, True):
+        start = time.perf_counter()
+        results[schedule_by_cost] = generate_hgvs_variants_batch(
+            pairs,
+            executor_type=EXECUTOR_TYPE_PROCESS,
+            max_workers=args.workers,
+            chunk_size=args.chunk_size,
+            schedule_by_cost=schedule_by_cost,
+        )
+        print(f"{'cost' if schedule_by_cost else 'fixed':<12}{time.perf_counter() - start:>10.2f}")
+
+    assert results[False] == results[True], "scheduling must not change the results"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Startup benchmark for palamedes. Measures the wall clock time of short lived interpreter processes that only import
+the package or ask the CLI for its version, relative to a bare interpreter start, and exits non-zero if the overhead
+is above the given budget. Run from the repository root:
+
+    python -m benchmarks.startup --repeat 20 --max-overhead-ms 50
+"""
+
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from statistics import median
+
+COMMANDS = {
+    "baseline": [sys.executable, "-c", "pass"],
+    "import palamedes": [sys.executable, "-c", "import palamedes"],
+    "palamedes --version": [sys.executable, "-m", "palamedes", "--version"],
+}
+
+
+def time_command(command: list[str], repeat: int) -> float:
+    """Run the command repeat times, returning the median wall clock time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return median(timings)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Measure palamedes import and CLI startup time")
+    parser.add_argument("--repeat", help="Number of runs per command", type=int, default=10)
+    parser.add_argument(
+        "--max-overhead-ms",
+        help="Fail if any command is slower than the bare interpreter by more than this",
+        type=float,
+        default=None,
+    )
+    args = parser.parse_args()
+
+    results = {name: time_command(command, args.repeat) for name, command in COMMANDS.items()}
+    baseline = results["baseline"]
+
+    failed = False
+    for name, elapsed_ms in results.items():
+        overhead_ms = elapsed_ms - baseline
+        print(f"{name:<24} {elapsed_ms:8.1f} ms  (+{overhead_ms:.1f} ms)")
+        if args.max_overhead_ms is not None and overhead_ms > args.max_overhead_ms:
+            failed = True
+
+    if failed:
+        sys.exit(f"Startup overhead exceeded budget of {args.max_overhead_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
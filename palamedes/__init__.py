@@ -1,23 +1,53 @@
-from Bio.Align import PairwiseAligner, Alignment
-from Bio.SeqRecord import SeqRecord
-from hgvs.sequencevariant import SequenceVariant
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterator
 
-from palamedes.align import generate_seq_record, generate_variant_blocks, reverse_seq_record
-from palamedes.hgvs.utils import categorize_variant_block
-from palamedes.hgvs.builders import BUILDER_CONFIG
 from palamedes.config import (
-    DEFAULT_EXTEND_GAP_SCORE,
-    DEFAULT_MATCH_SCORE,
-    DEFAULT_MISMATCH_SCORE,
-    DEFAULT_OPEN_GAP_SCORE,
     GLOBAL_ALIGN_MODE,
     MOLECULE_TYPE_PROTEIN,
-    ALT_SEQUENCE_ID,
-    REF_SEQUENCE_ID,
 )
 
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner, Alignment
+    from Bio.SeqRecord import SeqRecord
+    from hgvs.sequencevariant import SequenceVariant
+
+    from palamedes.cache import ResultCache
+    from palamedes.models import VariantBlock, VariantRecord
+
 __version__ = "0.0.9"
 
+# Biopython (and numpy through it) and hgvs dominate the import time of this package, so nothing in here imports
+# them at module load. Each public function imports what it needs on first use, and the names below, which used to be
+# imported eagerly into this namespace, are resolved on first attribute access instead (PEP 562).
+_LAZY_ATTRIBUTES = {
+    "DEFAULT_MATCH_SCORE": "palamedes.config",
+    "DEFAULT_MISMATCH_SCORE": "palamedes.config",
+    "DEFAULT_OPEN_GAP_SCORE": "palamedes.config",
+    "DEFAULT_EXTEND_GAP_SCORE": "palamedes.config",
+    "REF_SEQUENCE_ID": "palamedes.config",
+    "ALT_SEQUENCE_ID": "palamedes.config",
+    "generate_seq_record": "palamedes.align",
+    "generate_variant_blocks": "palamedes.align",
+    "reverse_seq_record": "palamedes.align",
+    "categorize_variant_block": "palamedes.hgvs.utils",
+    "BUILDER_CONFIG": "palamedes.hgvs.builders",
+    "agenerate_hgvs_variants": "palamedes.aio",
+    "aiter_hgvs_variants": "palamedes.aio",
+    "generate_hgvs_variants_batch": "palamedes.batch",
+    "iter_hgvs_variants_batch": "palamedes.batch",
+    "iter_collapsed_hgvs_variants_batch": "palamedes.batch",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        from importlib import import_module
+
+        return getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def generate_hgvs_variants_from_alignment(
     alignment: Alignment, use_non_standard_substitution_rules: bool = False, molecule_type: str = MOLECULE_TYPE_PROTEIN
@@ -46,21 +76,127 @@ def generate_hgvs_variants_from_alignment(
             SequenceVariant(ac=Jelleine-I, type=p, posedit=Leu8del, gene=None)
         ]
     """
+    return [
+        record.to_hgvs()
+        for record in generate_variant_records_from_alignment(
+            alignment, use_non_standard_substitution_rules, molecule_type
+        )
+    ]
+
+
+def generate_variant_records_from_alignment(
+    alignment: Alignment, use_non_standard_substitution_rules: bool = False, molecule_type: str = MOLECULE_TYPE_PROTEIN
+) -> list[VariantRecord]:
+    """
+    Compact counterpart of `generate_hgvs_variants_from_alignment`, returning a `palamedes.models.VariantRecord` per
+    variant instead of the full `SequenceVariant`. Records are small flat tuples which are cheap to hold in bulk and to
+    send between processes, `record.to_hgvs()` builds the `SequenceVariant` when it is needed.
+    """
+    from palamedes.align import generate_alignment_variant_block_table, generate_variant_blocks
+    from palamedes.config import HGVS_VARIANT_TYPES, VARIANT_BLOCK_TABLE_MIN_COLUMNS
+    from palamedes.hgvs.builders import BUILDER_CONFIG
+    from palamedes.hgvs.utils import categorize_variant_block, categorize_variant_block_table
+
     if molecule_type not in BUILDER_CONFIG:
         raise NotImplementedError(f"No HGVS builder is defined for molecule_type: {molecule_type}!")
 
+    builder = BUILDER_CONFIG[molecule_type](alignment)
+    if alignment.length >= VARIANT_BLOCK_TABLE_MIN_COLUMNS:
+        table = generate_alignment_variant_block_table(alignment, use_non_standard_substitution_rules)
+        categories = categorize_variant_block_table(table, [alignment]).tolist()
+        return builder.build_many(list(table), [HGVS_VARIANT_TYPES[code] for code in categories])
+
     variant_blocks = generate_variant_blocks(
         alignment,
         split_consecutive_mismatches=use_non_standard_substitution_rules,
     )
+    return builder.build_many(
+        variant_blocks,
+        [categorize_variant_block(variant_block, alignment) for variant_block in variant_blocks],
+    )
+
+
+def iter_variant_records_from_alignment(
+    alignment: Alignment, use_non_standard_substitution_rules: bool = False, molecule_type: str = MOLECULE_TYPE_PROTEIN
+) -> Iterator[tuple[VariantBlock, str, VariantRecord]]:
+    """
+    Compact counterpart of `iter_hgvs_variants_from_alignment`, yielding (VariantBlock, hgvs type, VariantRecord)
+    triples instead, see `generate_variant_records_from_alignment`.
+    """
+    from palamedes.align import iter_variant_blocks
+    from palamedes.hgvs.builders import BUILDER_CONFIG
+    from palamedes.hgvs.utils import categorize_variant_block
+
+    if molecule_type not in BUILDER_CONFIG:
+        raise NotImplementedError(f"No HGVS builder is defined for molecule_type: {molecule_type}!")
+
     builder = BUILDER_CONFIG[molecule_type](alignment)
-    return [
-        builder.build(
-            variant_block,
-            categorize_variant_block(variant_block, alignment),
+
+    def iter_records() -> Iterator[tuple[VariantBlock, str, VariantRecord]]:
+        for variant_block in iter_variant_blocks(alignment, use_non_standard_substitution_rules):
+            hgvs_type = categorize_variant_block(variant_block, alignment)
+            yield variant_block, hgvs_type, builder.build_record(variant_block, hgvs_type)
+
+    return iter_records()
+
+
+def iter_hgvs_variants_from_alignment(
+    alignment: Alignment, use_non_standard_substitution_rules: bool = False, molecule_type: str = MOLECULE_TYPE_PROTEIN
+) -> Iterator[tuple[VariantBlock, str, SequenceVariant]]:
+    """
+    Generator version of `generate_hgvs_variants_from_alignment`, yielding a (VariantBlock, hgvs type,
+    SequenceVariant) triple for each variant, as soon as the alignment walk reaches the end of it. Only the current run
+    of non-matching columns is held in memory (see `palamedes.align.iter_variant_blocks`), nothing proportional to the
+    alignment length is built, and the caller can stop at any point without paying for the rest of the alignment.
+
+    .. code-block:: python
+
+        >>> from itertools import islice
+        >>> from palamedes import generate_alignment, iter_hgvs_variants_from_alignment
+        >>> alignment = generate_alignment(ref, alt)
+        >>> first_variants = [variant for _, _, variant in islice(iter_hgvs_variants_from_alignment(alignment), 10)]
+    """
+    return (
+        (variant_block, hgvs_type, record.to_hgvs())
+        for variant_block, hgvs_type, record in iter_variant_records_from_alignment(
+            alignment, use_non_standard_substitution_rules, molecule_type
         )
-        for variant_block in variant_blocks
-    ]
+    )
+
+
+def iter_hgvs_variants(
+    reference_sequence: str | SeqRecord,
+    alternate_sequence: str | SeqRecord,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+) -> Iterator[tuple[VariantBlock, str, SequenceVariant]]:
+    """
+    Generator version of `generate_hgvs_variants`, aligning the sequences and yielding a (VariantBlock, hgvs type,
+    SequenceVariant) triple per variant as the alignment is walked, see `iter_hgvs_variants_from_alignment`. Useful
+    to stop early, like after the first few variants or at the first large deletion-insertion:
+
+    .. code-block:: python
+
+        >>> from palamedes import iter_hgvs_variants
+        >>> for variant_block, hgvs_type, variant in iter_hgvs_variants("PFKISIHL", "TPFKISIH"):
+        ...     if hgvs_type == "deletion_insertion" and len(variant_block.alignment_block.bases) > 10:
+        ...         break
+        ...     print(variant.format())
+        ref:p.Pro1extThr-1
+        ref:p.Leu8del
+    """
+    from palamedes.align import generate_seq_records
+    from palamedes.hgvs.builders import BUILDER_CONFIG
+
+    if molecule_type not in BUILDER_CONFIG:
+        raise NotImplementedError(
+            f"Type {molecule_type} unsupported or unrecognized! Current supported types: {','.join(BUILDER_CONFIG.keys())}"
+        )
+
+    ref_seq_record, alt_seq_record = generate_seq_records(reference_sequence, alternate_sequence, molecule_type)
+    alignment = generate_alignment(ref_seq_record, alt_seq_record, molecule_type=molecule_type, aligner=aligner)
+    return iter_hgvs_variants_from_alignment(alignment, use_non_standard_substitution_rules, molecule_type)
 
 
 def generate_alignment(
@@ -118,17 +254,16 @@ def generate_alignment(
         >>> generate_alignment(ref, alt)
         <Alignment object (2 rows x 9 columns) at ...>
     """
+    import numpy as np
+    from Bio.Align import Alignment
+
+    from palamedes.align import get_reversed_sequence, make_aligner
+
     if aligner is not None:
         if aligner.mode != GLOBAL_ALIGN_MODE:
             raise ValueError(f"Custom PairwiseAligner must be set to global mode, got: {aligner.mode}")
     else:
-        aligner = PairwiseAligner(
-            mode=GLOBAL_ALIGN_MODE,
-            match_score=DEFAULT_MATCH_SCORE,
-            mismatch_score=DEFAULT_MISMATCH_SCORE,
-            open_gap_score=DEFAULT_OPEN_GAP_SCORE,
-            extend_gap_score=DEFAULT_EXTEND_GAP_SCORE,
-        )
+        aligner = make_aligner()
 
     if (ref_molecule_type := reference_seq_record.annotations.get("molecule_type")) != molecule_type:
         raise ValueError(
@@ -142,19 +277,22 @@ def generate_alignment(
             f"got: {alt_molecule_type}, expected: {molecule_type}!"
         )
 
-    # reverse the sequences and then align the reversed, keeping the first best alignment
-    reversed_ref_seq_record = reverse_seq_record(reference_seq_record)
-    reversed_alt_seq_record = reverse_seq_record(alternate_seq_record)
-    reversed_alignments = aligner.align(reversed_ref_seq_record, reversed_alt_seq_record)
+    # reverse the sequences and then align the reversed, keeping the first best alignment, references from a
+    # ReferencePanel are already stored reversed in shared memory and are aligned without copying, and those from an
+    # IndexedFasta are reversed once and kept by the file
+    reversed_alignments = aligner.align(
+        get_reversed_sequence(reference_seq_record), get_reversed_sequence(alternate_seq_record)
+    )
     reversed_alignment = reversed_alignments[0]
 
     # undo the reversal, to recover the "last" highest scoring alignment for the forward
-    # which should correspond to the 3' end most alignment and follow HGSV spec
-    # note 'infer_coordinates' will soon be deprecated, update to 'parse_printed_alignment' once its live
-    forward_coordinates = Alignment.infer_coordinates(
+    # which should correspond to the 3' end most alignment and follow HGSV spec, a column at position p of a
+    # reversed sequence of length L is at position L - p in the forward one, read in the opposite direction
+    reversed_coordinates = reversed_alignment.coordinates
+    forward_coordinates = np.array(
         [
-            reversed_alignment[0][::-1],
-            reversed_alignment[1][::-1],
+            len(reference_seq_record) - reversed_coordinates[0][::-1],
+            len(alternate_seq_record) - reversed_coordinates[1][::-1],
         ]
     )
     forward_alignment = Alignment(
@@ -174,6 +312,7 @@ def generate_hgvs_variants(
     molecule_type: str = MOLECULE_TYPE_PROTEIN,
     aligner: PairwiseAligner | None = None,
     use_non_standard_substitution_rules: bool = False,
+    cache: ResultCache | None = None,
 ) -> list[SequenceVariant]:
     """
     Given the reference and alternate sequences, as either strings or `Bio.SeqRecord.SeqRecord` objects, compute the
@@ -199,6 +338,14 @@ def generate_hgvs_variants(
     and pass in the corresponding molecule_type as an input. At the time of writing, only `protein` is supported as a
     molecule type.
 
+    The function is thread-safe, including when the same `PairwiseAligner` is shared between threads, since neither
+    the aligner nor the input `SeqRecord` objects are modified. See `generate_hgvs_variants_batch` for running many
+    pairs on a thread or process pool.
+
+    An optional `palamedes.cache.ResultCache` can be passed as `cache`, results are then looked up (and stored) by a
+    hash of the sequences, reference id, molecule type, aligner parameters, substitution rule flag and palamedes
+    version, skipping the alignment entirely on a hit.
+
     Example using a raw string:
 
     .. code-block:: python
@@ -225,23 +372,66 @@ def generate_hgvs_variants(
             SequenceVariant(ac=Jelleine-I, type=p, posedit=Leu8del, gene=None)
         ]
     """
+    return [
+        record.to_hgvs()
+        for record in generate_variant_records(
+            reference_sequence,
+            alternate_sequence,
+            molecule_type=molecule_type,
+            aligner=aligner,
+            use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            cache=cache,
+        )
+    ]
+
+
+def generate_variant_records(
+    reference_sequence: str | SeqRecord,
+    alternate_sequence: str | SeqRecord,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    cache: ResultCache | None = None,
+) -> list[VariantRecord]:
+    """
+    Compact counterpart of `generate_hgvs_variants`, returning a `palamedes.models.VariantRecord` per variant instead of
+    the full `SequenceVariant`, see `generate_variant_records_from_alignment`. A `cache` stores these records, so it
+    is shared with `generate_hgvs_variants`.
+
+    .. code-block:: python
+
+        >>> from palamedes import generate_variant_records
+        >>> records = generate_variant_records("PFKISIHL", "TPFKISIH")
+        >>> records
+        [
+            VariantRecord(accession='ref', category=2, start=1, end=1, ref='P', alt='T', length=-1),
+            VariantRecord(accession='ref', category=1, start=8, end=8, ref='L', alt='', length=0),
+        ]
+        >>> records[1].to_hgvs()
+        SequenceVariant(ac=ref, type=p, posedit=Leu8del, gene=None)
+    """
+    from palamedes.align import generate_seq_records
+    from palamedes.hgvs.builders import BUILDER_CONFIG
 
     if molecule_type not in BUILDER_CONFIG:
         raise NotImplementedError(
             f"Type {molecule_type} unsupported or unrecognized! Current supported types: {','.join(BUILDER_CONFIG.keys())}"
         )
 
-    ref_seq_record = (
-        generate_seq_record(reference_sequence, REF_SEQUENCE_ID, molecule_type=molecule_type)
-        if isinstance(reference_sequence, str)
-        else reference_sequence
-    )
+    ref_seq_record, alt_seq_record = generate_seq_records(reference_sequence, alternate_sequence, molecule_type)
 
-    alt_seq_record = (
-        generate_seq_record(alternate_sequence, ALT_SEQUENCE_ID, molecule_type=molecule_type)
-        if isinstance(alternate_sequence, str)
-        else alternate_sequence
-    )
+    if cache is None:
+        alignment = generate_alignment(ref_seq_record, alt_seq_record, molecule_type=molecule_type, aligner=aligner)
+        return generate_variant_records_from_alignment(alignment, use_non_standard_substitution_rules, molecule_type)
 
-    alignment = generate_alignment(ref_seq_record, alt_seq_record, molecule_type=molecule_type, aligner=aligner)
-    return generate_hgvs_variants_from_alignment(alignment, use_non_standard_substitution_rules, molecule_type)
+    from palamedes.align import make_aligner
+    from palamedes.cache import make_cache_key
+
+    aligner = aligner if aligner is not None else make_aligner()
+    key = make_cache_key(ref_seq_record, alt_seq_record, molecule_type, aligner, use_non_standard_substitution_rules)
+    if (records := cache.get(key)) is None:
+        alignment = generate_alignment(ref_seq_record, alt_seq_record, molecule_type=molecule_type, aligner=aligner)
+        records = generate_variant_records_from_alignment(alignment, use_non_standard_substitution_rules, molecule_type)
+        cache.put(key, records)
+
+    return records
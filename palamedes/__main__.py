@@ -1,40 +1,240 @@
-import logging
-from argparse import ArgumentParser
+from __future__ import annotations
 
-from Bio.Align import PairwiseAligner
+import logging
+import os
+import sys
+from argparse import ArgumentParser, Namespace
+from typing import TYPE_CHECKING, Any, Callable, Iterable
 
-from palamedes import generate_alignment, generate_variant_blocks
-from palamedes.align import generate_seq_record
-from palamedes.config import MOLECULE_TYPE_PROTEIN, ALT_SEQUENCE_ID, REF_SEQUENCE_ID
+from palamedes import generate_alignment
+from palamedes.align import generate_seq_record, generate_variant_blocks, make_aligner
+from palamedes.config import MOLECULE_TYPE_PROTEIN, ALT_SEQUENCE_ID, REF_SEQUENCE_ID, EXECUTOR_TYPES
 from palamedes import __version__
 from palamedes.hgvs.utils import categorize_variant_block
-from palamedes.hgvs.builders import BUILDER_CONFIG
+from palamedes.models import SequencePair
 from palamedes.utils import configure_logging
 from palamedes.config import (
-    GLOBAL_ALIGN_MODE,
+    DEFAULT_AGGREGATE_MEMORY_BUDGET_BYTES,
+    EXECUTOR_TYPE_THREAD,
     DEFAULT_MATCH_SCORE,
     DEFAULT_MISMATCH_SCORE,
     DEFAULT_OPEN_GAP_SCORE,
     DEFAULT_EXTEND_GAP_SCORE,
 )
 
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+
 LOGGER = logging.getLogger(__name__)
 
 
+def run_supervised_batch(
+    args: Namespace,
+    pairs: Iterable[SequencePair],
+    aligner: PairwiseAligner,
+    emit: Callable[[list[str], list[str], list[Any]], None],
+) -> None:
+    """Batch mode with --pair-timeout or --pair-memory-limit, failed pairs are logged instead of aborting the run"""
+    from palamedes.config import PAIR_FALLBACK
+    from palamedes.models import FallbackPairResult, PairFailure
+    from palamedes.shards import filter_shard
+    from palamedes.supervisor import iter_hgvs_variants_supervised
+
+    failed_pairs_handle = open(args.failed_pairs, "w") if args.failed_pairs is not None else None
+    try:
+        for result in iter_hgvs_variants_supervised(
+            filter_shard(pairs, args.shard) if args.shard is not None else pairs,
+            molecule_type=args.molecule_type,
+            aligner=aligner,
+            use_non_standard_substitution_rules=args.use_non_standard_substitution_rules,
+            max_workers=args.workers,
+            timeout_seconds=args.pair_timeout,
+            memory_limit_bytes=args.pair_memory_limit * 1024**2 if args.pair_memory_limit is not None else None,
+            fallback=args.fallback,
+            compact=True,
+        ):
+            if isinstance(result, PairFailure):
+                LOGGER.warning("Failed to process %s (%s): %s", result.pair_id, result.reason, result.message)
+                if failed_pairs_handle is not None:
+                    failed_pairs_handle.write(f"{result.pair_id}\t{result.reason}\t{result.message}\n")
+                continue
+
+            if isinstance(result, FallbackPairResult):
+                # the variants are still output, but flagged as approximate
+                LOGGER.warning("Used the ungapped fallback for %s (%s)", result.pair_id, result.failure.reason)
+                if failed_pairs_handle is not None:
+                    failed_pairs_handle.write(
+                        f"{result.pair_id}\t{PAIR_FALLBACK}\t{result.failure.reason}: {result.failure.message}\n"
+                    )
+
+            LOGGER.debug("%s variants found for %s", len(result.variants), result.pair_id)
+            lines = [f"{result.pair_id}\t{hgvs.format()}\n" for hgvs in result.variants]
+            emit([result.pair_id], lines, result.variants)
+    finally:
+        if failed_pairs_handle is not None:
+            failed_pairs_handle.close()
+
+
+def run_aggregated_batch(args: Namespace, pairs: Iterable[SequencePair], aligner: PairwiseAligner) -> None:
+    """Batch mode with --aggregate, printing each distinct variant once with the number of alternates it occurs in"""
+    from palamedes.aggregate import aggregate_hgvs_variants_batch
+
+    with aggregate_hgvs_variants_batch(
+        pairs,
+        molecule_type=args.molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=args.use_non_standard_substitution_rules,
+        executor_type=args.executor,
+        max_workers=args.workers,
+        shard=args.shard,
+        memory_budget_bytes=args.aggregate_memory_budget * 1024**2,
+    ) as counter:
+        for variant, count in counter.iter_counts():
+            sys.stdout.write(f"{variant.format()}\t{count}\n")
+
+
+def run_batch(args: Namespace, ref_seq_record: SeqRecord, aligner: PairwiseAligner) -> None:
+    """Batch mode of the CLI, comparing every sequence in --alt-fasta against the reference"""
+    from palamedes.batch import iter_collapsed_hgvs_variants_batch, iter_hgvs_variants_batch
+    from palamedes.cache import ResultCache
+    from palamedes.inputs import PrefetchingReader, iter_seq_records
+
+    cache = ResultCache(path=args.cache_path) if args.cache_path is not None else None
+    # decompression and parsing run in a reader thread, ahead of the alignments
+    reader = PrefetchingReader(iter_seq_records(args.alt_fasta, molecule_type=args.molecule_type))
+    recorder = None
+    if args.shard_manifest is not None:
+        from palamedes.shards import ShardManifestRecorder, make_settings_digest
+
+        recorder = ShardManifestRecorder(
+            args.shard or "1/1",
+            make_settings_digest(args.molecule_type, aligner, args.use_non_standard_substitution_rules),
+        )
+
+    pairs: Iterable[SequencePair] = (
+        SequencePair(str(alt_seq_record.id), ref_seq_record, alt_seq_record) for alt_seq_record in reader
+    )
+    checkpoint = None
+    if args.checkpoint_dir is not None:
+        from palamedes.checkpoint import BatchCheckpoint
+        from palamedes.shards import make_settings_digest
+
+        checkpoint = BatchCheckpoint(
+            args.checkpoint_dir,
+            settings=dict(
+                ref=args.ref,
+                ref_fasta=args.ref_fasta and os.path.abspath(args.ref_fasta),
+                alt_fasta=os.path.abspath(args.alt_fasta),
+                settings_digest=make_settings_digest(
+                    args.molecule_type, aligner, args.use_non_standard_substitution_rules
+                ),
+                shard=args.shard,
+                collapse_duplicates=args.collapse_duplicates,
+            ),
+            resume=args.resume,
+        )
+        pairs = checkpoint.skip_completed(pairs)
+        if recorder is not None:
+            for pair_id, variant_count in checkpoint.completed.items():
+                recorder.record_pair(pair_id, variant_count)
+
+    variant_index = None
+    if args.variant_index is not None:
+        from palamedes.variant_index import VariantIndex
+
+        variant_index = VariantIndex(args.variant_index)
+
+    def emit(pair_ids: list[str], lines: list[str], variants: list[Any]) -> None:
+        variant_count = len(variants)
+        if recorder is not None:
+            for pair_id in pair_ids:
+                recorder.record_pair(pair_id, variant_count)
+
+        if variant_index is not None:
+            for pair_id in pair_ids:
+                variant_index.add(pair_id, variants)
+
+        if checkpoint is not None:
+            checkpoint.add(pair_ids, lines, variant_count)
+        else:
+            sys.stdout.writelines(lines)
+
+    batch_kwargs = dict(
+        molecule_type=args.molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=args.use_non_standard_substitution_rules,
+        executor_type=args.executor,
+        max_workers=args.workers,
+        cache=cache,
+        compact=True,
+        shard=args.shard,
+        schedule_by_cost=args.schedule_by_cost,
+    )
+
+    try:
+        if args.aggregate:
+            run_aggregated_batch(args, pairs, aligner)
+        elif args.collapse_duplicates:
+            for collapsed_result in iter_collapsed_hgvs_variants_batch(pairs, **batch_kwargs):
+                LOGGER.debug("%s variants found for %s", len(collapsed_result.variants), collapsed_result.pair_ids)
+                # groups without variants still get a row, with an empty variant column, so every group is counted
+                lines = [
+                    f"{collapsed_result.pair_ids[0]}\t{collapsed_result.multiplicity}\t{hgvs.format()}\n"
+                    for hgvs in collapsed_result.variants
+                ] or [f"{collapsed_result.pair_ids[0]}\t{collapsed_result.multiplicity}\t\n"]
+                emit(collapsed_result.pair_ids, lines, collapsed_result.variants)
+        elif args.pair_timeout is not None or args.pair_memory_limit is not None:
+            run_supervised_batch(args, pairs, aligner, emit)
+        else:
+            for pair_result in iter_hgvs_variants_batch(pairs, deduplicate=args.deduplicate, **batch_kwargs):
+                LOGGER.debug("%s variants found for %s", len(pair_result.variants), pair_result.pair_id)
+                lines = [f"{pair_result.pair_id}\t{hgvs.format()}\n" for hgvs in pair_result.variants]
+                emit([pair_result.pair_id], lines, pair_result.variants)
+    finally:
+        if checkpoint is not None:
+            # completed results are committed even when the run fails, so a resumed run does not redo them
+            checkpoint.close()
+
+        if variant_index is not None:
+            variant_index.close()
+
+    if checkpoint is not None:
+        checkpoint.write_output(sys.stdout)
+
+    if recorder is not None:
+        from palamedes.shards import write_shard_manifest
+
+        write_shard_manifest(args.shard_manifest, recorder.manifest())
+
+    input_stats = reader.stats
+    LOGGER.debug(
+        "Read %s alternates at %.0f records/s, limited by %s",
+        input_stats.records,
+        input_stats.records_per_second,
+        input_stats.bottleneck,
+    )
+    if cache is not None:
+        LOGGER.debug("Result cache stats: %s", cache.stats)
+        cache.close()
+
+
 def main() -> None:
     parser = ArgumentParser(
         description="Generate HGVS objects for all variants found in the alignment between 2 sequences",
     )
     parser.add_argument(
         "ref",
-        help="Reference sequence",
+        help="Reference sequence, or the id of the reference record with --ref-fasta",
         type=str,
     )
 
     parser.add_argument(
         "alt",
-        help="Alternate sequence",
+        help="Alternate sequence, omit when using --alt-fasta",
         type=str,
+        nargs="?",
+        default=None,
     )
 
     parser.add_argument(
@@ -88,6 +288,157 @@ def main() -> None:
         type=int,
         default=DEFAULT_EXTEND_GAP_SCORE,
     )
+    parser.add_argument(
+        "--alt-fasta",
+        help=(
+            "Path to a FASTA or FASTQ file (optionally gzip compressed) of alternate sequences to compare against the "
+            "reference in batch mode, variants are printed as <alt id><tab><hgvs>"
+        ),
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--ref-fasta",
+        help=(
+            "Path to an indexed FASTA file of references, ref is then read from the record with that id, the file is "
+            "memory-mapped and a samtools style .fai index is created next to it if missing"
+        ),
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--executor",
+        help=f"Executor to use for batch mode, {EXECUTOR_TYPE_THREAD} by default",
+        choices=EXECUTOR_TYPES,
+        default=None,
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of workers to use for batch mode, defaults to the number of CPUs",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--deduplicate",
+        help="Align identical alternates only once in batch mode, output is unchanged",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--collapse-duplicates",
+        help=(
+            "Collapse identical alternates in batch mode, printing <first alt id><tab><count><tab><hgvs> "
+            "once per distinct alternate, with an empty hgvs column for alternates without variants"
+        ),
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--schedule-by-cost",
+        help=(
+            "Size chunks by the estimated cost of their alternates in batch mode, dispatching long alternates on their "
+            "own and first, for inputs mixing short and long sequences"
+        ),
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--aggregate",
+        help=(
+            "Print each distinct variant once in batch mode, as <hgvs><tab><count> with the number of times it occurs "
+            "across the alternates, instead of the variants of every alternate"
+        ),
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--aggregate-memory-budget",
+        help="Memory budget in MiB of the counts with --aggregate, past which they are spilled to temporary files",
+        type=int,
+        default=DEFAULT_AGGREGATE_MEMORY_BUDGET_BYTES // 1024**2,
+    )
+    parser.add_argument(
+        "--variant-index",
+        help=(
+            "Path to a SQLite index of the variants to the ids of the alternates carrying them to write in batch mode, "
+            "extended when it exists, see palamedes.variant_index.VariantIndex for queries"
+        ),
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-path",
+        help="Path to a SQLite result cache for batch mode, reused across runs with the same inputs and settings",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--shard",
+        help=(
+            "Only process the alternates of shard i out of N (one based, for example 2/8) in batch mode, assigned by "
+            "a stable hash of their id, so N runs on separate machines cover the input exactly once"
+        ),
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--shard-manifest",
+        help="Path to write a JSON manifest of the batch run to, see palamedes.shards.merge_shard_manifests",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--pair-timeout",
+        help=(
+            "Time limit in seconds per alternate in batch mode, alternates exceeding it are logged as failed and their "
+            "worker process is replaced instead of stalling the run"
+        ),
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--pair-memory-limit",
+        help=(
+            "Memory budget in MiB of each alternate in batch mode, on top of what a worker process uses once its "
+            "libraries are loaded, alternates exceeding it are logged as failed"
+        ),
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--fallback",
+        help=(
+            "Retry failed alternates of the same length as the reference with an ungapped comparison, which is linear "
+            "but assumes the alignment has no gaps, see palamedes.align.generate_ungapped_variant_records. Alternates "
+            "of other lengths are reported as failed without a retry"
+        ),
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--failed-pairs",
+        help="Path to write the alternates which failed with --pair-timeout or --pair-memory-limit to, as TSV",
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        help=(
+            "Directory to checkpoint batch mode results to, committed in segments as the run progresses, the output "
+            "is printed once the run completes"
+        ),
+        type=str,
+        default=None,
+    )
+    parser.add_argument(
+        "--resume",
+        help=(
+            "Resume the run checkpointed in --checkpoint-dir, skipping the alternates it completed, not supported with "
+            "--collapse-duplicates or --variant-index"
+        ),
+        action="store_true",
+        default=False,
+    )
     parser.add_argument(
         "--debug",
         help="Enable debug logging to stderr",
@@ -101,19 +452,89 @@ def main() -> None:
     )
 
     args = parser.parse_args()
+    if (args.alt is None) == (args.alt_fasta is None):
+        parser.error("Exactly one of alt or --alt-fasta must be provided")
+
+    if (args.pair_timeout is not None or args.pair_memory_limit is not None) and (
+        args.deduplicate
+        or args.collapse_duplicates
+        or args.cache_path is not None
+        or args.executor is not None
+        or args.schedule_by_cost
+    ):
+        # supervised pairs always run one at a time in dedicated worker processes
+        parser.error(
+            "--pair-timeout and --pair-memory-limit cannot be combined with --deduplicate, --collapse-duplicates, "
+            "--cache-path, --executor or --schedule-by-cost"
+        )
+
+    if args.executor is None:
+        args.executor = EXECUTOR_TYPE_THREAD
+
+    if args.aggregate and (
+        args.deduplicate
+        or args.collapse_duplicates
+        or args.cache_path is not None
+        or args.checkpoint_dir is not None
+        or args.shard_manifest is not None
+        or args.variant_index is not None
+        or args.pair_timeout is not None
+        or args.pair_memory_limit is not None
+        or args.schedule_by_cost
+    ):
+        parser.error(
+            "--aggregate cannot be combined with --deduplicate, --collapse-duplicates, --cache-path, --checkpoint-dir, "
+            "--shard-manifest, --variant-index, --pair-timeout, --pair-memory-limit or --schedule-by-cost"
+        )
+
+    if args.resume and args.checkpoint_dir is None:
+        parser.error("--resume requires --checkpoint-dir")
+
+    if args.resume and args.variant_index is not None:
+        # alternates completed before the interruption may not have been committed to the index
+        parser.error("--variant-index cannot be combined with --resume")
+
+    if args.resume and args.collapse_duplicates:
+        # a group split across the interruption would be written twice, once per run, with partial counts
+        parser.error("--collapse-duplicates cannot be combined with --resume")
+
+    if args.shard is not None:
+        from palamedes.shards import parse_shard
+
+        try:
+            parse_shard(args.shard)
+        except ValueError as error:
+            parser.error(str(error))
+
     configure_logging(args.debug)
 
     LOGGER.debug("Running with args: %s", args)
 
-    aligner = PairwiseAligner(
-        mode=GLOBAL_ALIGN_MODE,
+    aligner = make_aligner(
         match_score=args.match_score,
         mismatch_score=args.mismatch_score,
         open_gap_score=args.gap_open_score,
         extend_gap_score=args.gap_extend_score,
     )
 
-    ref_seq_record = generate_seq_record(args.ref, args.ref_id, molecule_type=args.molecule_type)
+    if args.ref_fasta is not None:
+        from palamedes.fasta import IndexedFasta
+
+        reference_fasta = IndexedFasta(args.ref_fasta, molecule_type=args.molecule_type)
+        if args.ref not in reference_fasta:
+            parser.error(f"Reference {args.ref} not found in {args.ref_fasta}")
+
+        ref_seq_record = reference_fasta.seq_record(args.ref)
+    else:
+        ref_seq_record = generate_seq_record(args.ref, args.ref_id, molecule_type=args.molecule_type)
+
+    if args.alt_fasta is not None:
+        run_batch(args, ref_seq_record, aligner)
+        return
+
+    # deferred until after argument parsing so --help and --version do not pay for loading hgvs
+    from palamedes.hgvs.builders import BUILDER_CONFIG
+
     alt_seq_record = generate_seq_record(args.alt, args.alt_id, molecule_type=args.molecule_type)
     alignment = generate_alignment(
         ref_seq_record,
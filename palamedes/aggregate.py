@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import Counter
+from functools import partial
+from itertools import groupby
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from palamedes import generate_variant_records
+from palamedes.align import make_aligner
+from palamedes.config import (
+    AGGREGATE_BYTES_PER_ENTRY,
+    DEFAULT_AGGREGATE_MEMORY_BUDGET_BYTES,
+    DEFAULT_BATCH_CHUNK_SIZE,
+    EXECUTOR_TYPE_THREAD,
+    HGVS_VARIANT_TYPE_SUBSTITUTION,
+    MOLECULE_TYPE_PROTEIN,
+)
+from palamedes.models import PositionSpectrum, SequencePair, ShardSpec, VariantCount, VariantRecord
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from Bio.Align import PairwiseAligner
+
+    from palamedes.fasta import IndexedFasta
+
+LOGGER = logging.getLogger(__name__)
+
+
+def variant_sort_key(record: VariantRecord) -> tuple[Any, ...]:
+    """Order of the aggregated variants, by reference then position, so the variants of a position are consecutive"""
+    return record.accession, record.start, record.end, record.category, record.ref, record.alt, record.length
+
+
+def read_spill_file(path: str) -> Iterator[tuple[VariantRecord, int]]:
+    """Stream the (record, count) entries of a spill file written by VariantCounter.spill"""
+    with open(path) as handle:
+        for line in handle:
+            *fields, count = json.loads(line)
+            yield VariantRecord(*fields), count
+
+
+class VariantCounter:
+    """
+    Counts of distinct VariantRecords across a library, merged from per pair records or partial Counters (see
+    count_chunk_variants), for when only how often each variant occurs is needed rather than per pair lists.
+
+    Counts are held in memory until their estimated size (AGGREGATE_BYTES_PER_ENTRY per distinct variant) passes
+    memory_budget_bytes, then written to a sorted spill file in a temporary directory under spill_directory and
+    cleared. Reading the counts merges the spill files and the counts in memory as sorted streams, so memory stays
+    bounded by the budget however many distinct variants there are. The spill files are removed on close.
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int = DEFAULT_AGGREGATE_MEMORY_BUDGET_BYTES,
+        spill_directory: str | None = None,
+    ) -> None:
+        self.memory_budget_bytes = memory_budget_bytes
+        self._spill_directory = spill_directory
+        self._temp_directory: str | None = None
+        self._counts: Counter[VariantRecord] = Counter()
+        self._spill_paths: list[str] = []
+        self.pair_count = 0
+
+    @property
+    def spill_count(self) -> int:
+        return len(self._spill_paths)
+
+    def add(self, records: Iterable[VariantRecord]) -> None:
+        """Count the VariantRecords of one pair"""
+        self.update(Counter(records), pair_count=1)
+
+    def update(self, counts: Counter[VariantRecord], pair_count: int) -> None:
+        """Merge partial counts covering pair_count pairs, spilling to disk when over the memory budget"""
+        self._counts.update(counts)
+        self.pair_count += pair_count
+        if len(self._counts) * AGGREGATE_BYTES_PER_ENTRY > self.memory_budget_bytes:
+            self.spill()
+
+    def spill(self) -> None:
+        """Write the counts in memory to a new sorted spill file, as JSON lines, and clear them"""
+        if not self._counts:
+            return
+
+        if self._temp_directory is None:
+            self._temp_directory = tempfile.mkdtemp(prefix="palamedes-aggregate-", dir=self._spill_directory)
+
+        path = os.path.join(self._temp_directory, f"spill-{len(self._spill_paths):06d}.jsonl")
+        with open(path, "w") as handle:
+            for record in sorted(self._counts, key=variant_sort_key):
+                handle.write(json.dumps([*record, self._counts[record]]) + "\n")
+
+        LOGGER.debug("Spilled %s distinct variants to %s", len(self._counts), path)
+        self._spill_paths.append(path)
+        self._counts.clear()
+
+    def iter_counts(self) -> Iterator[VariantCount]:
+        """Stream a VariantCount per distinct variant, ordered by reference, position and then the variant itself"""
+        in_memory = ((record, self._counts[record]) for record in sorted(self._counts, key=variant_sort_key))
+        merged = heapq.merge(
+            in_memory,
+            *(read_spill_file(path) for path in self._spill_paths),
+            key=lambda entry: variant_sort_key(entry[0]),
+        )
+        for record, entries in groupby(merged, key=lambda entry: entry[0]):
+            yield VariantCount(record, sum(count for _, count in entries))
+
+    def iter_position_spectra(self) -> Iterator[PositionSpectrum]:
+        """
+        Stream the mutation spectrum of every position with variants, the variants starting there counted by type and,
+        for substitutions, by alternate residue.
+        """
+        for (accession, position), variant_counts in groupby(
+            self.iter_counts(), key=lambda variant_count: (variant_count.variant.accession, variant_count.variant.start)
+        ):
+            variant_types: Counter[str] = Counter()
+            substitutions: Counter[str] = Counter()
+            for record, count in variant_counts:
+                variant_types[record.hgvs_type] += count
+                if record.hgvs_type == HGVS_VARIANT_TYPE_SUBSTITUTION:
+                    substitutions[record.alt] += count
+
+            yield PositionSpectrum(accession, position, dict(variant_types), dict(substitutions))
+
+    def close(self) -> None:
+        """Remove the spill files"""
+        if self._temp_directory is not None:
+            shutil.rmtree(self._temp_directory, ignore_errors=True)
+            self._temp_directory = None
+
+        self._spill_paths.clear()
+
+    def __enter__(self) -> VariantCounter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def count_chunk_variants(
+    chunk: list[SequencePair],
+    molecule_type: str,
+    aligner: PairwiseAligner,
+    use_non_standard_substitution_rules: bool,
+) -> list[tuple[int, Counter[VariantRecord]]]:
+    """
+    Worker function of aggregate_hgvs_variants_batch, returning the number of pairs in the chunk along with a partial
+    Counter of their VariantRecords, so only the distinct variants of a chunk are sent back. This runs in a thread or
+    a worker process, so it must stay a picklable module level function.
+    """
+    counts: Counter[VariantRecord] = Counter()
+    for pair in chunk:
+        counts.update(
+            generate_variant_records(
+                pair.reference,
+                pair.alternate,
+                molecule_type=molecule_type,
+                aligner=aligner,
+                use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            )
+        )
+
+    return [(len(chunk), counts)]
+
+
+def aggregate_hgvs_variants_batch(
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    reference_fasta: IndexedFasta | str | None = None,
+    shard: ShardSpec | str | None = None,
+    memory_budget_bytes: int = DEFAULT_AGGREGATE_MEMORY_BUDGET_BYTES,
+    spill_directory: str | None = None,
+) -> VariantCounter:
+    """
+    Aggregating counterpart of `iter_hgvs_variants_batch`, counting how often each distinct variant occurs across the
+    pairs instead of returning per pair lists. Every chunk is counted into a partial Counter by its worker, and the
+    partial counts are merged into a `VariantCounter` in the calling process, which spills to disk past
+    memory_budget_bytes, see there. The caller should close the returned VariantCounter (or use it as a context
+    manager) to remove its spill files.
+
+    .. code-block:: python
+
+        >>> from palamedes.aggregate import aggregate_hgvs_variants_batch
+        >>> from palamedes.models import SequencePair
+        >>> pairs = [SequencePair(f"read-{idx}", "PFKISIHL", alternate) for idx, alternate in enumerate(reads)]
+        >>> with aggregate_hgvs_variants_batch(pairs, memory_budget_bytes=512 * 1024**2) as counter:
+        ...     for variant, count in counter.iter_counts():
+        ...         print(variant.format(), count)
+        ref:p.Pro1extThr-1 1204
+        ref:p.Leu8Ala 36
+        ref:p.Leu8del 1204
+    """
+    from palamedes.batch import chunk_pairs, run_chunks
+
+    if shard is not None:
+        from palamedes.shards import filter_shard
+
+        pairs = filter_shard(pairs, shard)
+
+    if reference_fasta is not None:
+        from palamedes.fasta import resolve_reference_ids
+
+        pairs = resolve_reference_ids(pairs, reference_fasta, molecule_type=molecule_type)
+
+    job = partial(
+        count_chunk_variants,
+        molecule_type=molecule_type,
+        aligner=aligner if aligner is not None else make_aligner(),
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+    )
+    counter = VariantCounter(memory_budget_bytes=memory_budget_bytes, spill_directory=spill_directory)
+    try:
+        for pair_count, counts in run_chunks(
+            chunk_pairs(pairs, chunk_size),
+            lambda chunk, submit: submit(job, chunk).result,
+            executor_type,
+            max_workers,
+        ):
+            counter.update(counts, pair_count)
+    except BaseException:
+        counter.close()
+        raise
+
+    LOGGER.debug("Aggregated %s pairs, with %s spill files", counter.pair_count, counter.spill_count)
+    return counter
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Iterable
+
+from palamedes import generate_hgvs_variants
+from palamedes.config import DEFAULT_MAX_CONCURRENCY, MOLECULE_TYPE_PROTEIN
+
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+    from hgvs.sequencevariant import SequenceVariant
+
+LOGGER = logging.getLogger(__name__)
+
+
+async def agenerate_hgvs_variants(
+    reference_sequence: str | SeqRecord,
+    alternate_sequence: str | SeqRecord,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor: Executor | None = None,
+    timeout: float | None = None,
+) -> list[SequenceVariant]:
+    """
+    Async counterpart of `generate_hgvs_variants`. The alignment and HGVS building are run on an executor so the event
+    loop is never blocked, all other arguments are passed through unchanged.
+
+    - executor: Any `concurrent.futures.Executor`. A `ThreadPoolExecutor` is cheap to share, while a
+      `ProcessPoolExecutor` side steps the GIL for long sequences (the aligner, along with its epsilon, SeqRecords
+      and results are all picklable). Defaults to the event loop's default executor.
+
+    - timeout: Optional number of seconds to wait for the result before raising `TimeoutError`.
+
+    Cancelling the awaiting task (or hitting the timeout) cancels the executor job if it has not started yet. A job
+    that is already running cannot be interrupted and runs to completion in the background, its result is discarded.
+
+    .. code-block:: python
+
+        >>> import asyncio
+        >>> from palamedes import agenerate_hgvs_variants
+        >>> asyncio.run(agenerate_hgvs_variants("PFKISIHL", "TPFKISIH"))
+        [
+            SequenceVariant(ac=ref, type=p, posedit=Pro1extThr-1, gene=None),
+            SequenceVariant(ac=ref, type=p, posedit=Leu8del, gene=None),
+        ]
+    """
+    if isinstance(executor, ProcessPoolExecutor):
+        # aligners sent to the workers must keep their epsilon, or tied alignments are broken differently there
+        from palamedes.batch import register_aligner_reducer
+
+        register_aligner_reducer()
+
+    loop = asyncio.get_running_loop()
+    job = partial(
+        generate_hgvs_variants,
+        reference_sequence,
+        alternate_sequence,
+        molecule_type=molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+    )
+    return await asyncio.wait_for(loop.run_in_executor(executor, job), timeout)
+
+
+async def _aiterate(
+    pairs: Iterable[tuple[str | SeqRecord, str | SeqRecord]] | AsyncIterable[tuple[str | SeqRecord, str | SeqRecord]],
+) -> AsyncIterator[tuple[str | SeqRecord, str | SeqRecord]]:
+    """Helper to consume either a regular or an async iterable of pairs with async for"""
+    if isinstance(pairs, AsyncIterable):
+        async for pair in pairs:
+            yield pair
+    else:
+        for pair in pairs:
+            yield pair
+
+
+async def aiter_hgvs_variants(
+    pairs: Iterable[tuple[str | SeqRecord, str | SeqRecord]] | AsyncIterable[tuple[str | SeqRecord, str | SeqRecord]],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor: Executor | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    timeout: float | None = None,
+) -> AsyncIterator[list[SequenceVariant]]:
+    """
+    Async generator over a (sync or async) iterable of (reference, alternate) pairs, yielding the list of variants for
+    each pair in input order. Each pair is processed with `agenerate_hgvs_variants`, see there for the meaning of
+    `executor` and the per-pair `timeout`.
+
+    At most `max_concurrency` pairs are in flight at once, the next pair is only pulled from the input once the oldest
+    in flight pair has been yielded. This keeps memory bounded for large (or endless) inputs and pushes back on an
+    async producer. If the consumer stops early, or an error is raised (a timeout for example), the remaining in
+    flight pairs are cancelled.
+
+    The limit applies to the asyncio tasks, not to the executor: a cancelled or timed out pair whose job had already
+    started frees its slot right away, while the job runs to completion in the background (see
+    `agenerate_hgvs_variants`). Callers retrying after timeouts should size the executor itself (its `max_workers`)
+    to bound how many alignments run at once.
+
+    .. code-block:: python
+
+        >>> from palamedes import aiter_hgvs_variants
+        >>> async def run(pairs):
+        ...     return [variants async for variants in aiter_hgvs_variants(pairs, max_concurrency=4)]
+        >>> asyncio.run(run([("PFKISIHL", "TPFKISIH"), ("PFKISIHL", "PFKISIHL")]))
+        [
+            [
+                SequenceVariant(ac=ref, type=p, posedit=Pro1extThr-1, gene=None),
+                SequenceVariant(ac=ref, type=p, posedit=Leu8del, gene=None),
+            ],
+            [],
+        ]
+    """
+    if max_concurrency < 1:
+        raise ValueError(f"max_concurrency must be at least 1, got: {max_concurrency}")
+
+    submit = partial(
+        agenerate_hgvs_variants,
+        molecule_type=molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+        executor=executor,
+        timeout=timeout,
+    )
+    in_flight: deque[asyncio.Task[list[SequenceVariant]]] = deque()
+
+    try:
+        async for reference_sequence, alternate_sequence in _aiterate(pairs):
+            if len(in_flight) >= max_concurrency:
+                yield await in_flight.popleft()
+
+            in_flight.append(asyncio.ensure_future(submit(reference_sequence, alternate_sequence)))
+
+        while in_flight:
+            yield await in_flight.popleft()
+    finally:
+        if in_flight:
+            LOGGER.debug("Cancelling %s in flight pairs", len(in_flight))
+
+        for task in in_flight:
+            task.cancel()
@@ -1,20 +1,34 @@
-import logging
-from functools import reduce, partial
+from __future__ import annotations
 
-from Bio.Align import Alignment
-from Bio.Seq import Seq
-from Bio.SeqRecord import SeqRecord
+import logging
+from itertools import pairwise
+from typing import TYPE_CHECKING, Iterable, Iterator
 
 from palamedes.config import (
     ALIGNMENT_GAP_CHAR,
+    DEFAULT_EXTEND_GAP_SCORE,
+    DEFAULT_MATCH_SCORE,
+    DEFAULT_MISMATCH_SCORE,
+    DEFAULT_OPEN_GAP_SCORE,
+    GLOBAL_ALIGN_MODE,
     VARIANT_BASE_DELETION,
     VARIANT_BASE_INSERTION,
     VARIANT_BASE_MATCH,
     VARIANT_BASE_MISMATCH,
     MOLECULE_TYPE_PROTEIN,
     MOLECULE_TYPE_ANNOTATION_KEY,
+    REF_SEQUENCE_ID,
+    ALT_SEQUENCE_ID,
 )
 from palamedes.models import Block, VariantBlock
+from palamedes.tables import MISSING_VALUE, VariantBlockTable
+
+if TYPE_CHECKING:
+    import numpy as np
+    from Bio.Align import Alignment, PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+
+    from palamedes.models import VariantRecord
 
 LOGGER = logging.getLogger(__name__)
 
@@ -24,6 +38,9 @@ def generate_seq_record(sequence: str, seq_id: str, molecule_type: str = MOLECUL
     Helper function to generate a SeqRecord object from a raw input sequence. This also handles
     configuring the expected molecule_type annotation which is required for downstream steps.
     """
+    from Bio.Seq import Seq
+    from Bio.SeqRecord import SeqRecord
+
     return SeqRecord(
         Seq(sequence),
         id=seq_id,
@@ -31,12 +48,83 @@ def generate_seq_record(sequence: str, seq_id: str, molecule_type: str = MOLECUL
     )
 
 
+def generate_seq_records(
+    reference_sequence: str | SeqRecord, alternate_sequence: str | SeqRecord, molecule_type: str = MOLECULE_TYPE_PROTEIN
+) -> tuple[SeqRecord, SeqRecord]:
+    """
+    Helper function to turn the reference and alternate inputs of the public API into SeqRecords, raw strings get
+    generated records with the default REF_SEQUENCE_ID and ALT_SEQUENCE_ID ids, SeqRecords are returned as is.
+    """
+    return (
+        generate_seq_record(reference_sequence, REF_SEQUENCE_ID, molecule_type=molecule_type)
+        if isinstance(reference_sequence, str)
+        else reference_sequence,
+        generate_seq_record(alternate_sequence, ALT_SEQUENCE_ID, molecule_type=molecule_type)
+        if isinstance(alternate_sequence, str)
+        else alternate_sequence,
+    )
+
+
+def make_aligner(
+    match_score: float = DEFAULT_MATCH_SCORE,
+    mismatch_score: float = DEFAULT_MISMATCH_SCORE,
+    open_gap_score: float = DEFAULT_OPEN_GAP_SCORE,
+    extend_gap_score: float = DEFAULT_EXTEND_GAP_SCORE,
+) -> PairwiseAligner:
+    """
+    Helper function to generate a global mode PairwiseAligner, using the default scores unless overridden. The
+    aligner is never modified by the alignment logic, so a single instance can be shared between threads.
+    """
+    from Bio.Align import PairwiseAligner
+
+    return PairwiseAligner(
+        mode=GLOBAL_ALIGN_MODE,
+        match_score=match_score,
+        mismatch_score=mismatch_score,
+        open_gap_score=open_gap_score,
+        extend_gap_score=extend_gap_score,
+    )
+
+
+def generate_ungapped_variant_records(
+    reference: str | SeqRecord,
+    alternate: str | SeqRecord,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+) -> list[VariantRecord]:
+    """
+    Cheap fallback for pairs of the same length, comparing them position by position without aligning them, so every
+    difference is reported as a substitution (or a delins of consecutive ones). This is linear in the length of the
+    pair, but is only what the aligner would report when no gaps score better, so it is an approximation.
+    The aligner is accepted for signature compatibility with generate_variant_records, and is not used.
+    """
+    import numpy as np
+    from Bio.Align import Alignment
+
+    from palamedes import generate_variant_records_from_alignment
+
+    reference_seq_record, alternate_seq_record = generate_seq_records(reference, alternate, molecule_type)
+    if len(reference_seq_record) != len(alternate_seq_record):
+        raise ValueError(
+            f"The ungapped fallback needs sequences of the same length, got: {len(reference_seq_record)} and "
+            f"{len(alternate_seq_record)}"
+        )
+
+    length = len(reference_seq_record)
+    alignment = Alignment([reference_seq_record, alternate_seq_record], np.array([[0, length], [0, length]]))
+    return generate_variant_records_from_alignment(alignment, use_non_standard_substitution_rules, molecule_type)
+
+
 def reverse_seq_record(seq_record: SeqRecord) -> SeqRecord:
     """
     Helper function to copy a SeqRecord into a new one, with the sequence reversed. This is a best effort copy,
     which is only used internally to the alignment logic to more easily access the 3' end most representation of
     the best alignment.
     """
+    from Bio.Seq import Seq
+    from Bio.SeqRecord import SeqRecord
+
     return SeqRecord(
         Seq(seq_record.seq[::-1]),
         id=seq_record.id,
@@ -49,6 +137,19 @@ def reverse_seq_record(seq_record: SeqRecord) -> SeqRecord:
     )
 
 
+def get_reversed_sequence(seq_record: SeqRecord) -> bytes | memoryview:
+    """
+    The reversed, encoded sequence of a SeqRecord as fed to the aligner. Sequence data providers which keep it
+    (ReferencePanel, IndexedFasta and palamedes.matrix.ReversibleSequenceData records) hand it over through their
+    reversed_sequence method, without encoding and reversing it again, any other SeqRecord gets a new bytes object.
+    """
+    data = getattr(seq_record.seq, "_data", None)
+    if (reversed_sequence := getattr(data, "reversed_sequence", None)) is not None:
+        return reversed_sequence()
+
+    return bytes(seq_record.seq)[::-1]
+
+
 def make_variant_base(ref_base: str, alt_base: str) -> str:
     """Helper function to generate the correct variant base given the ref and alt alignment bases"""
     if ref_base == alt_base:
@@ -101,36 +202,95 @@ def merge_variant_blocks(left: VariantBlock, right: VariantBlock) -> VariantBloc
     return VariantBlock(new_alignment_block, new_reference_blocks, new_alternate_blocks)
 
 
-def merge_reduce(
-    blocks: list[VariantBlock], next_block: VariantBlock, split_consecutive_mismatches: bool = False
-) -> list[VariantBlock]:
+def iter_alignment_columns(alignment: Alignment) -> Iterator[tuple[int, int, str, int, str]]:
     """
-    Helper function to implement merge or append, passed to functools.reduce to merge blocks. Optional
-    split_consecutive_mismatches will keep consecutive mismatches from being merged, allowing for a
-    chain of mismatches vs a delins. Note that this is non-standard behavior according to HGVS.
+    Walk the columns of an alignment, yielding (column, reference_index, reference_base, alternate_index,
+    alternate_base) tuples, where the index is -1 and the base is ALIGNMENT_GAP_CHAR for a gap. The columns are
+    generated from the segments in alignment.coordinates, so nothing proportional to the alignment length (like the
+    aligned sequences or alignment.indices) is built.
     """
-    peek_block = blocks[-1]
-
-    # base check for merge-ability
-    base_can_merge = can_merge_variant_blocks(peek_block, next_block)
-
-    # extra check for flag, merge if false OR merge if true and one of  left and right
-    # are not single bp mismatches. If true and both are single base mismatches
-    # then we do not merge, this 'splitting'
-    should_split_mismatches = all(
-        [
-            split_consecutive_mismatches,
-            peek_block.alignment_block.bases == VARIANT_BASE_MISMATCH,
-            next_block.alignment_block.bases == VARIANT_BASE_MISMATCH,
-        ]
+    reference_sequence, alternate_sequence = str(alignment.sequences[0].seq), str(alignment.sequences[1].seq)
+    reference_coordinates, alternate_coordinates = alignment.coordinates.tolist()
+    column = 0
+    for (reference_start, reference_end), (alternate_start, alternate_end) in zip(
+        pairwise(reference_coordinates), pairwise(alternate_coordinates)
+    ):
+        if reference_end > reference_start and alternate_end > alternate_start:
+            for offset in range(reference_end - reference_start):
+                yield (
+                    column,
+                    reference_start + offset,
+                    reference_sequence[reference_start + offset],
+                    alternate_start + offset,
+                    alternate_sequence[alternate_start + offset],
+                )
+                column += 1
+        elif reference_end > reference_start:
+            for reference_index in range(reference_start, reference_end):
+                yield column, reference_index, reference_sequence[reference_index], -1, ALIGNMENT_GAP_CHAR
+                column += 1
+        else:
+            for alternate_index in range(alternate_start, alternate_end):
+                yield column, -1, ALIGNMENT_GAP_CHAR, alternate_index, alternate_sequence[alternate_index]
+                column += 1
+
+
+def make_run_variant_block(run_columns: list[tuple[int, int, str, int, str]]) -> VariantBlock:
+    """Build the VariantBlock covering a run of adjacent alignment columns, see iter_alignment_columns"""
+    reference_columns = [(index, base) for _, index, base, _, _ in run_columns if index != -1]
+    alternate_columns = [(index, base) for _, _, _, index, base in run_columns if index != -1]
+    return VariantBlock(
+        Block(
+            run_columns[0][0],
+            run_columns[-1][0] + 1,
+            "".join(
+                make_variant_base(reference_base, alternate_base)
+                for _, _, reference_base, _, alternate_base in run_columns
+            ),
+        ),
+        [Block(reference_columns[0][0], reference_columns[-1][0] + 1, "".join(base for _, base in reference_columns))]
+        if reference_columns
+        else [],
+        [Block(alternate_columns[0][0], alternate_columns[-1][0] + 1, "".join(base for _, base in alternate_columns))]
+        if alternate_columns
+        else [],
     )
 
-    if base_can_merge and not should_split_mismatches:
-        blocks[-1] = merge_variant_blocks(peek_block, next_block)
-    else:
-        blocks.append(next_block)
 
-    return blocks
+def iter_variant_blocks(alignment: Alignment, split_consecutive_mismatches: bool = False) -> Iterator[VariantBlock]:
+    """
+    Generator version of generate_variant_blocks, yielding each VariantBlock as soon as the run of non-matching
+    columns it covers ends. Only the columns of the current run are held in memory, so the alignment can be walked
+    (and abandoned early) without materializing anything proportional to its length.
+
+    Adjacent non-matching columns are merged into one block (the rule of can_merge_variant_blocks, applied column by
+    column), unless split_consecutive_mismatches is set and the block so far is a single mismatch followed by another
+    one, keeping a chain of mismatches apart rather than a delins. Note that this is non-standard behavior according
+    to HGVS.
+    """
+    run_columns: list[tuple[int, int, str, int, str]] = []
+    for alignment_column in iter_alignment_columns(alignment):
+        _, _, reference_base, _, alternate_base = alignment_column
+        variant_base = make_variant_base(reference_base, alternate_base)
+        if variant_base == VARIANT_BASE_MATCH:
+            if run_columns:
+                yield make_run_variant_block(run_columns)
+                run_columns = []
+            continue
+
+        if (
+            split_consecutive_mismatches
+            and variant_base == VARIANT_BASE_MISMATCH
+            and len(run_columns) == 1
+            and make_variant_base(run_columns[0][2], run_columns[0][4]) == VARIANT_BASE_MISMATCH
+        ):
+            yield make_run_variant_block(run_columns)
+            run_columns = []
+
+        run_columns.append(alignment_column)
+
+    if run_columns:
+        yield make_run_variant_block(run_columns)
 
 
 def generate_variant_blocks(alignment: Alignment, split_consecutive_mismatches: bool = False) -> list[VariantBlock]:
@@ -140,51 +300,135 @@ def generate_variant_blocks(alignment: Alignment, split_consecutive_mismatches:
     which are not matches (mismatch, del or ins). These blocks will be categorized and converted into HGVS
     objects in a later step, but this intermediate representation is useful for debugging and testing.
 
-    This function uses functools.reduce in order to structure the problem of merging blocks
-    into a more understandable approach:
-    - We define the logic for when 2 VariantBlocks can be merged together, see can_merge_variant_blocks
-    - We define the logic for how to merge 2 VariantBlocks together, see merge_variant_blocks
-    - We define a reduce function that treats the accumulator like a stack, peeking the head, checking
-      for merge-ability and merging if possible at each iteration.
-    """
-    reference_indices = alignment.indices[0].tolist()
-    alternate_indices = alignment.indices[1].tolist()
-    bases_zipper = zip(alignment[0], alignment[1])
-
-    # First generate a VariantBlock for all positions in the Alignment along with the relevant sequence Blocks
-    single_position_variant_blocks = [
-        VariantBlock(
-            Block(idx, idx + 1, make_variant_base(reference_base, alternate_base)),
-            []
-            if reference_base == ALIGNMENT_GAP_CHAR
-            else [
-                Block(
-                    reference_indices[idx],
-                    reference_indices[idx] + 1,
-                    reference_base,
-                )
-            ],
-            []
-            if alternate_base == ALIGNMENT_GAP_CHAR
-            else [
-                Block(
-                    alternate_indices[idx],
-                    alternate_indices[idx] + 1,
-                    alternate_base,
-                )
-            ],
+    The alignment columns are walked in order, see iter_variant_blocks: every run of consecutive non-matching columns
+    becomes one VariantBlock, built directly from the columns it covers, so the result is the same as merging the
+    single column blocks of the run pairwise with merge_variant_blocks wherever can_merge_variant_blocks allows.
+    """
+    return list(iter_variant_blocks(alignment, split_consecutive_mismatches))
+
+
+def generate_alignment_variant_block_table(
+    alignment: Alignment, split_consecutive_mismatches: bool = False
+) -> VariantBlockTable:
+    """
+    Array based equivalent of generate_variant_blocks for a single alignment, returning its blocks as a
+    VariantBlockTable (with pair_index 0). Instead of merging single position blocks one at a time, the block
+    boundaries are found directly from the per-column variant bases:
+
+    - Every run of non-matching columns is one block, since blocks merge whenever they are adjacent and match free.
+    - With split_consecutive_mismatches, a block is only prevented from growing when it is a single mismatch and the
+      next column is a mismatch too. So each mismatch in the leading run of mismatches of a run starts a new block,
+      the last one of them taking the remainder of the run.
+
+    Reference and alternate positions come from the running count of non-gap columns in each row, a block without
+    any such column has no reference (or alternate) block.
+    """
+    import numpy as np
+
+    reference_aligned, alternate_aligned = alignment[0], alignment[1]
+    reference_columns = np.frombuffer(reference_aligned.encode(), dtype=np.uint8)
+    alternate_columns = np.frombuffer(alternate_aligned.encode(), dtype=np.uint8)
+    reference_gaps = reference_columns == ord(ALIGNMENT_GAP_CHAR)
+    alternate_gaps = alternate_columns == ord(ALIGNMENT_GAP_CHAR)
+
+    variant_bases = np.full(len(reference_columns), ord(VARIANT_BASE_MATCH), dtype=np.uint8)
+    is_variant = reference_columns != alternate_columns
+    variant_bases[is_variant] = ord(VARIANT_BASE_MISMATCH)
+    variant_bases[is_variant & reference_gaps] = ord(VARIANT_BASE_INSERTION)
+    variant_bases[is_variant & alternate_gaps] = ord(VARIANT_BASE_DELETION)
+
+    previous_is_variant = np.concatenate([[False], is_variant[:-1]])
+    next_is_variant = np.concatenate([is_variant[1:], [False]])
+    is_block_start = is_variant & ~previous_is_variant
+
+    if split_consecutive_mismatches:
+        is_mismatch = variant_bases == ord(VARIANT_BASE_MISMATCH)
+        # a column is in the leading mismatches of its run when no non-mismatch variant column precedes it in the run
+        breaks = np.cumsum(is_variant & ~is_mismatch)
+        run_starts = np.maximum.accumulate(np.where(is_block_start, np.arange(len(is_variant)), 0))
+        is_leading_mismatch = is_mismatch & (breaks == breaks[run_starts])
+        is_block_start[1:] |= is_leading_mismatch[1:] & is_leading_mismatch[:-1]
+
+    next_is_block_start = np.concatenate([is_block_start[1:], [False]])
+    starts = np.flatnonzero(is_block_start)
+    ends = np.flatnonzero(is_variant & (~next_is_variant | next_is_block_start)) + 1
+
+    reference_offsets = np.concatenate([[0], np.cumsum(~reference_gaps)]) + int(alignment.coordinates[0][0])
+    alternate_offsets = np.concatenate([[0], np.cumsum(~alternate_gaps)]) + int(alignment.coordinates[1][0])
+    reference_start, reference_end = reference_offsets[starts], reference_offsets[ends]
+    alternate_start, alternate_end = alternate_offsets[starts], alternate_offsets[ends]
+    has_reference = reference_start != reference_end
+    has_alternate = alternate_start != alternate_end
+
+    variant_bases_str = variant_bases.tobytes().decode()
+    reference_seq, alternate_seq = str(alignment.sequences[0].seq), str(alignment.sequences[1].seq)
+    bases = [
+        variant_bases_str[start:end] + reference_seq[ref_start:ref_end] + alternate_seq[alt_start:alt_end]
+        for start, end, ref_start, ref_end, alt_start, alt_end in zip(
+            starts.tolist(),
+            ends.tolist(),
+            reference_start.tolist(),
+            reference_end.tolist(),
+            alternate_start.tolist(),
+            alternate_end.tolist(),
         )
-        for idx, (reference_base, alternate_base) in enumerate(bases_zipper)
     ]
 
-    # use reduce with a helper function to merge valid/adjacent blocks together
-    wrapped_merge_func = partial(merge_reduce, split_consecutive_mismatches=split_consecutive_mismatches)
-    merged_blocks = reduce(wrapped_merge_func, single_position_variant_blocks[1:], [single_position_variant_blocks[0]])
+    return VariantBlockTable(
+        np.zeros(len(starts), dtype=np.int64),
+        starts.astype(np.int64),
+        ends.astype(np.int64),
+        np.where(has_reference, reference_start, MISSING_VALUE),
+        np.where(has_reference, reference_end, MISSING_VALUE),
+        np.where(has_alternate, alternate_start, MISSING_VALUE),
+        np.where(has_alternate, alternate_end, MISSING_VALUE),
+        bases="".join(bases),
+        bases_offsets=np.cumsum([0] + [len(row_bases) for row_bases in bases], dtype=np.int64),
+    )
 
-    # filter out the matches
-    return [
-        merged_block for merged_block in merged_blocks if VARIANT_BASE_MATCH not in merged_block.alignment_block.bases
-    ]
+
+def generate_variant_block_table(
+    alignments: Iterable[Alignment], split_consecutive_mismatches: bool = False
+) -> VariantBlockTable:
+    """
+    Bulk version of generate_variant_blocks, extracting the variant blocks of many alignments into a single
+    VariantBlockTable where pair_index is the position of the alignment in the input. table.variant_blocks(idx) gives
+    the same blocks as generate_variant_blocks(alignments[idx]).
+    """
+    tables = []
+    for pair_index, alignment in enumerate(alignments):
+        table = generate_alignment_variant_block_table(alignment, split_consecutive_mismatches)
+        table.pair_index += pair_index
+        tables.append(table)
+
+    return VariantBlockTable.concatenate(tables)
+
+
+def get_alignment_column_offsets(alignment: Alignment) -> np.ndarray:
+    """
+    Alignment column at which each segment of alignment.coordinates starts (plus the alignment length at the end),
+    computed from the coordinates alone, which is much cheaper than building the aligned sequences.
+    """
+    import numpy as np
+
+    segment_lengths = np.abs(np.diff(alignment.coordinates, axis=1)).max(axis=0)
+    return np.concatenate([[0], np.cumsum(segment_lengths)])
+
+
+def get_upstream_reference_position(alignment: Alignment, column_offsets: np.ndarray, anchor_position: int) -> int:
+    """
+    Position in the reference sequence of the first reference base at or after the alignment column anchor_position,
+    so reference_sequence[:position] are the bases upstream of it, see get_upstream_reference_sequence.
+    column_offsets are from get_alignment_column_offsets.
+    """
+    import numpy as np
+
+    reference_coordinates = alignment.coordinates[0]
+    segment = min(int(np.searchsorted(column_offsets, anchor_position, side="right")) - 1, len(column_offsets) - 2)
+    segment_reference_length = int(reference_coordinates[segment + 1] - reference_coordinates[segment])
+    return int(reference_coordinates[segment]) + min(
+        anchor_position - int(column_offsets[segment]), segment_reference_length
+    )
 
 
 def get_upstream_reference_sequence(alignment: Alignment, anchor_position: int, num_bases: int) -> str:
@@ -0,0 +1,689 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, TypeVar
+
+from palamedes import generate_alignment, generate_hgvs_variants, generate_variant_records
+from palamedes.align import generate_seq_records, make_aligner
+from palamedes.cache import make_cache_key
+from palamedes.config import (
+    DEFAULT_BATCH_CHUNK_SIZE,
+    DEFAULT_DEDUPLICATE_MAX_RESULTS,
+    DEFAULT_SCHEDULE_WINDOW_SIZE,
+    EXECUTOR_TYPE_PROCESS,
+    EXECUTOR_TYPE_SERIAL,
+    EXECUTOR_TYPE_THREAD,
+    EXECUTOR_TYPES,
+    MOLECULE_TYPE_PROTEIN,
+    REF_SEQUENCE_ID,
+    SCHEDULE_CHUNKS_PER_WORKER,
+)
+from palamedes.models import CollapsedPairResult, PairResult, SequencePair, ShardSpec
+
+if TYPE_CHECKING:
+    from Bio.Align import Alignment, PairwiseAligner
+
+    from palamedes.cache import ResultCache
+    from palamedes.intern import VariantInternTable
+    from palamedes.fasta import IndexedFasta
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# whether reduce_aligner was registered with the pickler of multiprocessing, see register_aligner_reducer
+_ALIGNER_REDUCER_REGISTERED = False
+
+
+def restore_aligner(state: dict[str, Any]) -> PairwiseAligner:
+    """Unpickle side of reduce_aligner"""
+    from Bio.Align import PairwiseAligner
+
+    aligner = PairwiseAligner()
+    aligner.__setstate__({key: value for key, value in state.items() if key != "epsilon"})
+    aligner.epsilon = state["epsilon"]
+    return aligner
+
+
+def reduce_aligner(aligner: PairwiseAligner) -> tuple[Any, ...]:
+    """
+    PairwiseAligner pickles without its epsilon (the tolerance used to treat scores as equal), so an aligner sent to a
+    worker process compares the float gap scores exactly and can return a different one of the equally scoring
+    alignments than the parent would. This reducer carries the epsilon along.
+    """
+    return restore_aligner, ({**aligner.__getstate__(), "epsilon": aligner.epsilon},)
+
+
+def register_aligner_reducer() -> None:
+    """
+    Make aligners sent to worker processes keep their epsilon, see reduce_aligner. The reducer is registered with the
+    pickler of multiprocessing, which is process wide, so this is only called when a process pool is created (by
+    make_executor or the supervised batch API), never on import, and registers it once.
+    """
+    from multiprocessing.reduction import ForkingPickler
+
+    from Bio.Align import PairwiseAligner
+
+    global _ALIGNER_REDUCER_REGISTERED
+    if not _ALIGNER_REDUCER_REGISTERED:
+        ForkingPickler.register(PairwiseAligner, reduce_aligner)
+        _ALIGNER_REDUCER_REGISTERED = True
+
+
+def make_executor(executor_type: str, max_workers: int | None = None) -> Executor:
+    """
+    Helper function to create the concurrent.futures Executor for the given executor_type (thread or process).
+    """
+    if executor_type == EXECUTOR_TYPE_THREAD:
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    if executor_type == EXECUTOR_TYPE_PROCESS:
+        register_aligner_reducer()
+        return ProcessPoolExecutor(max_workers=max_workers)
+
+    raise ValueError(f"Cannot create executor for type: {executor_type}, expected one of: {','.join(EXECUTOR_TYPES)}")
+
+
+def chunk_pairs(pairs: Iterable[SequencePair], chunk_size: int) -> Iterator[list[SequencePair]]:
+    """
+    Lazily split an iterable of pairs into lists of at most chunk_size pairs, without reading ahead of the
+    chunk being built.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got: {chunk_size}")
+
+    iterator = iter(pairs)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def generate_chunk_results(
+    chunk: list[SequencePair],
+    molecule_type: str,
+    aligner: PairwiseAligner,
+    use_non_standard_substitution_rules: bool,
+    compact: bool = False,
+) -> list[PairResult]:
+    """
+    Worker function for the batch APIs, running generate_hgvs_variants (or generate_variant_records when compact) over
+    every pair in the chunk using the same aligner. This runs in a thread or a worker process, so it must stay a
+    picklable module level function.
+    """
+    generate_func = generate_variant_records if compact else generate_hgvs_variants
+    return [
+        PairResult(
+            pair.pair_id,
+            generate_func(
+                pair.reference,
+                pair.alternate,
+                molecule_type=molecule_type,
+                aligner=aligner,
+                use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            ),
+        )
+        for pair in chunk
+    ]
+
+
+def make_pair_digest(pair: SequencePair) -> bytes:
+    """
+    Compact digest identifying pairs that produce identical variants within a batch: the reference id (used as the
+    accession of every variant), the reference sequence and the alternate sequence. Raw string references use the
+    same default id as generate_hgvs_variants.
+    """
+    reference_id = REF_SEQUENCE_ID if isinstance(pair.reference, str) else str(pair.reference.id)
+    reference_seq = pair.reference if isinstance(pair.reference, str) else str(pair.reference.seq)
+    alternate_seq = pair.alternate if isinstance(pair.alternate, str) else str(pair.alternate.seq)
+
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (reference_id, reference_seq, alternate_seq):
+        digest.update(part.encode())
+        digest.update(b"\0")
+
+    return digest.digest()
+
+
+def deduplicate_pairs(
+    pairs: Iterable[SequencePair],
+    run: Callable[[Iterable[SequencePair]], Iterator[PairResult]],
+    max_results: int = DEFAULT_DEDUPLICATE_MAX_RESULTS,
+) -> Iterator[PairResult]:
+    """
+    Run only the first occurrence of each distinct pair (see make_pair_digest) through run, fanning each result back
+    out to every duplicate, in input order. The input stays lazy: a pair is yielded as soon as the result for its
+    first occurrence is available. The variants of at most max_results distinct pairs are kept around for later
+    duplicates, least recently used first out, so a duplicate of a pair dropped since is run again.
+    """
+    # pair ids waiting to be yielded, each with a slot shared by the duplicates of a pair, filled with its variants
+    pending: deque[tuple[str, list[Any]]] = deque()
+    in_flight: deque[tuple[bytes, list[Any]]] = deque()
+    in_flight_slots: dict[bytes, list[Any]] = {}
+    results: OrderedDict[bytes, list[Any]] = OrderedDict()
+
+    def unique_pairs() -> Iterator[SequencePair]:
+        for pair in pairs:
+            digest = make_pair_digest(pair)
+            if (variants := results.get(digest)) is not None:
+                results.move_to_end(digest)
+                pending.append((pair.pair_id, [variants]))
+            elif (slot := in_flight_slots.get(digest)) is not None:
+                pending.append((pair.pair_id, slot))
+            else:
+                in_flight_slots[digest] = slot = []
+                in_flight.append((digest, slot))
+                pending.append((pair.pair_id, slot))
+                yield pair
+
+    def flush() -> Iterator[PairResult]:
+        while pending and pending[0][1]:
+            pair_id, slot = pending.popleft()
+            yield PairResult(pair_id, slot[0])
+
+    for pair_result in run(unique_pairs()):
+        digest, slot = in_flight.popleft()
+        del in_flight_slots[digest]
+        slot.append(pair_result.variants)
+        results[digest] = pair_result.variants
+        if len(results) > max_results:
+            results.popitem(last=False)
+
+        yield from flush()
+
+    yield from flush()
+
+
+def collapse_pairs(pairs: Iterable[SequencePair]) -> list[tuple[SequencePair, list[str]]]:
+    """
+    Hash-collapse identical pairs (see make_pair_digest), returning the first occurrence of each distinct pair with
+    the ids of every pair it stands for, in order of first occurrence.
+    """
+    collapsed: dict[bytes, tuple[SequencePair, list[str]]] = {}
+    for pair in pairs:
+        digest = make_pair_digest(pair)
+        if digest in collapsed:
+            collapsed[digest][1].append(pair.pair_id)
+        else:
+            collapsed[digest] = (pair, [pair.pair_id])
+
+    return list(collapsed.values())
+
+
+def generate_chunk_alignments(
+    chunk: list[SequencePair],
+    molecule_type: str,
+    aligner: PairwiseAligner,
+) -> list[tuple[str, Alignment]]:
+    """
+    Worker function for iter_alignments_batch, running generate_alignment over every pair in the chunk, keyed by the
+    pair_id. Raw string sequences get SeqRecords the same way generate_hgvs_variants does.
+    """
+    return [
+        (
+            pair.pair_id,
+            generate_alignment(
+                *generate_seq_records(pair.reference, pair.alternate, molecule_type),
+                molecule_type=molecule_type,
+                aligner=aligner,
+            ),
+        )
+        for pair in chunk
+    ]
+
+
+def run_inline(job: Callable[..., T], *args: Any) -> Future[T]:
+    """Stand in for Executor.submit which runs the job in the calling thread, returning a completed Future"""
+    future: Future[T] = Future()
+    future.set_result(job(*args))
+    return future
+
+
+def make_pair_cache_key(
+    pair: SequencePair,
+    molecule_type: str,
+    aligner: PairwiseAligner,
+    use_non_standard_substitution_rules: bool,
+) -> str:
+    """
+    Compute the ResultCache key of a pair, generating SeqRecords for raw strings the same way generate_hgvs_variants
+    does so that both share cache entries.
+    """
+    reference, alternate = generate_seq_records(pair.reference, pair.alternate, molecule_type)
+    return make_cache_key(reference, alternate, molecule_type, aligner, use_non_standard_substitution_rules)
+
+
+def dispatch_chunk(
+    chunk: list[SequencePair],
+    submit: Callable[..., Future[list[PairResult]]],
+    job: Callable[[list[SequencePair]], list[PairResult]],
+    cache_key_func: Callable[[SequencePair], str] | None = None,
+    cache: ResultCache | None = None,
+    compact: bool = False,
+    intern_table: VariantInternTable | None = None,
+) -> Callable[[], list[PairResult]]:
+    """
+    Submit a chunk of pairs for processing, returning a function which blocks until the results for the whole chunk
+    are available. When a cache is given, it is consulted here in the calling process, only the missing pairs
+    are submitted, and their results are stored once resolved. The cache holds VariantRecords (so the job must
+    produce them), which are materialized into SequenceVariants unless compact. When an intern table is given, the
+    job must also produce VariantRecords, which are interned and materialized through the table.
+    """
+    if (cache is None or cache_key_func is None) and intern_table is None:
+        return submit(job, chunk).result
+
+    keys = [cache_key_func(pair) for pair in chunk] if cache is not None and cache_key_func is not None else []
+    cached = {
+        idx: variants for idx, key in enumerate(keys) if cache is not None and (variants := cache.get(key)) is not None
+    }
+    missing_pairs = [pair for idx, pair in enumerate(chunk) if idx not in cached]
+    future = submit(job, missing_pairs) if missing_pairs else None
+
+    def resolve() -> list[PairResult]:
+        computed_results = iter(future.result() if future is not None else [])
+        results = []
+        for idx, pair in enumerate(chunk):
+            if idx in cached:
+                records = cached[idx]
+            else:
+                records = next(computed_results).variants
+                if cache is not None and keys:
+                    cache.put(keys[idx], records)
+
+            if intern_table is not None:
+                records = intern_table.intern_all(records)
+                variants = records if compact else intern_table.to_hgvs_all(records)
+            else:
+                variants = records if compact else [record.to_hgvs() for record in records]
+
+            results.append(PairResult(pair.pair_id, variants))
+
+        return results
+
+    return resolve
+
+
+def run_chunks(
+    chunks: Iterable[list[T]],
+    dispatch: Callable[..., Callable[[], list[R]]],
+    executor_type: str,
+    max_workers: int | None = None,
+) -> Iterator[R]:
+    """
+    Shared execution loop of the batch APIs. Each chunk is passed to dispatch along with a submit function (the
+    executor's, or run_inline for serial execution), which returns a function blocking until the chunk results are
+    available. At most two chunks per worker are in flight, results are yielded in input order and chunks that have
+    not started are cancelled if the caller stops early.
+    """
+    if executor_type == EXECUTOR_TYPE_SERIAL:
+        for chunk in chunks:
+            yield from dispatch(chunk, submit=run_inline)()
+        return
+
+    max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    executor = make_executor(executor_type, max_workers=max_workers)
+    in_flight: deque[Callable[[], list[R]]] = deque()
+    try:
+        for chunk in chunks:
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft()()
+
+            in_flight.append(dispatch(chunk, submit=executor.submit))
+
+        while in_flight:
+            yield from in_flight.popleft()()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def estimate_pair_cost(pair: SequencePair) -> int:
+    """Cost estimate of a pair, the number of dynamic programming cells of its alignment"""
+    return len(pair.reference) * len(pair.alternate)
+
+
+def schedule_chunks(costs: list[int], worker_count: int) -> list[list[int]]:
+    """
+    Split a window of pairs (their estimated costs, see estimate_pair_cost) into chunks of indices into the window,
+    returned most expensive first so they are dispatched longest processing time first. Chunks target an equal share
+    of the total cost, SCHEDULE_CHUNKS_PER_WORKER per worker: cheap pairs are packed together in input order into large
+    chunks, and pairs costing at least a share are chunks of their own, so a long pair neither holds back the short
+    pairs of its chunk nor starts last and leaves the other workers idle.
+    """
+    target_cost = max(1.0, sum(costs) / (SCHEDULE_CHUNKS_PER_WORKER * worker_count))
+    chunks: list[tuple[list[int], int]] = []
+    chunk: list[int] = []
+    chunk_cost = 0
+    for index, cost in enumerate(costs):
+        if cost >= target_cost:
+            chunks.append(([index], cost))
+            continue
+
+        chunk.append(index)
+        chunk_cost += cost
+        if chunk_cost >= target_cost:
+            chunks.append((chunk, chunk_cost))
+            chunk, chunk_cost = [], 0
+
+    if chunk:
+        chunks.append((chunk, chunk_cost))
+
+    return [chunk for chunk, _ in sorted(chunks, key=lambda chunk: chunk[1], reverse=True)]
+
+
+def run_scheduled_chunks(
+    pairs: Iterable[SequencePair],
+    dispatch: Callable[..., Callable[[], list[R]]],
+    executor_type: str,
+    max_workers: int | None = None,
+    window_size: int = DEFAULT_SCHEDULE_WINDOW_SIZE,
+) -> Iterator[R]:
+    """
+    Cost based counterpart of run_chunks. The input is read in windows of window_size pairs, each split into chunks by
+    schedule_chunks and dispatched longest first, and the results of a window are put back in input order before
+    being yielded. The next window is dispatched before waiting on the current one, so workers do not idle between
+    windows.
+    """
+    if executor_type == EXECUTOR_TYPE_SERIAL:
+        # a single worker finishes at the same time in any order
+        yield from run_chunks(chunk_pairs(pairs, window_size), dispatch, executor_type)
+        return
+
+    worker_count = max_workers or os.cpu_count() or 1
+    executor = make_executor(executor_type, max_workers=max_workers)
+
+    def submit_window(window: list[SequencePair]) -> list[tuple[list[int], Callable[[], list[R]]]]:
+        return [
+            (chunk, dispatch([window[index] for index in chunk], submit=executor.submit))
+            for chunk in schedule_chunks([estimate_pair_cost(pair) for pair in window], worker_count)
+        ]
+
+    def resolve_window(window_size: int, jobs: list[tuple[list[int], Callable[[], list[R]]]]) -> list[R]:
+        results: list[Any] = [None] * window_size
+        for chunk, resolve in jobs:
+            for index, result in zip(chunk, resolve()):
+                results[index] = result
+
+        return results
+
+    try:
+        pending = None
+        for window in chunk_pairs(pairs, window_size):
+            submitted = (len(window), submit_window(window))
+            if pending is not None:
+                yield from resolve_window(*pending)
+            pending = submitted
+
+        if pending is not None:
+            yield from resolve_window(*pending)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_hgvs_variants_batch(
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    cache: ResultCache | None = None,
+    deduplicate: bool = False,
+    compact: bool = False,
+    reference_fasta: IndexedFasta | str | None = None,
+    shard: ShardSpec | str | None = None,
+    schedule_by_cost: bool = False,
+    intern_table: VariantInternTable | None = None,
+    deduplicate_max_results: int = DEFAULT_DEDUPLICATE_MAX_RESULTS,
+) -> Iterator[PairResult]:
+    """
+    Run `generate_hgvs_variants` over an iterable of `SequencePair` objects, yielding a `PairResult` per pair in
+    input order. Pairs are grouped into chunks of `chunk_size` and dispatched to an executor:
+
+    - thread: A thread pool, which is cheap to start inside a host application. Every thread shares the same aligner
+      (the default one, or the one provided) and the pipeline holds no shared mutable state, so this is always safe.
+      Throughput scales with the amount of time the C aligner spends without the GIL, which is all of it on a
+      free-threaded CPython build.
+    - process: A process pool, which scales the whole pipeline across cores at the cost of process start up and of
+      pickling the pairs, the aligner and the results.
+    - serial: Run inline in the calling thread, useful for debugging and small inputs.
+
+    The input is consumed lazily and at most two chunks per worker are in flight at once, so memory stays bounded for
+    large inputs. When the caller stops iterating early, chunks that have not started yet are cancelled.
+
+    An optional `palamedes.cache.ResultCache` can be given as `cache`, it is consulted before dispatching each chunk
+    so only pairs without a cached result are aligned, for every executor type.
+
+    With `deduplicate=True`, pairs with the same reference id, reference sequence and alternate sequence are aligned
+    once, and the result is fanned back out to every duplicate pair_id. The results of the `deduplicate_max_results`
+    most recently seen distinct pairs are kept for their duplicates, so duplicates far apart in a large input may be
+    aligned again. See `iter_collapsed_hgvs_variants_batch` for one result per distinct pair, with its multiplicity,
+    instead.
+
+    With `reference_fasta` (a `palamedes.fasta.IndexedFasta`, or the path of a FASTA file), string references are read
+    as record ids of that file instead of sequences, and the records are read from the memory-mapped file on demand.
+
+    With `shard` (a `palamedes.models.ShardSpec`, or an "i/N" string), only the pairs assigned to that shard by a stable
+    hash of their pair_id are processed, so N independent runs over the same input cover it exactly once, see
+    `palamedes.shards`.
+
+    With `schedule_by_cost=True`, chunks are sized by the estimated cost of their pairs (the product of both lengths)
+    instead of `chunk_size`, for inputs mixing short and long sequences: short pairs are packed into large chunks and
+    long pairs are dispatched on their own, longest first, so no worker is left with the long tail while the others
+    idle. Results are still yielded in input order, see `run_scheduled_chunks`.
+
+    An optional `palamedes.intern.VariantInternTable` can be given as `intern_table`, for libraries where the same
+    variants occur in many results: structurally identical variants are then returned as the same (shared, so not to
+    be modified) object, and each is only built once. The table can be shared across calls, like a cache.
+
+    With `compact=True`, each `PairResult` holds `palamedes.models.VariantRecord` objects instead of `SequenceVariant`
+    objects. Records are much smaller to pickle back from a process pool and to hold in memory, and can be turned into
+    the full `SequenceVariant` with `record.to_hgvs()` when needed.
+
+    Note that a process pool may need to be created under an `if __name__ == "__main__":` guard, see the
+    multiprocessing docs for more information.
+
+    .. code-block:: python
+
+        >>> from palamedes.batch import iter_hgvs_variants_batch
+        >>> from palamedes.models import SequencePair
+        >>> pairs = [SequencePair("Jelleine-IV", "PFKISIHL", "TPFKISIH"), SequencePair("same", "PFKISIHL", "PFKISIHL")]
+        >>> list(iter_hgvs_variants_batch(pairs, max_workers=2))
+        [
+            PairResult(pair_id='Jelleine-IV', variants=[
+                SequenceVariant(ac=ref, type=p, posedit=Pro1extThr-1, gene=None),
+                SequenceVariant(ac=ref, type=p, posedit=Leu8del, gene=None),
+            ]),
+            PairResult(pair_id='same', variants=[]),
+        ]
+    """
+    if executor_type not in EXECUTOR_TYPES:
+        raise ValueError(f"Unsupported executor_type: {executor_type}, expected one of: {','.join(EXECUTOR_TYPES)}")
+
+    if shard is not None:
+        from palamedes.shards import filter_shard
+
+        pairs = filter_shard(pairs, shard)
+
+    if reference_fasta is not None:
+        from palamedes.fasta import resolve_reference_ids
+
+        pairs = resolve_reference_ids(pairs, reference_fasta, molecule_type=molecule_type)
+
+    if deduplicate:
+        yield from deduplicate_pairs(
+            pairs,
+            partial(
+                iter_hgvs_variants_batch,
+                molecule_type=molecule_type,
+                aligner=aligner,
+                use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+                executor_type=executor_type,
+                max_workers=max_workers,
+                chunk_size=chunk_size,
+                cache=cache,
+                compact=compact,
+                schedule_by_cost=schedule_by_cost,
+                intern_table=intern_table,
+            ),
+            max_results=deduplicate_max_results,
+        )
+        return
+
+    aligner = aligner if aligner is not None else make_aligner()
+    dispatch = partial(
+        dispatch_chunk,
+        job=partial(
+            generate_chunk_results,
+            molecule_type=molecule_type,
+            aligner=aligner,
+            use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            compact=compact or cache is not None or intern_table is not None,
+        ),
+        cache_key_func=None
+        if cache is None
+        else partial(
+            make_pair_cache_key,
+            molecule_type=molecule_type,
+            aligner=aligner,
+            use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+        ),
+        cache=cache,
+        compact=compact,
+        intern_table=intern_table,
+    )
+
+    if schedule_by_cost:
+        yield from run_scheduled_chunks(pairs, dispatch, executor_type, max_workers)
+    else:
+        yield from run_chunks(chunk_pairs(pairs, chunk_size), dispatch, executor_type, max_workers)
+
+
+def iter_alignments_batch(
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+) -> Iterator[tuple[str, Alignment]]:
+    """
+    Alignment only counterpart of `iter_hgvs_variants_batch`, yielding (pair_id, Alignment) tuples in input order. This
+    is used to fill an alignment store (see palamedes.store) which variants can be derived from later.
+    """
+    job = partial(
+        generate_chunk_alignments,
+        molecule_type=molecule_type,
+        aligner=aligner if aligner is not None else make_aligner(),
+    )
+    yield from run_chunks(
+        chunk_pairs(pairs, chunk_size),
+        lambda chunk, submit: submit(job, chunk).result,
+        executor_type,
+        max_workers,
+    )
+
+
+def generate_hgvs_variants_batch(
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    cache: ResultCache | None = None,
+    deduplicate: bool = False,
+    compact: bool = False,
+    reference_fasta: IndexedFasta | str | None = None,
+    shard: ShardSpec | str | None = None,
+    schedule_by_cost: bool = False,
+    intern_table: VariantInternTable | None = None,
+    deduplicate_max_results: int = DEFAULT_DEDUPLICATE_MAX_RESULTS,
+) -> list[PairResult]:
+    """
+    List version of `iter_hgvs_variants_batch`, see there for more information.
+    """
+    return list(
+        iter_hgvs_variants_batch(
+            pairs,
+            molecule_type=molecule_type,
+            aligner=aligner,
+            use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            executor_type=executor_type,
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+            cache=cache,
+            deduplicate=deduplicate,
+            compact=compact,
+            reference_fasta=reference_fasta,
+            shard=shard,
+            schedule_by_cost=schedule_by_cost,
+            intern_table=intern_table,
+            deduplicate_max_results=deduplicate_max_results,
+        )
+    )
+
+
+def iter_collapsed_hgvs_variants_batch(
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    cache: ResultCache | None = None,
+    compact: bool = False,
+    reference_fasta: IndexedFasta | str | None = None,
+    shard: ShardSpec | str | None = None,
+    schedule_by_cost: bool = False,
+    intern_table: VariantInternTable | None = None,
+) -> Iterator[CollapsedPairResult]:
+    """
+    Collapsed version of `iter_hgvs_variants_batch`, yielding one `CollapsedPairResult` per distinct pair (same
+    reference id, reference sequence and alternate sequence), in order of first occurrence, with the ids of every
+    input pair it covers. The whole input is read and collapsed before anything is dispatched, since the
+    multiplicity of a pair is only known at the end of the input.
+
+    .. code-block:: python
+
+        >>> from palamedes.batch import iter_collapsed_hgvs_variants_batch
+        >>> from palamedes.models import SequencePair
+        >>> pairs = [SequencePair(f"read-{idx}", "PFKISIHL", "PFKISIHA") for idx in range(3)]
+        >>> [(result.multiplicity, result.variants) for result in iter_collapsed_hgvs_variants_batch(pairs)]
+        [(3, [SequenceVariant(ac=ref, type=p, posedit=Leu8Ala, gene=None)])]
+    """
+    if shard is not None:
+        from palamedes.shards import filter_shard
+
+        pairs = filter_shard(pairs, shard)
+
+    if reference_fasta is not None:
+        from palamedes.fasta import resolve_reference_ids
+
+        pairs = resolve_reference_ids(pairs, reference_fasta, molecule_type=molecule_type)
+
+    collapsed_pairs = collapse_pairs(pairs)
+    LOGGER.debug("Collapsed input into %s distinct pairs", len(collapsed_pairs))
+
+    pair_results = iter_hgvs_variants_batch(
+        (pair for pair, _ in collapsed_pairs),
+        molecule_type=molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+        executor_type=executor_type,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+        cache=cache,
+        compact=compact,
+        schedule_by_cost=schedule_by_cost,
+        intern_table=intern_table,
+    )
+    for (_, pair_ids), pair_result in zip(collapsed_pairs, pair_results):
+        yield CollapsedPairResult(pair_ids, pair_result.variants)
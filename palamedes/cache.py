@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from palamedes.config import DEFAULT_CACHE_COMMIT_SIZE, DEFAULT_CACHE_MAX_DISK_BYTES, DEFAULT_CACHE_MAX_ENTRIES
+from palamedes.models import CacheStats, VariantRecord
+
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+
+LOGGER = logging.getLogger(__name__)
+
+# fraction of max_disk_bytes to shrink down to once the disk tier is over budget, to avoid evicting on every put
+DISK_EVICTION_TARGET_FRACTION: float = 0.9
+
+
+def aligner_fingerprint(aligner: PairwiseAligner) -> str:
+    """
+    Stable text representation of every parameter of a PairwiseAligner. The printed form of the aligner already lists
+    all scores and the mode, but a substitution matrix is only printed by its object address, so it is replaced by
+    the full matrix contents.
+    """
+    lines = [line for line in str(aligner).splitlines() if "substitution_matrix" not in line]
+    if aligner.substitution_matrix is not None:
+        lines.append(str(aligner.substitution_matrix))
+
+    return "\n".join(lines)
+
+
+def make_cache_key(
+    reference_seq_record: SeqRecord,
+    alternate_seq_record: SeqRecord,
+    molecule_type: str,
+    aligner: PairwiseAligner,
+    use_non_standard_substitution_rules: bool,
+) -> str:
+    """
+    Content address for the result of generate_variant_records, a sha256 over everything that can change the output:
+    the palamedes version, the molecule type, the substitution rule flag, the aligner parameters, both sequences and
+    the reference id (used as the accession of every variant). The alternate id does not appear in the output,
+    so it is left out, allowing identical alternates with different ids to share an entry.
+    """
+    from palamedes import __version__
+
+    digest = hashlib.sha256()
+    for part in (
+        __version__,
+        molecule_type,
+        str(use_non_standard_substitution_rules),
+        aligner_fingerprint(aligner),
+        str(reference_seq_record.id),
+        str(reference_seq_record.seq),
+        str(alternate_seq_record.seq),
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two tier cache for lists of VariantRecords (see generate_variant_records), keyed by make_cache_key:
+
+    - An in-process LRU tier holding at most max_entries results.
+    - An optional on-disk SQLite tier at path, which persists across runs and is kept under max_disk_bytes by
+      evicting the least recently used entries. Disk hits are promoted into the memory tier. Writes, including the
+      access times of disk hits, are buffered and committed every commit_size of them and on close, so entries added
+      since the last commit are lost if the process dies before closing the cache.
+
+    Hits and misses are counted per tier, see stats. The cache is safe to share between threads, while process
+    pools should consult it from the parent process (which is what the batch API does). Results are returned as new
+    lists, so callers can modify them without altering the cache. Entries are pickled, so only point path at a cache
+    file written by a trusted process.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        path: str | None = None,
+        max_disk_bytes: int = DEFAULT_CACHE_MAX_DISK_BYTES,
+        commit_size: int = DEFAULT_CACHE_COMMIT_SIZE,
+    ) -> None:
+        if max_entries < 0:
+            raise ValueError(f"max_entries cannot be negative, got: {max_entries}")
+
+        self._max_entries = max_entries
+        self._max_disk_bytes = max_disk_bytes
+        self._memory: OrderedDict[str, list[VariantRecord]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        self._commit_size = commit_size
+        self._pending_writes = 0
+        # access times of disk hits, written with the next commit
+        self._accessed: dict[str, float] = {}
+        self._connection: sqlite3.Connection | None = None
+        self._disk_bytes = 0
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            # a write ahead log only needs to sync on checkpoints, rather than on every commit
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._connection.commit()
+            self._disk_bytes = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def get(self, key: str) -> list[VariantRecord] | None:
+        """Lookup a result by key, checking memory then disk, returning None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return list(self._memory[key])
+
+            if self._connection is not None:
+                row = self._connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._accessed[key] = time.time()
+                    self._disk_hits += 1
+                    variants = pickle.loads(row[0])
+                    self._put_memory(key, variants)
+                    self._count_write()
+                    return list(variants)
+
+            self._misses += 1
+            return None
+
+    def put(self, key: str, variants: list[VariantRecord]) -> None:
+        """Store a result in both tiers, evicting as needed"""
+        with self._lock:
+            self._put_memory(key, list(variants))
+            if self._connection is not None:
+                self._put_disk(key, variants)
+                self._count_write()
+
+    def _put_memory(self, key: str, variants: list[VariantRecord]) -> None:
+        if self._max_entries == 0:
+            return
+
+        self._memory[key] = variants
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def _put_disk(self, key: str, variants: list[VariantRecord]) -> None:
+        assert self._connection is not None
+        value = pickle.dumps(variants, protocol=pickle.HIGHEST_PROTOCOL)
+        existing = self._connection.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, len(value), time.time()),
+        )
+        self._accessed.pop(key, None)
+        self._disk_bytes += len(value) - (existing[0] if existing else 0)
+
+        if self._disk_bytes > self._max_disk_bytes:
+            self._evict_disk()
+
+    def _count_write(self) -> None:
+        self._pending_writes += 1
+        if self._pending_writes >= self._commit_size:
+            self._commit()
+
+    def _write_accessed(self) -> None:
+        assert self._connection is not None
+        self._connection.executemany(
+            "UPDATE results SET accessed = ? WHERE key = ?",
+            [(accessed, key) for key, accessed in self._accessed.items()],
+        )
+        self._accessed.clear()
+
+    def _commit(self) -> None:
+        """Write the buffered access times and commit the disk tier"""
+        assert self._connection is not None
+        self._write_accessed()
+        self._connection.commit()
+        self._pending_writes = 0
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used rows until the disk tier is back under the target size"""
+        assert self._connection is not None
+        # recent hits must count when picking the least recently used entries
+        self._write_accessed()
+        target_bytes = self._max_disk_bytes * DISK_EVICTION_TARGET_FRACTION
+        evicted_keys = []
+        for key, size in self._connection.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if self._disk_bytes <= target_bytes:
+                break
+
+            evicted_keys.append((key,))
+            self._disk_bytes -= size
+
+        self._connection.executemany("DELETE FROM results WHERE key = ?", evicted_keys)
+        LOGGER.debug("Evicted %s entries from the disk cache", len(evicted_keys))
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                memory_hits=self._memory_hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                memory_entries=len(self._memory),
+                disk_bytes=self._disk_bytes,
+            )
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers, counters are left untouched"""
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._accessed.clear()
+                self._connection.execute("DELETE FROM results")
+                self._commit()
+                self._disk_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._commit()
+                self._connection.close()
+                self._connection = None
+
+    def __enter__(self) -> ResultCache:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
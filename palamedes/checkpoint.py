@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import IO, Any, Iterable, Iterator, Sequence
+
+from palamedes.config import (
+    CHECKPOINT_FORMAT_VERSION,
+    DEFAULT_CHECKPOINT_INTERVAL_SECONDS,
+    DEFAULT_CHECKPOINT_SEGMENT_SIZE,
+)
+from palamedes.models import SequencePair
+
+LOGGER = logging.getLogger(__name__)
+
+METADATA_FILE_NAME = "checkpoint.json"
+JOURNAL_FILE_NAME = "journal.jsonl"
+
+
+def segment_file_name(segment_index: int) -> str:
+    return f"segment-{segment_index:08d}.tsv"
+
+
+def write_file_atomically(path: str, content: str) -> None:
+    """Write content to a temporary file next to path and rename it into place, so path is never partially written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as handle:
+        handle.write(content)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+    os.replace(tmp_path, path)
+
+
+class BatchCheckpoint:
+    """
+    Checkpoint of a long batch run, so a run interrupted by a crash or a preempted node can resume where it stopped
+    instead of starting over. The checkpoint is a directory holding:
+
+    - checkpoint.json: format version and the settings of the run, a run can only be resumed with the same settings.
+    - segment-<n>.tsv: output lines of the pairs completed, written in segments, each atomically (written to a
+      temporary file and renamed into place).
+    - journal.jsonl: append-only journal, one line per segment once it is on disk, with the ids of the pairs it covers
+      and their variant counts. A segment only counts as completed once its journal line is written, and a journal
+      line torn by a crash is dropped on resume.
+
+    Results are buffered with add and committed as a segment once segment_size pairs are buffered or interval_seconds
+    have passed since the last commit, so at most that much work is lost. With resume=True, the journal of a previous
+    run in directory is loaded, and skip_completed drops the pairs it completed from the input.
+
+    .. code-block:: python
+
+        >>> from palamedes.batch import iter_hgvs_variants_batch
+        >>> from palamedes.checkpoint import BatchCheckpoint
+        >>> with BatchCheckpoint("run-checkpoint", resume=True) as checkpoint:
+        ...     for pair_result in iter_hgvs_variants_batch(checkpoint.skip_completed(pairs), compact=True):
+        ...         lines = [f"{pair_result.pair_id}\\t{record.format()}\\n" for record in pair_result.variants]
+        ...         checkpoint.add([pair_result.pair_id], lines, len(pair_result.variants))
+        >>> with open("variants.tsv", "w") as handle:
+        ...     checkpoint.write_output(handle)
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        settings: dict[str, Any] | None = None,
+        resume: bool = False,
+        segment_size: int = DEFAULT_CHECKPOINT_SEGMENT_SIZE,
+        interval_seconds: float = DEFAULT_CHECKPOINT_INTERVAL_SECONDS,
+    ) -> None:
+        if segment_size < 1:
+            raise ValueError(f"segment_size must be at least 1, got: {segment_size}")
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.settings = settings or {}
+        self.segment_size = segment_size
+        self.interval_seconds = interval_seconds
+        # variant count per completed pair id, and the committed segments in order
+        self.completed: dict[str, int] = {}
+        self.segments: list[str] = []
+
+        journal_path = os.path.join(directory, JOURNAL_FILE_NAME)
+        if os.path.exists(journal_path) and os.path.getsize(journal_path) > 0:
+            if not resume:
+                raise ValueError(f"{directory} already holds a checkpoint, resume it or use another directory")
+
+            self._check_metadata()
+            self._load_journal(journal_path)
+            LOGGER.debug("Resuming from %s, %s pairs already completed", directory, len(self.completed))
+
+        write_file_atomically(
+            os.path.join(directory, METADATA_FILE_NAME),
+            json.dumps({"format_version": CHECKPOINT_FORMAT_VERSION, "settings": self.settings}),
+        )
+        self._journal = open(journal_path, "a")
+        self._buffered_pairs: list[tuple[str, int]] = []
+        self._buffered_lines: list[str] = []
+        self._last_commit = time.monotonic()
+
+    def _check_metadata(self) -> None:
+        with open(os.path.join(self.directory, METADATA_FILE_NAME)) as handle:
+            metadata = json.load(handle)
+
+        if metadata["format_version"] != CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported checkpoint format version: {metadata['format_version']}, "
+                f"expected: {CHECKPOINT_FORMAT_VERSION}"
+            )
+
+        if metadata["settings"] != self.settings:
+            raise ValueError(f"Cannot resume {self.directory}, it was written with different settings")
+
+    def _load_journal(self, journal_path: str) -> None:
+        offset = 0
+        with open(journal_path, "rb") as handle:
+            for line in handle:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Unterminated journal line")
+
+                    entry = json.loads(line)
+                except ValueError:
+                    # the write of the last entry was interrupted, its segment is redone
+                    LOGGER.debug("Dropping torn journal entry at offset %s of %s", offset, journal_path)
+                    break
+
+                self.segments.append(entry["segment"])
+                self.completed.update((pair_id, variant_count) for pair_id, variant_count in entry["pairs"])
+                offset += len(line)
+
+        if offset < os.path.getsize(journal_path):
+            os.truncate(journal_path, offset)
+
+    def is_completed(self, pair_id: str) -> bool:
+        return pair_id in self.completed
+
+    def skip_completed(self, pairs: Iterable[SequencePair]) -> Iterator[SequencePair]:
+        """Lazily drop the pairs completed by a previous run"""
+        for pair in pairs:
+            if pair.pair_id not in self.completed:
+                yield pair
+
+    def add(self, pair_ids: Sequence[str], lines: Iterable[str], variant_count: int = 0) -> None:
+        """
+        Buffer the newline terminated output lines of a result covering pair_ids (several pairs for a collapsed
+        result), committing a segment when one is due.
+        """
+        self._buffered_pairs.extend((pair_id, variant_count) for pair_id in pair_ids)
+        self._buffered_lines.extend(lines)
+        if (
+            len(self._buffered_pairs) >= self.segment_size
+            or time.monotonic() - self._last_commit >= self.interval_seconds
+        ):
+            self.commit()
+
+    def commit(self) -> None:
+        """Write the buffered results as a new segment and journal it"""
+        self._last_commit = time.monotonic()
+        if not self._buffered_pairs:
+            return
+
+        segment = segment_file_name(len(self.segments))
+        write_file_atomically(os.path.join(self.directory, segment), "".join(self._buffered_lines))
+        self._journal.write(json.dumps({"segment": segment, "pairs": self._buffered_pairs}) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+        self.segments.append(segment)
+        self.completed.update(self._buffered_pairs)
+        LOGGER.debug("Committed %s pairs to %s", len(self._buffered_pairs), segment)
+        self._buffered_pairs = []
+        self._buffered_lines = []
+
+    def iter_output_lines(self) -> Iterator[str]:
+        """Output lines of every committed segment, in the order they were committed"""
+        for segment in self.segments:
+            with open(os.path.join(self.directory, segment)) as handle:
+                yield from handle
+
+    def write_output(self, handle: IO[str]) -> None:
+        handle.writelines(self.iter_output_lines())
+
+    def close(self) -> None:
+        """Commit the buffered results, results added after an error are complete and are kept too"""
+        if self._journal.closed:
+            return
+
+        self.commit()
+        self._journal.close()
+
+    def __enter__(self) -> BatchCheckpoint:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
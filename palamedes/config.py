@@ -6,6 +6,93 @@ DEFAULT_MISMATCH_SCORE: int = -1
 DEFAULT_OPEN_GAP_SCORE: int = -1
 DEFAULT_EXTEND_GAP_SCORE: float = -0.1
 
+# alignment columns from which variant blocks are extracted and categorized with array operations (see
+# palamedes.tables) rather than walking the columns, which wins past about 1,000 columns once numpy is warmed up
+VARIANT_BLOCK_TABLE_MIN_COLUMNS: int = 2000
+
+# default number of pairs in flight at once for the async API
+DEFAULT_MAX_CONCURRENCY: int = 8
+
+# batch execution, pairs are sent to the executor in chunks to amortize dispatch overhead
+EXECUTOR_TYPE_THREAD: str = "thread"
+EXECUTOR_TYPE_PROCESS: str = "process"
+EXECUTOR_TYPE_SERIAL: str = "serial"
+EXECUTOR_TYPES: tuple[str, ...] = (EXECUTOR_TYPE_THREAD, EXECUTOR_TYPE_PROCESS, EXECUTOR_TYPE_SERIAL)
+DEFAULT_BATCH_CHUNK_SIZE: int = 16
+# results of distinct pairs kept for later duplicates with deduplicate=True, least recently used ones are dropped
+DEFAULT_DEDUPLICATE_MAX_RESULTS: int = 100_000
+# cost based scheduling, pairs planned at once, and chunks planned per worker (smaller chunks balance better)
+DEFAULT_SCHEDULE_WINDOW_SIZE: int = 1024
+SCHEDULE_CHUNKS_PER_WORKER: int = 4
+
+# input pipeline, records per batch handed over by the reader thread and batches it may read ahead
+DEFAULT_PREFETCH_BATCH_SIZE: int = 256
+DEFAULT_PREFETCH_MAX_BATCHES: int = 8
+
+# all-vs-all mode, references and alternates per side of a tile of the pair matrix
+DEFAULT_MATRIX_TILE_SIZE: int = 32
+
+# version of the on-disk layout written by palamedes.store.AlignmentStoreWriter
+ALIGNMENT_STORE_FORMAT_VERSION: int = 1
+
+# version of the per-shard manifests written by palamedes.shards
+SHARD_MANIFEST_FORMAT_VERSION: int = 1
+
+# batch checkpoints, results are committed in segments of this many pairs, or after this many seconds
+CHECKPOINT_FORMAT_VERSION: int = 1
+DEFAULT_CHECKPOINT_SEGMENT_SIZE: int = 1000
+DEFAULT_CHECKPOINT_INTERVAL_SECONDS: float = 60.0
+
+# alignment strategies picked per pair by palamedes.planner
+ALIGNMENT_STRATEGY_IDENTICAL: str = "identical"
+ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY: str = "substitution_only"
+ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING: str = "dynamic_programming"
+ALIGNMENT_STRATEGY_UNGAPPED: str = "ungapped"
+ALIGNMENT_STRATEGY_REFUSED: str = "refused"
+# peak memory of a global alignment per dynamic programming cell, an upper estimate: benchmarks.dp_memory measures
+# how much the peak address space and resident memory of a fresh process grow aligning random protein pairs of 1,000
+# to 8,000 residues, about 2 bytes per cell with the default (affine) gap scores and Biopython 1.83 (1 byte with
+# linear ones), but up to 4 bytes per cell have been seen with other builds, so this leaves some margin on top
+DP_BYTES_PER_CELL: int = 5
+
+# version of the SQLite layout written by palamedes.variant_index, and inputs added between commits
+VARIANT_INDEX_FORMAT_VERSION: int = 1
+DEFAULT_VARIANT_INDEX_COMMIT_SIZE: int = 1000
+
+# variant aggregation, counts are spilled to disk past the budget, memory per distinct variant measured with tracemalloc
+DEFAULT_AGGREGATE_MEMORY_BUDGET_BYTES: int = 512 * 1024**2
+AGGREGATE_BYTES_PER_ENTRY: int = 200
+
+# reasons a pair failed in the supervised batch API
+PAIR_FAILURE_TIMEOUT: str = "timeout"
+PAIR_FAILURE_MEMORY: str = "memory"
+PAIR_FAILURE_CRASH: str = "crash"
+PAIR_FAILURE_ERROR: str = "error"
+# reason written to --failed-pairs for pairs processed with the ungapped fallback
+PAIR_FALLBACK: str = "fallback"
+
+# result cache limits, entries for the in-process tier and bytes for the on-disk tier
+DEFAULT_CACHE_MAX_ENTRIES: int = 10_000
+DEFAULT_CACHE_MAX_DISK_BYTES: int = 1024**3
+# writes (puts and access times of disk hits) buffered before the on-disk tier commits, it also commits on close
+DEFAULT_CACHE_COMMIT_SIZE: int = 1000
+
+# distinct variants interned per reference in the batch API, see palamedes.intern.VariantInternTable
+DEFAULT_INTERN_MAX_ENTRIES: int = 100_000
+
+# indexed FASTA files kept open by a process for the references unpickled from them, least recently used ones are
+# dropped, and bytes of reversed records each file keeps for the aligner, see palamedes.fasta.IndexedFasta
+MAX_OPEN_FASTA_FILES: int = 16
+FASTA_REVERSED_CACHE_MAX_BYTES: int = 64 * 1024**2
+
+# nearest reference assignment, k-mer length of the reference index and number of candidates confirmed by alignment
+DEFAULT_KMER_SIZE: int = 3
+DEFAULT_SHORTLIST_SIZE: int = 5
+
+# mutational scanning libraries, residues substituted by default and designs cross-checked against an alignment
+STANDARD_AMINO_ACIDS: str = "ACDEFGHIKLMNPQRSTVWY"
+DEFAULT_SCAN_CHECK_SAMPLE_SIZE: int = 100
+
 REF_SEQUENCE_ID: str = "ref"
 ALT_SEQUENCE_ID: str = "alt"
 
@@ -24,6 +111,18 @@ HGVS_VARIANT_TYPE_REPEAT: str = "repeat"
 HGVS_VARIANT_TYPE_INSERTION: str = "insertion"
 HGVS_VARIANT_TYPE_DELETION_INSERTION: str = "deletion_insertion"
 
+# compact integer codes for the variant types, the index into this tuple
+HGVS_VARIANT_TYPES: tuple[str, ...] = (
+    HGVS_VARIANT_TYPE_SUBSTITUTION,
+    HGVS_VARIANT_TYPE_DELETION,
+    HGVS_VARIANT_TYPE_EXTENSION,
+    HGVS_VARIANT_TYPE_DUPLICATION,
+    HGVS_VARIANT_TYPE_REPEAT,
+    HGVS_VARIANT_TYPE_INSERTION,
+    HGVS_VARIANT_TYPE_DELETION_INSERTION,
+)
+HGVS_VARIANT_TYPE_CODES: dict[str, int] = {hgvs_type: code for code, hgvs_type in enumerate(HGVS_VARIANT_TYPES)}
+
 MOLECULE_TYPE_ANNOTATION_KEY: str = "molecule_type"
 MOLECULE_TYPE_PROTEIN: str = "protein"
 HGVS_TYPE_PROTEIN: str = "p"
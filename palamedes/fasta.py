@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, Iterator
+
+from Bio.Seq import Seq, SequenceDataAbstractBaseClass
+from Bio.SeqRecord import SeqRecord
+
+from palamedes.config import (
+    FASTA_REVERSED_CACHE_MAX_BYTES,
+    MAX_OPEN_FASTA_FILES,
+    MOLECULE_TYPE_ANNOTATION_KEY,
+    MOLECULE_TYPE_PROTEIN,
+)
+from palamedes.models import FastaIndexEntry, SequencePair
+
+LOGGER = logging.getLogger(__name__)
+
+FASTA_INDEX_SUFFIX = ".fai"
+
+# files opened by this process, keyed by absolute path and molecule type, so unpickling references from the same
+# file many times in a worker (once per chunk of pairs) maps and indexes it only once. At most MAX_OPEN_FASTA_FILES
+# are kept, the least recently used one is dropped (not closed, records still holding it keep reading from it, and
+# its mapping goes away with the last of them)
+_OPEN_FASTA_FILES: OrderedDict[tuple[str, str], IndexedFasta] = OrderedDict()
+
+
+def build_fasta_index(path: str) -> list[FastaIndexEntry]:
+    """
+    Scan a FASTA file into faidx index entries, one per record, named by the first word of the title line like
+    iter_fasta_seq_records. As with samtools faidx, every line of a record but the last must have the same length.
+    """
+    entries = []
+    name: str | None = None
+    length = sequence_offset = line_bases = line_width = 0
+    last_line_seen = False
+
+    def finish_record() -> None:
+        if name is not None:
+            entries.append(FastaIndexEntry(name, length, sequence_offset, line_bases, line_width))
+
+    offset = 0
+    with open(path, "rb") as handle:
+        for line in handle:
+            offset += len(line)
+            if line.startswith(b">"):
+                finish_record()
+                name = line[1:].split(None, 1)[0].decode() if line[1:].strip() else ""
+                length = line_bases = line_width = 0
+                sequence_offset = offset
+                last_line_seen = False
+                continue
+
+            bases = len(line.rstrip(b"\r\n"))
+            if name is None:
+                if bases:
+                    raise ValueError(f"Cannot index {path}, sequence found before the first title line")
+                continue
+
+            if bases == 0:
+                last_line_seen = True
+                continue
+
+            if last_line_seen or (line_bases and bases > line_bases):
+                raise ValueError(f"Cannot index {path}, record {name} has lines of different lengths")
+
+            if not line_bases:
+                line_bases, line_width = bases, len(line)
+            elif bases < line_bases or len(line) != line_width:
+                last_line_seen = True
+
+            length += bases
+
+    finish_record()
+    if len({entry.name for entry in entries}) != len(entries):
+        raise ValueError(f"Cannot index {path}, record ids must be unique")
+
+    return entries
+
+
+def write_fasta_index(path: str, entries: Iterable[FastaIndexEntry]) -> None:
+    """Write entries in the samtools .fai format, so the index can be shared with other tools"""
+    with open(path, "w") as handle:
+        for entry in entries:
+            handle.write("\t".join(str(value) for value in entry) + "\n")
+
+
+def read_fasta_index(path: str) -> list[FastaIndexEntry]:
+    with open(path) as handle:
+        return [
+            FastaIndexEntry(name, int(length), int(offset), int(line_bases), int(line_width))
+            for name, length, offset, line_bases, line_width, *_ in (line.rstrip("\n").split("\t") for line in handle)
+        ]
+
+
+def open_indexed_fasta(path: str, molecule_type: str = MOLECULE_TYPE_PROTEIN) -> IndexedFasta:
+    """Unpickle side of IndexedFasta, returns the file already opened by this process if there is one"""
+    key = (os.path.abspath(path), molecule_type)
+    if (fasta := _OPEN_FASTA_FILES.get(key)) is None:
+        fasta = IndexedFasta(path, molecule_type=molecule_type)
+    else:
+        _OPEN_FASTA_FILES.move_to_end(key)
+
+    return fasta
+
+
+def register_indexed_fasta(fasta: IndexedFasta) -> None:
+    _OPEN_FASTA_FILES[(fasta.path, fasta.molecule_type)] = fasta
+    _OPEN_FASTA_FILES.move_to_end((fasta.path, fasta.molecule_type))
+    while len(_OPEN_FASTA_FILES) > MAX_OPEN_FASTA_FILES:
+        _OPEN_FASTA_FILES.popitem(last=False)
+
+
+class MappedSequenceData(SequenceDataAbstractBaseClass):
+    """
+    Biopython sequence content provider reading one record of an IndexedFasta from the memory-mapped file on demand,
+    so only the requested region is ever read. Seq objects built on it pickle as the file path and index entry, and
+    palamedes.align.get_reversed_sequence hands the aligner the reversed form kept by the file.
+    """
+
+    __slots__ = ("fasta", "entry")
+
+    def __init__(self, fasta: IndexedFasta, entry: FastaIndexEntry) -> None:
+        self.fasta = fasta
+        self.entry = entry
+        super().__init__()
+
+    def __len__(self) -> int:
+        return self.entry.length
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.entry.length)
+            if step == 1:
+                return bytes(self.fasta.read(self.entry, start, max(start, stop)))
+
+            return bytes(self.fasta.read(self.entry, 0, self.entry.length))[key]
+
+        position = key + self.entry.length if key < 0 else key
+        if not 0 <= position < self.entry.length:
+            raise IndexError("sequence index out of range")
+
+        return self.fasta.read(self.entry, position, position + 1)[0]
+
+    def reversed_sequence(self) -> bytes:
+        return self.fasta.reversed_sequence(self.entry)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return MappedSequenceData, (self.fasta, self.entry)
+
+
+class IndexedFasta:
+    """
+    Random access to the records of a FASTA file by id, without parsing the file into SeqRecords up front. The file
+    is memory-mapped and located through a faidx style index, read from the .fai file next to it when it is up to
+    date, or built by scanning the file once and saved there (when the directory is writable) for the next run.
+
+    Records are handed out as SeqRecords whose sequence is read from the mapping on demand (see seq_record), which
+    can be used anywhere a reference SeqRecord is, including the batch APIs with a process pool, where they pickle as
+    the file path and index entry and are read from the same file by the workers. The reversed sequences handed to
+    the aligner (see reversed_sequence) are kept for the most recently aligned records, up to reversed_cache_max_bytes,
+    so a reference aligned against many alternates is only read and reversed once.
+
+    .. code-block:: python
+
+        >>> from palamedes import generate_hgvs_variants
+        >>> from palamedes.fasta import IndexedFasta
+        >>> proteome = IndexedFasta("proteome.fasta")
+        >>> generate_hgvs_variants(proteome.seq_record("Jelleine-I"), "PFKIGSIHL")
+    """
+
+    def __init__(
+        self,
+        path: str,
+        molecule_type: str = MOLECULE_TYPE_PROTEIN,
+        reversed_cache_max_bytes: int = FASTA_REVERSED_CACHE_MAX_BYTES,
+    ) -> None:
+        self.path = os.path.abspath(path)
+        self.molecule_type = molecule_type
+        self.reversed_cache_max_bytes = reversed_cache_max_bytes
+        self._reversed: OrderedDict[str, bytes] = OrderedDict()
+        self._reversed_bytes = 0
+        self._reversed_lock = threading.Lock()
+        self.entries = self._load_index()
+        self._entries_by_name = {entry.name: entry for entry in self.entries}
+
+        self._handle = open(self.path, "rb")
+        self._mmap: mmap.mmap | None = None
+        if os.path.getsize(self.path) > 0:
+            self._mmap = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._buffer: memoryview | None = memoryview(self._mmap) if self._mmap is not None else memoryview(b"")
+        register_indexed_fasta(self)
+
+    def _load_index(self) -> list[FastaIndexEntry]:
+        index_path = self.path + FASTA_INDEX_SUFFIX
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(self.path):
+            return read_fasta_index(index_path)
+
+        entries = build_fasta_index(self.path)
+        try:
+            write_fasta_index(index_path, entries)
+        except OSError as error:
+            LOGGER.debug("Could not save FASTA index %s: %s", index_path, error)
+
+        LOGGER.debug("Indexed %s records of %s", len(entries), self.path)
+        return entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, seq_id: object) -> bool:
+        return seq_id in self._entries_by_name
+
+    def __iter__(self) -> Iterator[SeqRecord]:
+        for entry in self.entries:
+            yield self.seq_record(entry.name)
+
+    @property
+    def ids(self) -> list[str]:
+        return [entry.name for entry in self.entries]
+
+    def entry(self, seq_id: str) -> FastaIndexEntry:
+        if (entry := self._entries_by_name.get(seq_id)) is None:
+            raise KeyError(f"Record not found in {self.path}: {seq_id}")
+
+        return entry
+
+    def read(self, entry: FastaIndexEntry, start: int, end: int) -> memoryview | bytes:
+        """
+        Residues start:end of a record, as a zero-copy view of the mapping when the region sits on a single line of
+        the file, or joined from each line it spans otherwise.
+        """
+        if self._buffer is None:
+            raise ValueError(f"Indexed FASTA {self.path} is closed")
+
+        if start >= end:
+            return b""
+
+        def file_offset(position: int) -> int:
+            return entry.offset + position // entry.line_bases * entry.line_width + position % entry.line_bases
+
+        if start // entry.line_bases == (end - 1) // entry.line_bases:
+            return self._buffer[file_offset(start) : file_offset(end - 1) + 1]
+
+        line_starts = range(start - start % entry.line_bases, end, entry.line_bases)
+        return b"".join(
+            self._buffer[
+                file_offset(max(start, line_start)) : file_offset(min(end, line_start + entry.line_bases) - 1) + 1
+            ]
+            for line_start in line_starts
+        )
+
+    def sequence(self, seq_id: str) -> memoryview | bytes:
+        """Encoded sequence of a record, zero-copy for single line records, see read"""
+        entry = self.entry(seq_id)
+        return self.read(entry, 0, entry.length)
+
+    def reversed_sequence(self, entry: FastaIndexEntry) -> bytes:
+        """
+        Encoded sequence of a record reversed, as fed to the aligner, kept for the most recently used records up to
+        reversed_cache_max_bytes, records larger than that are reversed on every call.
+        """
+        with self._reversed_lock:
+            if (reversed_data := self._reversed.get(entry.name)) is not None:
+                self._reversed.move_to_end(entry.name)
+                return reversed_data
+
+        reversed_data = bytes(self.read(entry, 0, entry.length))[::-1]
+        if len(reversed_data) > self.reversed_cache_max_bytes:
+            return reversed_data
+
+        with self._reversed_lock:
+            if entry.name not in self._reversed:
+                self._reversed[entry.name] = reversed_data
+                self._reversed_bytes += len(reversed_data)
+
+            while self._reversed_bytes > self.reversed_cache_max_bytes:
+                self._reversed_bytes -= len(self._reversed.popitem(last=False)[1])
+
+        return reversed_data
+
+    def seq_record(self, seq_id: str) -> SeqRecord:
+        """SeqRecord of a record, its sequence is read from the mapping on demand"""
+        return SeqRecord(
+            Seq(MappedSequenceData(self, self.entry(seq_id))),
+            id=seq_id,
+            annotations={MOLECULE_TYPE_ANNOTATION_KEY: self.molecule_type},
+        )
+
+    def close(self) -> None:
+        if self._buffer is None:
+            return
+
+        self._buffer.release()
+        self._buffer = None
+        with self._reversed_lock:
+            self._reversed.clear()
+            self._reversed_bytes = 0
+
+        if _OPEN_FASTA_FILES.get((self.path, self.molecule_type)) is self:
+            del _OPEN_FASTA_FILES[(self.path, self.molecule_type)]
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # views handed out by read and sequence are still alive, the mapping goes away with them
+                LOGGER.debug("Indexed FASTA %s still has exported views, leaving it mapped", self.path)
+
+        self._handle.close()
+
+    def __enter__(self) -> IndexedFasta:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return open_indexed_fasta, (self.path, self.molecule_type)
+
+
+def resolve_reference_ids(
+    pairs: Iterable[SequencePair], reference_fasta: IndexedFasta | str, molecule_type: str = MOLECULE_TYPE_PROTEIN
+) -> Iterator[SequencePair]:
+    """
+    Replace the string references of pairs, read as record ids of reference_fasta (an IndexedFasta or a path to one),
+    by the matching lazily read SeqRecords, SeqRecord references are passed through as is.
+    """
+    if isinstance(reference_fasta, str):
+        reference_fasta = open_indexed_fasta(reference_fasta, molecule_type=molecule_type)
+
+    for pair in pairs:
+        if isinstance(pair.reference, str):
+            pair = pair._replace(reference=reference_fasta.seq_record(pair.reference))
+
+        yield pair
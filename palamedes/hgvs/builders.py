@@ -1,3 +1,8 @@
+from functools import cached_property
+from typing import Callable, ClassVar, Iterable
+
+import numpy as np
+
 from Bio.Align import Alignment
 from hgvs.edit import (
     Repeat,
@@ -10,8 +15,8 @@ from hgvs.posedit import PosEdit
 from hgvs.location import Interval, AAPosition
 from hgvs.sequencevariant import SequenceVariant
 
-from palamedes.align import get_upstream_reference_sequence
-from palamedes.models import VariantBlock
+from palamedes.align import get_alignment_column_offsets, get_upstream_reference_position
+from palamedes.models import VariantBlock, VariantRecord
 from palamedes.config import (
     HGVS_VARIANT_TYPE_SUBSTITUTION,
     HGVS_VARIANT_TYPE_DELETION,
@@ -20,124 +25,173 @@ from palamedes.config import (
     HGVS_VARIANT_TYPE_REPEAT,
     HGVS_VARIANT_TYPE_INSERTION,
     HGVS_VARIANT_TYPE_DELETION_INSERTION,
+    HGVS_VARIANT_TYPE_CODES,
     HGVS_TYPE_PROTEIN,
     MOLECULE_TYPE_PROTEIN,
 )
 from palamedes.utils import yield_repeating_substrings, zbho_to_obfc, zb_to_ob, zb_position_to_end_coordinate
 
+SUBSTITUTION_CODE = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_SUBSTITUTION]
+DELETION_CODE = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_DELETION]
+EXTENSION_CODE = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_EXTENSION]
+DUPLICATION_CODE = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_DUPLICATION]
+REPEAT_CODE = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_REPEAT]
+INSERTION_CODE = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_INSERTION]
+DELETION_INSERTION_CODE = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_DELETION_INSERTION]
+
 
 class HgvsProteinBuilder:
+    """
+    Builds protein variants for the variant blocks of a single alignment. The build logic produces compact
+    VariantRecord objects (see build_record), which are turned into hgvs SequenceVariant objects by
+    to_sequence_variant, build does both.
+
+    The alignment lookups used by the build logic (the alignment column of each coordinate segment and the reference
+    sequence) are computed once, on first use, and shared by every variant of the alignment. Reference positions are
+    derived from the coordinates, so nothing proportional to the alignment length (like alignment.indices or the
+    aligned sequences) is built. Use build_many to build all the variants of an alignment in one pass.
+    """
+
     def __init__(self, alignment: Alignment) -> None:
         self._alignment = alignment
 
+    @cached_property
+    def _accession(self) -> str:
+        return self._alignment.target.id
+
+    @cached_property
+    def _column_offsets(self) -> np.ndarray:
+        return get_alignment_column_offsets(self._alignment)
+
+    @cached_property
+    def _reference_sequence(self) -> str:
+        return str(self._alignment.target.seq)
+
+    def _get_upstream_reference_position(self, anchor_position: int) -> int:
+        """
+        Reference index of the first reference base at or after the alignment column anchor_position, the bases
+        before it are upstream. See palamedes.align.get_upstream_reference_position.
+        """
+        return get_upstream_reference_position(self._alignment, self._column_offsets, anchor_position)
+
     def build(self, variant_block: VariantBlock, hgvs_type: str) -> SequenceVariant:
-        pos_edit_builder_funcs = {
-            HGVS_VARIANT_TYPE_SUBSTITUTION: self._build_substitution,
-            HGVS_VARIANT_TYPE_DELETION: self._build_deletion,
-            HGVS_VARIANT_TYPE_INSERTION: self._build_insertion,
-            HGVS_VARIANT_TYPE_EXTENSION: self._build_extension,
-            HGVS_VARIANT_TYPE_DUPLICATION: self._build_duplication,
-            HGVS_VARIANT_TYPE_REPEAT: self._build_repeat,
-            HGVS_VARIANT_TYPE_DELETION_INSERTION: self._build_deletion_insertion,
-        }
-        pos_edit = pos_edit_builder_funcs[hgvs_type](variant_block)
-
-        return SequenceVariant(ac=self._alignment.target.id, type=HGVS_TYPE_PROTEIN, posedit=pos_edit)
-
-    def _build_substitution(self, variant_block: VariantBlock) -> PosEdit:
+        return self.to_sequence_variant(self.build_record(variant_block, hgvs_type))
+
+    def build_record(self, variant_block: VariantBlock, hgvs_type: str) -> VariantRecord:
+        return self.RECORD_BUILDERS[hgvs_type](self, variant_block)
+
+    def build_many(self, variant_blocks: Iterable[VariantBlock], hgvs_types: Iterable[str]) -> list[VariantRecord]:
+        """
+        Build the records for many variant blocks of the alignment in one pass, each with the matching hgvs type (as
+        returned by categorize_variant_block or categorize_variant_block_table).
+        """
+        record_builders = self.RECORD_BUILDERS
+        return [
+            record_builders[hgvs_type](self, variant_block)
+            for variant_block, hgvs_type in zip(variant_blocks, hgvs_types, strict=True)
+        ]
+
+    @staticmethod
+    def to_sequence_variant(record: VariantRecord) -> SequenceVariant:
+        """
+        Materialize a VariantRecord into the full SequenceVariant, building the Interval and the edit object for the
+        record category. See VariantRecord for how each category uses the ref, alt and length fields.
+        """
+        if record.category == SUBSTITUTION_CODE:
+            start_aa, end_aa = record.ref, record.ref
+            edit = AASub(ref=record.ref, alt=record.alt)
+        elif record.category == INSERTION_CODE:
+            start_aa, end_aa = record.ref[0], record.ref[-1]
+            edit = AARefAlt(ref=None, alt=record.alt)
+        elif record.category == EXTENSION_CODE:
+            start_aa, end_aa = record.ref, record.ref
+            edit = AAExt(ref=record.ref, aaterm=record.alt, length=record.length)
+        else:
+            start_aa, end_aa = record.ref[0], record.ref[-1]
+            if record.category == DELETION_CODE:
+                edit = AARefAlt(ref=record.ref, alt=None)
+            elif record.category == DUPLICATION_CODE:
+                edit = Dup()
+            elif record.category == REPEAT_CODE:
+                edit = Repeat(min=record.length, max=record.length)
+            else:
+                edit = AARefAlt(ref=record.ref, alt=record.alt)
+
+        pos_edit = PosEdit(
+            pos=Interval(
+                start=AAPosition(base=record.start, aa=start_aa),
+                end=AAPosition(base=record.end, aa=end_aa),
+            ),
+            edit=edit,
+        )
+        return SequenceVariant(ac=record.accession, type=HGVS_TYPE_PROTEIN, posedit=pos_edit)
+
+    def _build_substitution(self, variant_block: VariantBlock) -> VariantRecord:
         """
         Protein substitution build logic, this is a fairly simple case since the variant block has ref + alt data and
-        the variant is always a single position. Convert the coordinates to OBFC and return the PosEdit.
+        the variant is always a single position. Convert the coordinates to OBFC and return the record.
         """
         reference_block = variant_block.reference_blocks[0]
         alternate_block = variant_block.alternate_blocks[0]
         start_obfc, end_obfc = zbho_to_obfc(reference_block.start, reference_block.end)
 
-        return PosEdit(
-            pos=Interval(
-                start=AAPosition(
-                    base=start_obfc,
-                    aa=reference_block.bases,
-                ),
-                end=AAPosition(
-                    base=end_obfc,
-                    aa=reference_block.bases,
-                ),
-            ),
-            edit=AASub(
-                ref=reference_block.bases,
-                alt=alternate_block.bases,
-            ),
+        return VariantRecord(
+            self._accession,
+            SUBSTITUTION_CODE,
+            start_obfc,
+            end_obfc,
+            reference_block.bases,
+            alternate_block.bases,
         )
 
-    def _build_deletion(self, variant_block: VariantBlock) -> PosEdit:
+    def _build_deletion(self, variant_block: VariantBlock) -> VariantRecord:
         """
         Protein deletion build logic, this is a fairly simple case since the variant block has the ref data,
-        including the positions + sequence that was deleted. Convert the coordinates to OBFC and return the PosEdit.
+        including the positions + sequence that was deleted. Convert the coordinates to OBFC and return the record.
         """
         reference_block = variant_block.reference_blocks[0]
         start_obfc, end_obfc = zbho_to_obfc(reference_block.start, reference_block.end)
 
-        return PosEdit(
-            pos=Interval(
-                start=AAPosition(
-                    base=start_obfc,
-                    aa=reference_block.bases[0],
-                ),
-                end=AAPosition(
-                    base=end_obfc,
-                    aa=reference_block.bases[-1],
-                ),
-            ),
-            edit=AARefAlt(
-                ref=reference_block.bases,
-                alt=None,
-            ),
+        return VariantRecord(
+            self._accession,
+            DELETION_CODE,
+            start_obfc,
+            end_obfc,
+            reference_block.bases,
+            "",
         )
 
-    def _build_insertion(self, variant_block: VariantBlock) -> PosEdit:
+    def _build_insertion(self, variant_block: VariantBlock) -> VariantRecord:
         """
         Protein insertion build logic, this is a more complicated example since the ref data does not exist on the
-        variant block and has to be looked up from the Alignment. We leverage the .indices field on the Alignment
-        which maps alignment coordinates back to sequence coordinates (gaps have -1). This is a numpy array so
-        all values are cast to python integers before being saved into an HGVS object.
+        variant block and has to be looked up from the Alignment. We map the start of the insert in the alignment back
+        to a reference index using the alignment coordinates, see _get_upstream_reference_position.
 
         The Interval we want is: (1 base upstream of the insert, 1 base downstream of the insert). To get there we
         do the following:
-        - Get the start position of the insert in the alignment. This start is the index for that position within the
-          .indices array. Subtract 1 from that to get the index of the next base upstream (the flanking ref base). This
-          could out of bounds if the variant has not been categorized properly (should be an extension in this case).
-        - Lookup the ref start index from .indices using the computed index above
-        - Lookup the ref end index from .indices using the end position of the insert in the alignment. No offset is
-          needed here since the end of a ZBHO interval is the same as the index for the next base.
+        - Get the reference index of the first reference base at or after the start of the insert in the alignment.
+          No reference base is part of the insert, so this is the flanking base downstream of the insert.
+        - Subtract 1 from that to get the index of the flanking base upstream. This could be out of bounds if the
+          variant has not been categorized properly (should be an extension in this case).
         - Convert the 2 zero based indices into one based indices.
-        - Build and return the object, using the zero based indices to get the anchor bases from the ref sequence
+        - Build and return the record, using the zero based indices to get the anchor bases from the ref sequence
         """
-        upstream_ref_base_index = variant_block.alignment_block.start - 1
-        ref_flanking_start_position = int(self._alignment.indices[0][upstream_ref_base_index])
-        ref_flanking_end_position = int(self._alignment.indices[0][variant_block.alignment_block.end])
+        ref_flanking_end_position = self._get_upstream_reference_position(variant_block.alignment_block.start)
+        ref_flanking_start_position = ref_flanking_end_position - 1
 
         ref_flanking_start_position_ob = zb_to_ob(ref_flanking_start_position)
         ref_flanking_end_position_ob = zb_to_ob(ref_flanking_end_position)
 
-        return PosEdit(
-            pos=Interval(
-                start=AAPosition(
-                    base=ref_flanking_start_position_ob,
-                    aa=self._alignment.target.seq[ref_flanking_start_position],
-                ),
-                end=AAPosition(
-                    base=ref_flanking_end_position_ob,
-                    aa=self._alignment.target.seq[ref_flanking_end_position],
-                ),
-            ),
-            edit=AARefAlt(
-                ref=None,
-                alt=variant_block.alternate_blocks[0].bases,
-            ),
+        return VariantRecord(
+            self._accession,
+            INSERTION_CODE,
+            ref_flanking_start_position_ob,
+            ref_flanking_end_position_ob,
+            self._reference_sequence[ref_flanking_start_position] + self._reference_sequence[ref_flanking_end_position],
+            variant_block.alternate_blocks[0].bases,
         )
 
-    def _build_extension(self, variant_block: VariantBlock) -> PosEdit:
+    def _build_extension(self, variant_block: VariantBlock) -> VariantRecord:
         """
         Protein extension build logic. This case is simple since the Interval is always the first or the last base.
         Check if it is a start or end extension and get the first or last reference base from the ref sequence. The
@@ -145,59 +199,44 @@ class HgvsProteinBuilder:
         in OB already.
         """
         is_start = variant_block.alignment_block.start == 0
-        ref_base = self._alignment.target.seq[0] if is_start else self._alignment.target.seq[-1]
-        ref_position = 1 if is_start else len(self._alignment.target.seq)
+        ref_base = self._reference_sequence[0] if is_start else self._reference_sequence[-1]
+        ref_position = 1 if is_start else len(self._reference_sequence)
 
-        return PosEdit(
-            pos=Interval(
-                start=AAPosition(
-                    base=ref_position,
-                    aa=ref_base,
-                ),
-                end=AAPosition(
-                    base=ref_position,
-                    aa=ref_base,
-                ),
-            ),
-            edit=AAExt(
-                ref=ref_base,
-                aaterm=variant_block.alternate_blocks[0].bases,
-                length=len(variant_block.alternate_blocks[0].bases) * (-1 if is_start else 1),
-            ),
+        return VariantRecord(
+            self._accession,
+            EXTENSION_CODE,
+            ref_position,
+            ref_position,
+            ref_base,
+            variant_block.alternate_blocks[0].bases,
+            len(variant_block.alternate_blocks[0].bases) * (-1 if is_start else 1),
         )
 
-    def _build_duplication(self, variant_block: VariantBlock) -> PosEdit:
+    def _build_duplication(self, variant_block: VariantBlock) -> VariantRecord:
         """
         Protein duplication build logic. This is another complicated case that requires some index munging with the
         reference sequence. It is similar to the insertion except that we want the duplicated bases/positions, not
         the bases/positions that flank the insertion. So we get the index for the first upstream base and convert it
         to an end coordinate. We then subtract the length of the insertion from the end to get the start. Finally,
-        convert to OBFC. The edit object is just an empty Dup().
+        convert to OBFC. The duplicated bases are the inserted ones.
         """
-        upstream_ref_base_index = variant_block.alignment_block.start - 1
-        ref_duplication_end_position = zb_position_to_end_coordinate(
-            self._alignment.indices[0][upstream_ref_base_index]
-        )
+        upstream_ref_base_index = self._get_upstream_reference_position(variant_block.alignment_block.start) - 1
+        ref_duplication_end_position = zb_position_to_end_coordinate(upstream_ref_base_index)
         ref_duplication_start_position = ref_duplication_end_position - len(variant_block.alternate_blocks[0].bases)
         ref_duplication_start_position_obfc, ref_duplication_end_position_obfc = zbho_to_obfc(
             ref_duplication_start_position, ref_duplication_end_position
         )
 
-        return PosEdit(
-            pos=Interval(
-                start=AAPosition(
-                    base=ref_duplication_start_position_obfc,
-                    aa=variant_block.alternate_blocks[0].bases[0],
-                ),
-                end=AAPosition(
-                    base=ref_duplication_end_position_obfc,
-                    aa=variant_block.alternate_blocks[0].bases[-1],
-                ),
-            ),
-            edit=Dup(),
+        return VariantRecord(
+            self._accession,
+            DUPLICATION_CODE,
+            ref_duplication_start_position_obfc,
+            ref_duplication_end_position_obfc,
+            variant_block.alternate_blocks[0].bases,
+            "",
         )
 
-    def _build_repeat(self, variant_block: VariantBlock) -> PosEdit:
+    def _build_repeat(self, variant_block: VariantBlock) -> VariantRecord:
         """
         Protein repeat build logic. This is the most complicated case, and it builds on the duplication case. The
         key difference is that instead of taking the insert sequence as the matching upstream element, we first
@@ -206,37 +245,31 @@ class HgvsProteinBuilder:
         using the sub-string for the length. The last thing is to find the repeat number, which can be computed based on
         integer division between the length of the insert and the length of the largest repeat.
         """
+        upstream_reference_position = self._get_upstream_reference_position(variant_block.alignment_block.start)
+        upstream_reference_sequence = self._reference_sequence[:upstream_reference_position]
         largest_upstream_repeat = [
             substring
             for substring in yield_repeating_substrings(variant_block.alternate_blocks[0].bases)
-            if get_upstream_reference_sequence(self._alignment, variant_block.alignment_block.start, len(substring))
-            == substring
+            if upstream_reference_sequence.endswith(substring)
         ][-1]
 
-        upstream_ref_base_index = variant_block.alignment_block.start - 1
-        ref_duplication_end_position = zb_position_to_end_coordinate(
-            self._alignment.indices[0][upstream_ref_base_index]
-        )
+        ref_duplication_end_position = zb_position_to_end_coordinate(upstream_reference_position - 1)
         ref_duplication_start_position = ref_duplication_end_position - len(largest_upstream_repeat)
         start_obfc, end_obfc = zbho_to_obfc(ref_duplication_start_position, ref_duplication_end_position)
 
         repeat_value = len(variant_block.alternate_blocks[0].bases) // len(largest_upstream_repeat)
 
-        return PosEdit(
-            pos=Interval(
-                start=AAPosition(
-                    base=start_obfc,
-                    aa=largest_upstream_repeat[0],
-                ),
-                end=AAPosition(
-                    base=end_obfc,
-                    aa=largest_upstream_repeat[-1],
-                ),
-            ),
-            edit=Repeat(min=repeat_value, max=repeat_value),
+        return VariantRecord(
+            self._accession,
+            REPEAT_CODE,
+            start_obfc,
+            end_obfc,
+            largest_upstream_repeat,
+            "",
+            repeat_value,
         )
 
-    def _build_deletion_insertion(self, variant_block: VariantBlock) -> PosEdit:
+    def _build_deletion_insertion(self, variant_block: VariantBlock) -> VariantRecord:
         """
         Protein delins logic. Fairly simple logic by taking the ref + alt blocks and combining them together.
         """
@@ -244,23 +277,25 @@ class HgvsProteinBuilder:
         alternate_block = variant_block.alternate_blocks[0]
 
         start_obfc, end_obfc = zbho_to_obfc(reference_block.start, reference_block.end)
-        return PosEdit(
-            pos=Interval(
-                start=AAPosition(
-                    base=start_obfc,
-                    aa=reference_block.bases[0],
-                ),
-                end=AAPosition(
-                    base=end_obfc,
-                    aa=reference_block.bases[-1],
-                ),
-            ),
-            edit=AARefAlt(
-                ref=reference_block.bases,
-                alt=alternate_block.bases,
-            ),
+        return VariantRecord(
+            self._accession,
+            DELETION_INSERTION_CODE,
+            start_obfc,
+            end_obfc,
+            reference_block.bases,
+            alternate_block.bases,
         )
 
+    RECORD_BUILDERS: ClassVar[dict[str, Callable[["HgvsProteinBuilder", VariantBlock], VariantRecord]]] = {
+        HGVS_VARIANT_TYPE_SUBSTITUTION: _build_substitution,
+        HGVS_VARIANT_TYPE_DELETION: _build_deletion,
+        HGVS_VARIANT_TYPE_INSERTION: _build_insertion,
+        HGVS_VARIANT_TYPE_EXTENSION: _build_extension,
+        HGVS_VARIANT_TYPE_DUPLICATION: _build_duplication,
+        HGVS_VARIANT_TYPE_REPEAT: _build_repeat,
+        HGVS_VARIANT_TYPE_DELETION_INSERTION: _build_deletion_insertion,
+    }
+
 
 BUILDER_CONFIG = {
     MOLECULE_TYPE_PROTEIN: HgvsProteinBuilder,
@@ -1,6 +1,11 @@
-from Bio.Align import Alignment
+from __future__ import annotations
 
-from palamedes.align import get_upstream_reference_sequence
+from typing import TYPE_CHECKING, Sequence
+
+from palamedes.align import (
+    get_alignment_column_offsets,
+    get_upstream_reference_position,
+)
 from palamedes.models import VariantBlock
 from palamedes.config import (
     HGVS_VARIANT_TYPE_SUBSTITUTION,
@@ -10,6 +15,7 @@ from palamedes.config import (
     HGVS_VARIANT_TYPE_REPEAT,
     HGVS_VARIANT_TYPE_INSERTION,
     HGVS_VARIANT_TYPE_DELETION_INSERTION,
+    HGVS_VARIANT_TYPE_CODES,
     VARIANT_BASE_MATCH,
     VARIANT_BASE_MISMATCH,
     VARIANT_BASE_DELETION,
@@ -17,6 +23,32 @@ from palamedes.config import (
 )
 from palamedes.utils import contains_repeated_substring, yield_repeating_substrings
 
+if TYPE_CHECKING:
+    import numpy as np
+    from Bio.Align import Alignment
+
+    from palamedes.tables import VariantBlockTable
+
+
+def categorize_insertion(inserted_bases: str, upstream_reference_sequence: str) -> str:
+    """
+    Categorize an insertion that is not an extension, given the (ungapped) reference sequence upstream of it:
+    Duplication, Repeat or Insertion. See categorize_variant_block.
+    """
+    if upstream_reference_sequence.endswith(inserted_bases):
+        return HGVS_VARIANT_TYPE_DUPLICATION
+
+    if contains_repeated_substring(inserted_bases):
+        candidate_repeats = [
+            substring
+            for substring in yield_repeating_substrings(inserted_bases)
+            if upstream_reference_sequence.endswith(substring)
+        ]
+        if len(candidate_repeats) > 0:
+            return HGVS_VARIANT_TYPE_REPEAT
+
+    return HGVS_VARIANT_TYPE_INSERTION
+
 
 def categorize_variant_block(variant_block: VariantBlock, alignment: Alignment) -> str:
     """
@@ -45,27 +77,81 @@ def categorize_variant_block(variant_block: VariantBlock, alignment: Alignment)
         return HGVS_VARIANT_TYPE_DELETION
 
     if set(variant_block.alignment_block.bases) == set([VARIANT_BASE_INSERTION]):
-        alignment_end = len(alignment[0])
-        if variant_block.alignment_block.start == 0 or variant_block.alignment_block.end == alignment_end:
+        column_offsets = get_alignment_column_offsets(alignment)
+        if variant_block.alignment_block.start == 0 or variant_block.alignment_block.end == column_offsets[-1]:
             return HGVS_VARIANT_TYPE_EXTENSION
 
-        inserted_bases = variant_block.alternate_blocks[0].bases
+        upstream_reference_position = get_upstream_reference_position(
+            alignment, column_offsets, variant_block.alignment_block.start
+        )
+        return categorize_insertion(
+            variant_block.alternate_blocks[0].bases,
+            str(alignment.target.seq[:upstream_reference_position]),
+        )
 
-        if inserted_bases == get_upstream_reference_sequence(
-            alignment, variant_block.alignment_block.start, len(inserted_bases)
-        ):
-            return HGVS_VARIANT_TYPE_DUPLICATION
+    return HGVS_VARIANT_TYPE_DELETION_INSERTION
 
-        if contains_repeated_substring(inserted_bases):
-            candidate_repeats = [
-                substring
-                for substring in yield_repeating_substrings(inserted_bases)
-                if get_upstream_reference_sequence(alignment, variant_block.alignment_block.start, len(substring))
-                == substring
-            ]
-            if len(candidate_repeats) > 0:
-                return HGVS_VARIANT_TYPE_REPEAT
 
-        return HGVS_VARIANT_TYPE_INSERTION
+def count_variant_bases(table: VariantBlockTable, variant_base: str) -> np.ndarray:
+    """Count the occurrences of variant_base in the alignment bases of every row of the table, as an int64 array"""
+    import numpy as np
 
-    return HGVS_VARIANT_TYPE_DELETION_INSERTION
+    bases = np.frombuffer(table.bases.encode("ascii"), dtype=np.uint8)
+    cumulative_counts = np.concatenate([[0], np.cumsum(bases == ord(variant_base))])
+    alignment_bases_start = table.bases_offsets[:-1]
+    alignment_bases_end = alignment_bases_start + table.alignment_end - table.alignment_start
+    return cumulative_counts[alignment_bases_end] - cumulative_counts[alignment_bases_start]
+
+
+def categorize_variant_block_table(table: VariantBlockTable, alignments: Sequence[Alignment]) -> np.ndarray:
+    """
+    Bulk version of categorize_variant_block, categorizing every row of a VariantBlockTable against the alignment of
+    its pair (alignments[pair_index]) with the same rule-set. The variant base composition of every row is counted
+    with array operations, which is enough to resolve Substitution, Deletion, Extension and Deletion-Insertion for
+    all rows at once. Only the remaining insertions need the upstream reference checks, see categorize_insertion.
+
+    The HGVS_VARIANT_TYPE_CODES of the rows are stored in table.category, which is also returned.
+    """
+    import numpy as np
+
+    block_lengths = table.alignment_end - table.alignment_start
+    match_counts = count_variant_bases(table, VARIANT_BASE_MATCH)
+    if (match_rows := np.flatnonzero(match_counts)).size > 0:
+        raise ValueError(
+            f"Cannot categorize VariantBlock with matching bases in it: {table.alignment_bases(int(match_rows[0]))}"
+        )
+
+    is_substitution = (block_lengths == 1) & (count_variant_bases(table, VARIANT_BASE_MISMATCH) == 1)
+    is_deletion = (block_lengths > 0) & (count_variant_bases(table, VARIANT_BASE_DELETION) == block_lengths)
+    is_insertion = (block_lengths > 0) & (count_variant_bases(table, VARIANT_BASE_INSERTION) == block_lengths)
+    # the alignment length and upstream reference positions are computed from the coordinates, and only for the
+    # alignments with insertions, since building their aligned sequences would cost more than everything else
+    column_offsets = {
+        pair_index: get_alignment_column_offsets(alignments[pair_index])
+        for pair_index in np.unique(table.pair_index[is_insertion]).tolist()
+    }
+    alignment_lengths = np.zeros(len(alignments), dtype=np.int64)
+    for pair_index, pair_column_offsets in column_offsets.items():
+        alignment_lengths[pair_index] = pair_column_offsets[-1]
+
+    is_extension = is_insertion & (
+        (table.alignment_start == 0) | (table.alignment_end == alignment_lengths[table.pair_index])
+    )
+
+    category = np.full(len(table), HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_DELETION_INSERTION], dtype=np.int8)
+    category[is_insertion] = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_INSERTION]
+    category[is_extension] = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_EXTENSION]
+    category[is_deletion] = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_DELETION]
+    category[is_substitution] = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_SUBSTITUTION]
+
+    for row in np.flatnonzero(is_insertion & ~is_extension).tolist():
+        alignment = alignments[pair_index := int(table.pair_index[row])]
+        upstream_reference_position = get_upstream_reference_position(
+            alignment, column_offsets[pair_index], int(table.alignment_start[row])
+        )
+        category[row] = HGVS_VARIANT_TYPE_CODES[
+            categorize_insertion(table.alternate_bases(row), str(alignment.target.seq[:upstream_reference_position]))
+        ]
+
+    table.category[:] = category
+    return table.category
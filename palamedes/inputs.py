@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import gzip
+import logging
+import queue
+import threading
+import time
+from typing import IO, TYPE_CHECKING, Generic, Iterable, Iterator, TypeVar
+
+from palamedes.align import generate_seq_record
+from palamedes.config import DEFAULT_PREFETCH_BATCH_SIZE, DEFAULT_PREFETCH_MAX_BATCHES, MOLECULE_TYPE_PROTEIN
+from palamedes.models import PrefetchStats
+
+if TYPE_CHECKING:
+    from Bio.SeqRecord import SeqRecord
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_text(path: str) -> IO[str]:
+    """Open a text file for reading, transparently decompressing it when it is gzip compressed"""
+    with open(path, "rb") as handle:
+        compressed = handle.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+    return gzip.open(path, "rt") if compressed else open(path)
+
+
+def iter_fasta_seq_records(path: str, molecule_type: str = MOLECULE_TYPE_PROTEIN) -> Iterator[SeqRecord]:
+    """
+    Lazily read a FASTA file (optionally gzip compressed) into SeqRecords carrying the molecule_type annotation required
+    by the alignment step. The record id is the first word of the FASTA title line, matching Bio.SeqIO.
+    """
+    from Bio.SeqIO.FastaIO import SimpleFastaParser
+
+    with open_text(path) as handle:
+        for title, sequence in SimpleFastaParser(handle):
+            yield generate_seq_record(sequence, title.split(None, 1)[0] if title else "", molecule_type=molecule_type)
+
+
+def iter_fastq_seq_records(path: str, molecule_type: str = MOLECULE_TYPE_PROTEIN) -> Iterator[SeqRecord]:
+    """FASTQ counterpart of iter_fasta_seq_records, qualities are dropped as the alignment step does not use them"""
+    from Bio.SeqIO.QualityIO import FastqGeneralIterator
+
+    with open_text(path) as handle:
+        for title, sequence, _ in FastqGeneralIterator(handle):
+            yield generate_seq_record(sequence, title.split(None, 1)[0] if title else "", molecule_type=molecule_type)
+
+
+def iter_seq_records(path: str, molecule_type: str = MOLECULE_TYPE_PROTEIN) -> Iterator[SeqRecord]:
+    """Read a FASTA or FASTQ file (optionally gzip compressed), telling them apart by the first character"""
+    with open_text(path) as handle:
+        is_fastq = handle.read(1) == "@"
+
+    return (iter_fastq_seq_records if is_fastq else iter_fasta_seq_records)(path, molecule_type=molecule_type)
+
+
+class PrefetchingReader(Generic[T]):
+    """
+    Input pipeline stage running an iterable (usually iter_seq_records) in a reader thread, so decompression and
+    parsing overlap with the alignments consuming the records. The reader hands records over in batches of batch_size
+    through a queue holding at most max_batches, which bounds memory and applies backpressure: once the consumer
+    falls behind, the reader blocks until a batch is taken. Iterating yields the records in order, errors raised by
+    the reader are re-raised in the consumer, and stopping early stops the reader, which then closes the iterator of
+    the iterable (a generator or file) so its input file is closed too. A reader can only be iterated once.
+
+    Both sides time how long they wait on each other, see stats, which tells whether the pipeline is limited by its
+    input or by compute.
+
+    .. code-block:: python
+
+        >>> from palamedes.batch import iter_hgvs_variants_batch
+        >>> from palamedes.inputs import PrefetchingReader, iter_seq_records
+        >>> from palamedes.models import SequencePair
+        >>> reader = PrefetchingReader(iter_seq_records("alternates.fa.gz"))
+        >>> pairs = (SequencePair(alt.id, "PFKISIHL", alt) for alt in reader)
+        >>> for pair_result in iter_hgvs_variants_batch(pairs, executor_type="process"):
+        ...     ...
+        >>> reader.stats.bottleneck
+        'compute'
+    """
+
+    def __init__(
+        self,
+        iterable: Iterable[T],
+        batch_size: int = DEFAULT_PREFETCH_BATCH_SIZE,
+        max_batches: int = DEFAULT_PREFETCH_MAX_BATCHES,
+    ) -> None:
+        if batch_size < 1 or max_batches < 1:
+            raise ValueError(f"batch_size and max_batches must be at least 1, got: {batch_size}, {max_batches}")
+
+        self._iterable = iterable
+        self._batch_size = batch_size
+        self._queue: queue.Queue[list[T] | BaseException | None] = queue.Queue(maxsize=max_batches)
+        self._stop = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        self._records = 0
+        self._batches = 0
+        self._read_seconds = 0.0
+        self._reader_blocked_seconds = 0.0
+        self._consumer_blocked_seconds = 0.0
+
+    def _put(self, item: list[T] | BaseException | None) -> bool:
+        """Blocking put which gives up once the consumer has stopped, returning whether the item was queued"""
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+
+            return False
+        finally:
+            with self._lock:
+                self._reader_blocked_seconds += time.perf_counter() - start
+
+    def _read(self) -> None:
+        batch: list[T] = []
+        iterator = iter(self._iterable)
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    record = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    with self._lock:
+                        self._read_seconds += time.perf_counter() - start
+
+                batch.append(record)
+                if len(batch) >= self._batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+
+            if batch and not self._put(batch):
+                return
+
+            self._put(None)
+        except BaseException as error:
+            self._put(error)
+        finally:
+            if (close := getattr(iterator, "close", None)) is not None:
+                close()
+
+    def __iter__(self) -> Iterator[T]:
+        if self._started:
+            raise RuntimeError("A PrefetchingReader can only be iterated once")
+
+        self._started = True
+        return self._iter_records()
+
+    def _iter_records(self) -> Iterator[T]:
+        reader = threading.Thread(target=self._read, name="palamedes-prefetch", daemon=True)
+        reader.start()
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self._queue.get()
+                with self._lock:
+                    self._consumer_blocked_seconds += time.perf_counter() - start
+
+                if item is None:
+                    break
+
+                if isinstance(item, BaseException):
+                    raise item
+
+                with self._lock:
+                    self._records += len(item)
+                    self._batches += 1
+
+                yield from item
+        finally:
+            self._stop.set()
+            reader.join()
+            LOGGER.debug("Input stats: %s", self.stats)
+
+    @property
+    def stats(self) -> PrefetchStats:
+        with self._lock:
+            return PrefetchStats(
+                records=self._records,
+                batches=self._batches,
+                read_seconds=self._read_seconds,
+                reader_blocked_seconds=self._reader_blocked_seconds,
+                consumer_blocked_seconds=self._consumer_blocked_seconds,
+            )
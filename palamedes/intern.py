@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Iterable
+
+from palamedes.config import DEFAULT_INTERN_MAX_ENTRIES
+from palamedes.models import InternStats, VariantRecord
+
+if TYPE_CHECKING:
+    from hgvs.sequencevariant import SequenceVariant
+
+LOGGER = logging.getLogger(__name__)
+
+
+class VariantInternTable:
+    """
+    Intern table for the variants of a batch, where the same few variants (p.Leu8del for example) can occur in
+    hundreds of thousands of results. Structurally identical VariantRecords are returned as the same record object,
+    and each distinct record is materialized into a SequenceVariant only once, which every result holding that variant
+    shares. This cuts memory and build time, and lets later grouping compare variants by identity.
+
+    The table is kept per reference accession, each holding at most max_entries distinct variants, past which new
+    variants of that reference are returned as they are (still correct, but not shared). SequenceVariants are
+    mutable, so the shared ones must not be modified in place. The table is meant for the calling thread of the batch
+    API, which is where it is used.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_INTERN_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        self._records: dict[str, dict[VariantRecord, VariantRecord]] = {}
+        self._variants: dict[str, dict[VariantRecord, SequenceVariant]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def intern(self, record: VariantRecord) -> VariantRecord:
+        """Return the interned record equal to record, adding it to the table if it is new and there is room"""
+        table = self._records.setdefault(record.accession, {})
+        if (interned := table.get(record)) is not None:
+            self._hits += 1
+            return interned
+
+        self._misses += 1
+        if len(table) < self._max_entries:
+            table[record] = record
+
+        return record
+
+    def intern_all(self, records: Iterable[VariantRecord]) -> list[VariantRecord]:
+        return [self.intern(record) for record in records]
+
+    def to_hgvs(self, record: VariantRecord) -> SequenceVariant:
+        """Shared SequenceVariant of a record, materialized on first use, see VariantRecord.to_hgvs"""
+        variants = self._variants.setdefault(record.accession, {})
+        if (variant := variants.get(record)) is None:
+            variant = record.to_hgvs()
+            if len(variants) < self._max_entries:
+                variants[record] = variant
+
+        return variant
+
+    def to_hgvs_all(self, records: Iterable[VariantRecord]) -> list[SequenceVariant]:
+        return [self.to_hgvs(record) for record in records]
+
+    @property
+    def stats(self) -> InternStats:
+        return InternStats(
+            hits=self._hits,
+            misses=self._misses,
+            references=len(self._records),
+            entries=sum(len(table) for table in self._records.values()),
+        )
+
+    def clear(self) -> None:
+        """Drop every entry, counters are left untouched"""
+        self._records.clear()
+        self._variants.clear()
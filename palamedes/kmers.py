@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from palamedes.config import DEFAULT_KMER_SIZE, DEFAULT_SHORTLIST_SIZE, GLOBAL_ALIGN_MODE
+from palamedes.models import ReferenceAssignment, SequencePair
+
+if TYPE_CHECKING:
+    import numpy as np
+    from Bio.Align import PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+
+LOGGER = logging.getLogger(__name__)
+
+
+def distinct_kmers(sequence: bytes, k: int) -> set[bytes]:
+    """Distinct k-mers of an encoded sequence, empty when it is shorter than k"""
+    return {sequence[start : start + k] for start in range(len(sequence) - k + 1)}
+
+
+def encode_sequence(sequence: str | SeqRecord) -> bytes:
+    return sequence.encode() if isinstance(sequence, str) else bytes(sequence.seq)
+
+
+class KmerIndex:
+    """
+    Inverted k-mer index over a set of references (SeqRecords, or a palamedes.panel.ReferencePanel), used to find
+    which reference an alternate most likely derives from without aligning it against all of them. Every distinct
+    k-mer maps to the sorted indices of the references containing it, so shortlisting an alternate costs one lookup
+    per k-mer of the alternate rather than one alignment per reference. The shortlist is then confirmed with score
+    only alignments, see assign.
+
+    .. code-block:: python
+
+        >>> from palamedes.kmers import KmerIndex
+        >>> index = KmerIndex(reference_seq_records)
+        >>> index.assign("PFKIGSIHL")
+        ReferenceAssignment(reference_id='Jelleine-I', score=7.0, candidates=['Jelleine-I', ...])
+    """
+
+    def __init__(self, references: Iterable[SeqRecord], k: int = DEFAULT_KMER_SIZE) -> None:
+        import numpy as np
+
+        if k < 1:
+            raise ValueError(f"k must be positive, got: {k}")
+
+        self.k = k
+        self.references = list(references)
+        self.ids = [str(seq_record.id) for seq_record in self.references]
+        self._reference_indices = {
+            reference_id: reference_index for reference_index, reference_id in enumerate(self.ids)
+        }
+        if len(self._reference_indices) != len(self.ids):
+            raise ValueError("Reference ids of a KmerIndex must be unique")
+
+        postings: dict[bytes, list[int]] = {}
+        for reference_index, seq_record in enumerate(self.references):
+            for kmer in distinct_kmers(encode_sequence(seq_record), k):
+                postings.setdefault(kmer, []).append(reference_index)
+
+        self._postings = {kmer: np.array(indices, dtype=np.int32) for kmer, indices in postings.items()}
+        LOGGER.debug("Indexed %s references, %s distinct %s-mers", len(self.references), len(self._postings), k)
+
+    def __len__(self) -> int:
+        return len(self.references)
+
+    def shared_kmer_counts(self, alternate: str | SeqRecord) -> np.ndarray:
+        """Number of distinct k-mers of the alternate found in each reference, indexed like references"""
+        import numpy as np
+
+        hits = [
+            self._postings[kmer]
+            for kmer in distinct_kmers(encode_sequence(alternate), self.k)
+            if kmer in self._postings
+        ]
+        reference_indices = np.concatenate(hits + [np.empty(0, dtype=np.int32)])
+        return np.bincount(reference_indices, minlength=len(self.references)).astype(np.int64)
+
+    def shortlist(self, alternate: str | SeqRecord, size: int = DEFAULT_SHORTLIST_SIZE) -> list[int]:
+        """
+        Indices of the size references sharing the most k-mers with the alternate, best first, ties are kept in
+        reference order.
+        """
+        import numpy as np
+
+        counts = self.shared_kmer_counts(alternate)
+        return [int(reference_index) for reference_index in np.argsort(-counts, kind="stable")[:size]]
+
+    def assign(
+        self,
+        alternate: str | SeqRecord,
+        aligner: PairwiseAligner | None = None,
+        shortlist_size: int = DEFAULT_SHORTLIST_SIZE,
+    ) -> ReferenceAssignment:
+        """
+        Pick the reference of the shortlist with the best global alignment score against the alternate, using
+        score only alignments, which skip the traceback of generate_alignment. Ties go to the better k-mer rank. The
+        aligner defaults to make_aligner, and must be in global mode so the scores match the variant pipeline.
+        """
+        from palamedes.align import get_reversed_sequence, make_aligner
+
+        if not self.references:
+            raise ValueError("Cannot assign a reference from an empty KmerIndex")
+
+        if aligner is None:
+            aligner = make_aligner()
+        elif aligner.mode != GLOBAL_ALIGN_MODE:
+            raise ValueError(f"Custom PairwiseAligner must be set to global mode, got: {aligner.mode}")
+
+        # the score is the same for the reversed sequences, which ReferencePanel references provide without copying
+        reversed_alternate = encode_sequence(alternate)[::-1]
+        candidates = self.shortlist(alternate, size=shortlist_size)
+        scores = [
+            aligner.score(get_reversed_sequence(self.references[reference_index]), reversed_alternate)
+            for reference_index in candidates
+        ]
+        best = max(range(len(candidates)), key=lambda position: (scores[position], -position))
+        return ReferenceAssignment(
+            self.ids[candidates[best]],
+            float(scores[best]),
+            [self.ids[reference_index] for reference_index in candidates],
+        )
+
+    def reference(self, reference_id: str) -> SeqRecord:
+        """The indexed reference SeqRecord with the given id"""
+        return self.references[self._reference_indices[reference_id]]
+
+
+def iter_nearest_reference_pairs(
+    alternates: Iterable[SeqRecord],
+    index: KmerIndex,
+    aligner: PairwiseAligner | None = None,
+    shortlist_size: int = DEFAULT_SHORTLIST_SIZE,
+) -> Iterator[SequencePair]:
+    """
+    Assign every alternate to its nearest reference in the index (see KmerIndex.assign), yielding the SequencePairs
+    to feed the batch API, so the full variant pipeline only runs once per alternate, against the chosen reference.
+
+    .. code-block:: python
+
+        >>> from palamedes.batch import iter_hgvs_variants_batch
+        >>> from palamedes.inputs import iter_fasta_seq_records
+        >>> from palamedes.kmers import KmerIndex, iter_nearest_reference_pairs
+        >>> index = KmerIndex(iter_fasta_seq_records("references.fasta"))
+        >>> pairs = iter_nearest_reference_pairs(iter_fasta_seq_records("alternates.fasta"), index)
+        >>> for pair_result in iter_hgvs_variants_batch(pairs):
+        ...     print(pair_result.pair_id, [variant.format() for variant in pair_result.variants])
+    """
+    from palamedes.align import make_aligner
+
+    aligner = aligner if aligner is not None else make_aligner()
+    for alternate in alternates:
+        assignment = index.assign(alternate, aligner=aligner, shortlist_size=shortlist_size)
+        LOGGER.debug("Assigned %s to %s (score = %s)", alternate.id, assignment.reference_id, assignment.score)
+        yield SequencePair(str(alternate.id), index.reference(assignment.reference_id), alternate)
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Sequence, TextIO
+
+from Bio.Seq import Seq, SequenceDataAbstractBaseClass
+from Bio.SeqRecord import SeqRecord
+
+from palamedes import generate_hgvs_variants, generate_variant_records
+from palamedes.align import make_aligner
+from palamedes.batch import make_executor, run_inline
+from palamedes.config import (
+    DEFAULT_MATRIX_TILE_SIZE,
+    EXECUTOR_TYPE_SERIAL,
+    EXECUTOR_TYPE_THREAD,
+    EXECUTOR_TYPES,
+    MOLECULE_TYPE_PROTEIN,
+)
+from palamedes.models import MatrixPairResult, MatrixTile
+
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReversibleSequenceData(SequenceDataAbstractBaseClass):
+    """
+    Biopython sequence content provider holding an encoded sequence along with its reversed form, computed once, for
+    sequences aligned many times (each reference and alternate of an all-vs-all tile for example), so
+    palamedes.align.get_reversed_sequence does not encode and reverse them again for every alignment.
+    """
+
+    __slots__ = ("data", "reversed_data")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.reversed_data = data[::-1]
+        super().__init__()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.data[key]
+
+    def reversed_sequence(self) -> bytes:
+        return self.reversed_data
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return ReversibleSequenceData, (self.data,)
+
+
+def make_reversible_seq_record(seq_record: SeqRecord) -> SeqRecord:
+    """
+    Copy of a SeqRecord (id, description and annotations) whose sequence carries its reversed form, see
+    ReversibleSequenceData. SeqRecords whose sequence data already keeps it (from a ReferencePanel or an IndexedFasta
+    for example) are returned as they are.
+    """
+    if hasattr(getattr(seq_record.seq, "_data", None), "reversed_sequence"):
+        return seq_record
+
+    return SeqRecord(
+        Seq(ReversibleSequenceData(bytes(seq_record.seq))),
+        id=seq_record.id,
+        name=seq_record.name,
+        description=seq_record.description,
+        annotations=dict(seq_record.annotations),
+    )
+
+
+def in_upper_triangle(reference_index: int, alternate_index: int) -> bool:
+    """Pairs kept when skipping symmetric duplicates of a set compared against itself, self comparisons are skipped"""
+    return reference_index < alternate_index
+
+
+def plan_tiles(
+    reference_lengths: Sequence[int],
+    alternate_lengths: Sequence[int],
+    tile_size: int = DEFAULT_MATRIX_TILE_SIZE,
+    skip_symmetric: bool = False,
+) -> list[MatrixTile]:
+    """
+    Split the references x alternates pair matrix into tiles of at most tile_size references and tile_size
+    alternates, each with its estimated cost, the number of dynamic programming cells of its alignments (the product
+    of both lengths, per pair). Tiles are returned most expensive first, so that handing them to workers in order
+    (longest processing time first) leaves only cheap tiles for the end and workers finish at roughly the same time.
+    With skip_symmetric, only pairs in the upper triangle are kept (see in_upper_triangle), and empty tiles are dropped.
+    """
+    if tile_size < 1:
+        raise ValueError(f"tile_size must be at least 1, got: {tile_size}")
+
+    tiles = []
+    for reference_start in range(0, len(reference_lengths), tile_size):
+        reference_end = min(reference_start + tile_size, len(reference_lengths))
+        for alternate_start in range(0, len(alternate_lengths), tile_size):
+            alternate_end = min(alternate_start + tile_size, len(alternate_lengths))
+            if skip_symmetric and reference_start >= alternate_end - 1:
+                continue
+
+            if skip_symmetric and reference_end > alternate_start:
+                # tile crossing the diagonal, only part of its pairs are kept
+                cost = sum(
+                    reference_lengths[reference_index] * alternate_lengths[alternate_index]
+                    for reference_index in range(reference_start, reference_end)
+                    for alternate_index in range(alternate_start, alternate_end)
+                    if in_upper_triangle(reference_index, alternate_index)
+                )
+            else:
+                cost = sum(reference_lengths[reference_start:reference_end]) * sum(
+                    alternate_lengths[alternate_start:alternate_end]
+                )
+
+            tiles.append(MatrixTile(reference_start, reference_end, alternate_start, alternate_end, cost))
+
+    return sorted(tiles, key=lambda tile: tile.cost, reverse=True)
+
+
+def generate_tile_results(
+    tile: MatrixTile,
+    references: list[SeqRecord],
+    alternates: list[SeqRecord],
+    molecule_type: str,
+    aligner: PairwiseAligner,
+    use_non_standard_substitution_rules: bool,
+    skip_symmetric: bool,
+    compact: bool,
+) -> list[MatrixPairResult]:
+    """
+    Worker function of the all-vs-all API, comparing the references and alternates of a tile (the slices of the full
+    lists the tile covers), so every sequence and the aligner are sent to a worker once per tile rather than once per
+    pair. Each sequence is also encoded and reversed for the aligner once per tile, see make_reversible_seq_record.
+    This runs in a thread or a worker process, so it must stay a picklable module level function.
+    """
+    generate_func = generate_variant_records if compact else generate_hgvs_variants
+    references = [make_reversible_seq_record(reference) for reference in references]
+    alternates = [make_reversible_seq_record(alternate) for alternate in alternates]
+    return [
+        MatrixPairResult(
+            str(reference.id),
+            str(alternate.id),
+            generate_func(
+                reference,
+                alternate,
+                molecule_type=molecule_type,
+                aligner=aligner,
+                use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            ),
+        )
+        for reference_index, reference in enumerate(references, start=tile.reference_start)
+        for alternate_index, alternate in enumerate(alternates, start=tile.alternate_start)
+        if not skip_symmetric or in_upper_triangle(reference_index, alternate_index)
+    ]
+
+
+def iter_all_vs_all_hgvs_variants(
+    references: Sequence[SeqRecord],
+    alternates: Sequence[SeqRecord] | None = None,
+    skip_symmetric: bool = False,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    tile_size: int = DEFAULT_MATRIX_TILE_SIZE,
+    compact: bool = False,
+) -> Iterator[MatrixPairResult]:
+    """
+    Run `generate_hgvs_variants` for every reference x alternate pair, or for every pair of a single set of sequences
+    when alternates is omitted, yielding a `palamedes.models.MatrixPairResult` per pair. The pair matrix is split into
+    tiles (see `plan_tiles`) which are dispatched to the executor most expensive first, with at most two tiles per
+    worker in flight. Results are yielded tile by tile as they complete, so they are not in matrix order, and only the
+    tiles in flight are held in memory.
+
+    With `skip_symmetric=True`, which requires omitting alternates, each unordered pair is compared once, with the
+    earlier sequence as the reference, and sequences are not compared against themselves.
+
+    See `iter_hgvs_variants_batch` for the executor types and `compact`.
+
+    .. code-block:: python
+
+        >>> from palamedes.inputs import iter_fasta_seq_records
+        >>> from palamedes.matrix import iter_all_vs_all_hgvs_variants
+        >>> library = list(iter_fasta_seq_records("library.fasta"))
+        >>> for result in iter_all_vs_all_hgvs_variants(library, skip_symmetric=True, executor_type="process"):
+        ...     print(result.reference_id, result.alternate_id, len(result.variants))
+    """
+    if executor_type not in EXECUTOR_TYPES:
+        raise ValueError(f"Unsupported executor_type: {executor_type}, expected one of: {','.join(EXECUTOR_TYPES)}")
+
+    if skip_symmetric and alternates is not None:
+        raise ValueError("skip_symmetric is only supported when comparing a single set of sequences, omit alternates")
+
+    alternates = references if alternates is None else alternates
+    aligner = aligner if aligner is not None else make_aligner()
+    tiles = plan_tiles(
+        [len(reference) for reference in references],
+        [len(alternate) for alternate in alternates],
+        tile_size=tile_size,
+        skip_symmetric=skip_symmetric,
+    )
+    LOGGER.debug("Planned %s tiles, %s estimated DP cells", len(tiles), sum(tile.cost for tile in tiles))
+
+    def submit_tile(
+        submit: Callable[..., Future[list[MatrixPairResult]]], tile: MatrixTile
+    ) -> Future[list[MatrixPairResult]]:
+        return submit(
+            generate_tile_results,
+            tile,
+            list(references[tile.reference_start : tile.reference_end]),
+            list(alternates[tile.alternate_start : tile.alternate_end]),
+            molecule_type,
+            aligner,
+            use_non_standard_substitution_rules,
+            skip_symmetric,
+            compact,
+        )
+
+    if executor_type == EXECUTOR_TYPE_SERIAL:
+        for tile in tiles:
+            yield from submit_tile(run_inline, tile).result()
+        return
+
+    max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    executor = make_executor(executor_type, max_workers=max_workers)
+    pending_tiles = iter(tiles)
+    in_flight: set[Future[list[MatrixPairResult]]] = set()
+    try:
+        while True:
+            for tile in pending_tiles:
+                in_flight.add(submit_tile(executor.submit, tile))
+                if len(in_flight) >= max_in_flight:
+                    break
+
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def write_all_vs_all_hgvs_variants(
+    handle: TextIO,
+    references: Sequence[SeqRecord],
+    alternates: Sequence[SeqRecord] | None = None,
+    skip_symmetric: bool = False,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    tile_size: int = DEFAULT_MATRIX_TILE_SIZE,
+) -> int:
+    """
+    Streaming sink for `iter_all_vs_all_hgvs_variants`, writing every variant to handle as soon as its tile completes,
+    one <reference id><tab><alternate id><tab><hgvs> line per variant. Returns the number of pairs compared.
+    """
+    pair_count = 0
+    for result in iter_all_vs_all_hgvs_variants(
+        references,
+        alternates,
+        skip_symmetric=skip_symmetric,
+        molecule_type=molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+        executor_type=executor_type,
+        max_workers=max_workers,
+        tile_size=tile_size,
+        compact=True,
+    ):
+        pair_count += 1
+        for record in result.variants:
+            handle.write(f"{result.reference_id}\t{result.alternate_id}\t{record.format()}\n")
+
+    return pair_count
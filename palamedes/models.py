@@ -1,4 +1,12 @@
-from typing import NamedTuple
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from palamedes.config import HGVS_VARIANT_TYPES, STANDARD_AMINO_ACIDS
+
+if TYPE_CHECKING:
+    from Bio.SeqRecord import SeqRecord
+    from hgvs.sequencevariant import SequenceVariant
 
 
 class Block(NamedTuple):
@@ -11,7 +19,7 @@ class Block(NamedTuple):
     bases: str
 
     @classmethod
-    def collapse(cls, blocks: list["Block"]) -> "Block":
+    def collapse(cls, blocks: list[Block]) -> Block:
         """
         Given a variable length list of blocks, collapse all blocks into one or raise a ValueError if the list is empty.
         Blocks will be sorted but must be adjacent to each-other.
@@ -49,3 +57,315 @@ class VariantBlock(NamedTuple):
     alignment_block: Block
     reference_blocks: list[Block]
     alternate_blocks: list[Block]
+
+
+class VariantRecord(NamedTuple):
+    """
+    Compact, immutable representation of a protein HGVS variant, a flat tuple of small ints and short strings which is
+    cheap to hold in bulk and to pickle between processes. The full hgvs.sequencevariant.SequenceVariant (with its
+    nested PosEdit, Interval, AAPosition and edit objects) is only built when to_hgvs is called.
+
+    Positions are one based and fully closed, like in the HGVS string. The meaning of ref and alt depends on the
+    category (an index into HGVS_VARIANT_TYPES):
+
+    - substitution: ref and alt are the single residues.
+    - deletion: ref are the deleted residues, alt is empty.
+    - insertion: start and end are the flanking positions, ref are the 2 flanking residues, alt the inserted ones.
+    - extension: ref is the first or last residue, alt the added residues, length is the signed extension length.
+    - duplication: ref are the duplicated residues, alt is empty.
+    - repeat: ref is the repeated unit, alt is empty, length is the number of copies.
+    - deletion_insertion: ref are the deleted residues, alt are the inserted residues.
+
+    The accession is usually the same str object for every record of an alignment, so it costs a reference per
+    record, same as an index into a table would, while keeping each record self contained.
+    """
+
+    accession: str
+    category: int
+    start: int
+    end: int
+    ref: str
+    alt: str
+    length: int = 0
+
+    @property
+    def hgvs_type(self) -> str:
+        return HGVS_VARIANT_TYPES[self.category]
+
+    def to_hgvs(self) -> SequenceVariant:
+        """Materialize the full hgvs SequenceVariant for this record"""
+        from palamedes.hgvs.builders import HgvsProteinBuilder
+
+        return HgvsProteinBuilder.to_sequence_variant(self)
+
+    def format(self, conf: dict | None = None) -> str:
+        """Format as an HGVS string, same as SequenceVariant.format"""
+        return self.to_hgvs().format(conf)
+
+
+class SequencePair(NamedTuple):
+    """
+    Input unit for the batch APIs, a reference and alternate sequence (either raw strings or SeqRecords) to be aligned
+    and compared. The pair_id is used to identify the results, and is usually the id of the alternate sequence.
+    """
+
+    pair_id: str
+    reference: str | SeqRecord
+    alternate: str | SeqRecord
+
+
+class PairResult(NamedTuple):
+    """
+    Output unit for the batch APIs, the HGVS variants found for the SequencePair with the matching pair_id. These are
+    VariantRecords when the batch API is run with compact=True.
+    """
+
+    pair_id: str
+    variants: list[SequenceVariant] | list[VariantRecord]
+
+
+class CollapsedPairResult(NamedTuple):
+    """
+    Output unit for the collapsed batch API, the HGVS variants shared by every input pair in pair_ids, which all had
+    the same reference id, reference sequence and alternate sequence. The first pair_id is the first one seen.
+    """
+
+    pair_ids: list[str]
+    variants: list[SequenceVariant] | list[VariantRecord]
+
+    @property
+    def multiplicity(self) -> int:
+        """Multiplicity of the unique pair in the input"""
+        return len(self.pair_ids)
+
+
+class ReferenceAssignment(NamedTuple):
+    """
+    Nearest reference of an alternate sequence, see KmerIndex.assign. The candidates are the ids of the shortlisted
+    references in k-mer rank order, score is the alignment score of the chosen one.
+    """
+
+    reference_id: str
+    score: float
+    candidates: list[str]
+
+
+class PairFailure(NamedTuple):
+    """
+    Output unit of the supervised batch API for a pair which could not be processed, with the reason (one of the
+    PAIR_FAILURE_* constants: timeout, memory, crash or error) and a message describing it.
+    """
+
+    pair_id: str
+    reason: str
+    message: str
+
+
+class FallbackPairResult(NamedTuple):
+    """
+    Output unit of the supervised batch API for a pair which failed and was then processed with the ungapped
+    fallback, the approximate variants found along with the PairFailure of the first attempt. These are VariantRecords
+    when run with compact=True.
+    """
+
+    pair_id: str
+    variants: list[SequenceVariant] | list[VariantRecord]
+    failure: PairFailure
+
+
+class AlignmentPlan(NamedTuple):
+    """
+    Strategy picked for a pair by palamedes.planner.plan_alignment (one of the ALIGNMENT_STRATEGY_* constants), whether
+    its variants are exactly those of generate_hgvs_variants, and the signals it was picked from: the cells and
+    estimated memory of a full dynamic programming alignment, the length difference (alternate minus reference) and
+    the Jaccard similarity of the k-mers of both sequences.
+    """
+
+    strategy: str
+    exact: bool
+    dp_cells: int
+    estimated_memory_bytes: int
+    length_delta: int
+    kmer_similarity: float
+
+
+class PlannedPairResult(NamedTuple):
+    """
+    Output unit of the planned batch API, the variants of a pair with the AlignmentPlan used to find them. Refused
+    pairs have no variants. These are VariantRecords when run with compact=True.
+    """
+
+    pair_id: str
+    plan: AlignmentPlan
+    variants: list[SequenceVariant] | list[VariantRecord]
+
+
+class MatrixPairResult(NamedTuple):
+    """
+    Output unit of the all-vs-all API, the HGVS variants of the alternate against the reference. These are
+    VariantRecords when run with compact=True.
+    """
+
+    reference_id: str
+    alternate_id: str
+    variants: list[SequenceVariant] | list[VariantRecord]
+
+
+class MatrixTile(NamedTuple):
+    """
+    Rectangle of the all-vs-all pair matrix processed by one job, the references in reference_start:reference_end
+    against the alternates in alternate_start:alternate_end, with its estimated cost in dynamic programming cells.
+    """
+
+    reference_start: int
+    reference_end: int
+    alternate_start: int
+    alternate_end: int
+    cost: int
+
+
+class FastaIndexEntry(NamedTuple):
+    """
+    One record of a faidx style FASTA index (.fai), see palamedes.fasta.IndexedFasta. The sequence starts at byte
+    offset of the file, and is wrapped in lines of line_bases residues each taking line_width bytes with the line end.
+    """
+
+    name: str
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+
+
+class PrefetchStats(NamedTuple):
+    """
+    Snapshot of the counters of a palamedes.inputs.PrefetchingReader. read_seconds is the time the reader thread spent
+    producing records (decompressing and parsing), reader_blocked_seconds the time it waited for room in the queue
+    because the consumer was busy, and consumer_blocked_seconds the time the consumer waited for the next batch.
+    """
+
+    records: int
+    batches: int
+    read_seconds: float
+    reader_blocked_seconds: float
+    consumer_blocked_seconds: float
+
+    @property
+    def records_per_second(self) -> float:
+        """Throughput of the reader thread alone, how fast input could be consumed if compute was free"""
+        return self.records / self.read_seconds if self.read_seconds else 0.0
+
+    @property
+    def bottleneck(self) -> str:
+        """input when the consumer mostly waited on the reader, compute when the reader mostly waited on the consumer"""
+        return "input" if self.consumer_blocked_seconds > self.reader_blocked_seconds else "compute"
+
+
+class ShardSpec(NamedTuple):
+    """
+    Shard number out of total disjoint shards of the input pairs, numbers are one based (1/4 through 4/4), see
+    palamedes.shards.
+    """
+
+    number: int
+    total: int
+
+    def __str__(self) -> str:
+        return f"{self.number}/{self.total}"
+
+
+class ShardManifest(NamedTuple):
+    """
+    Summary of the work done by one shard, written next to its output so a merge step can check that every shard ran
+    exactly once with the same settings. pair_ids_digest is an order independent digest of the pair ids processed,
+    shard digests combine into the digest of the whole input (see palamedes.shards.merge_shard_manifests).
+    """
+
+    format_version: int
+    palamedes_version: str
+    shard: str
+    settings_digest: str
+    pair_count: int
+    variant_count: int
+    pair_ids_digest: str
+
+
+class CacheStats(NamedTuple):
+    """
+    Snapshot of the counters of a ResultCache. A lookup is counted once, as a hit of the first tier that had the
+    result or as a miss.
+    """
+
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    memory_entries: int
+    disk_bytes: int
+
+
+class VariantCount(NamedTuple):
+    """Output unit of palamedes.aggregate, a distinct variant with the number of times it occurs across the pairs"""
+
+    variant: VariantRecord
+    occurrences: int
+
+
+class PositionSpectrum(NamedTuple):
+    """
+    Mutation spectrum of one position of a reference, the number of variants starting there by HGVS variant type, and
+    the number of substitutions by alternate residue.
+    """
+
+    accession: str
+    position: int
+    variant_types: dict[str, int]
+    substitutions: dict[str, int]
+
+
+class IndexedVariant(NamedTuple):
+    """
+    Output unit of palamedes.variant_index region queries, a variant with its one based closed position range on the
+    reference, its HGVS variant type and string, and the ids of the inputs carrying it.
+    """
+
+    accession: str
+    start: int
+    end: int
+    hgvs_type: str
+    hgvs: str
+    sample_ids: list[str]
+
+
+class InternStats(NamedTuple):
+    """
+    Snapshot of the counters of a VariantInternTable, a lookup is a hit when an equal record was already interned.
+    """
+
+    hits: int
+    misses: int
+    references: int
+    entries: int
+
+
+class MutationScanSpec(NamedTuple):
+    """
+    Designs of a mutational scanning library (see palamedes.scan.iter_mutation_scan): the residues every position is
+    substituted to, the lengths of the deletions scanned along the reference, and the sequences inserted at every
+    position.
+    """
+
+    substitutions: str = STANDARD_AMINO_ACIDS
+    deletion_lengths: tuple[int, ...] = ()
+    insertions: tuple[str, ...] = ()
+
+
+class ScanVariant(NamedTuple):
+    """
+    Output unit of palamedes.scan.iter_mutation_scan, a designed alternate sequence with an id describing the design
+    (sub-<position>-<residue>, del-<position>-<length> or ins-<position>-<residues>, positions as designed, before
+    shifting) and its variant.
+    """
+
+    alternate_id: str
+    alternate: str
+    variant: VariantRecord
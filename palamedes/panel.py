@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import logging
+from multiprocessing import shared_memory
+from typing import Any, Iterable, Iterator
+
+from Bio.Seq import Seq, SequenceDataAbstractBaseClass
+from Bio.SeqRecord import SeqRecord
+
+from palamedes.config import MOLECULE_TYPE_ANNOTATION_KEY, MOLECULE_TYPE_PROTEIN
+
+LOGGER = logging.getLogger(__name__)
+
+# panels attached (or created) by this process, keyed by shared memory name, so unpickling the same panel many times
+# in a worker (once per chunk of pairs) maps the shared memory only once
+_ATTACHED_PANELS: dict[str, ReferencePanel] = {}
+
+
+class SharedSequenceData(SequenceDataAbstractBaseClass):
+    """
+    Biopython sequence content provider reading one reference of a ReferencePanel straight from shared memory. Seq
+    objects built on it pickle as the panel name and reference index, so sending them to a worker process does not
+    copy the sequence, and palamedes.align.get_reversed_sequence can hand the aligner the stored reversed form without
+    copying either.
+    """
+
+    __slots__ = ("panel", "reference_index")
+
+    def __init__(self, panel: ReferencePanel, reference_index: int) -> None:
+        self.panel = panel
+        self.reference_index = reference_index
+        super().__init__()
+
+    def __len__(self) -> int:
+        return len(self.panel.sequence(self.reference_index))
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, slice):
+            return bytes(self.panel.sequence(self.reference_index)[key])
+
+        return self.panel.sequence(self.reference_index)[key]
+
+    def reversed_sequence(self) -> memoryview:
+        return self.panel.reversed_sequence(self.reference_index)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return SharedSequenceData, (self.panel, self.reference_index)
+
+
+def attach_reference_panel(name: str, ids: list[str], offsets: list[int], molecule_type: str) -> ReferencePanel:
+    """Unpickle side of ReferencePanel, returns the panel already attached by this process if there is one"""
+    if (panel := _ATTACHED_PANELS.get(name)) is None:
+        panel = ReferencePanel.attach(name, ids, offsets, molecule_type)
+
+    return panel
+
+
+class ReferencePanel:
+    """
+    Read only set of reference sequences held once in a multiprocessing.shared_memory block, for batches where many
+    worker processes align against the same references. The block holds every reference ASCII encoded back to back,
+    followed by every reference reversed in the same order, which is the form generate_alignment feeds the aligner.
+
+    The process creating the panel owns the block and unlinks it on close. Pickling a panel, or a SeqRecord from
+    seq_record, only sends the block name and the reference layout, and the receiving process attaches to the existing
+    block, so the per-worker memory does not grow with the size of the panel.
+
+    .. code-block:: python
+
+        >>> from palamedes.panel import ReferencePanel
+        >>> from palamedes.batch import generate_hgvs_variants_batch
+        >>> from palamedes.models import SequencePair
+        >>> with ReferencePanel(reference_seq_records) as panel:
+        ...     pairs = [SequencePair(alt_id, panel.seq_record(ref_id), alt) for ref_id, alt_id, alt in library]
+        ...     results = generate_hgvs_variants_batch(pairs, executor_type="process")
+    """
+
+    def __init__(self, references: Iterable[SeqRecord], molecule_type: str = MOLECULE_TYPE_PROTEIN) -> None:
+        ids = []
+        sequences = []
+        for seq_record in references:
+            ids.append(str(seq_record.id))
+            sequences.append(bytes(seq_record.seq))
+
+        offsets = [0]
+        for sequence in sequences:
+            offsets.append(offsets[-1] + len(sequence))
+
+        # shared memory blocks cannot be empty
+        shm = shared_memory.SharedMemory(create=True, size=max(2 * offsets[-1], 1))
+        total = offsets[-1]
+        for sequence, start in zip(sequences, offsets):
+            shm.buf[start : start + len(sequence)] = sequence
+            shm.buf[total + start : total + start + len(sequence)] = sequence[::-1]
+
+        self._setup(shm, ids, offsets, molecule_type, owner=True)
+        LOGGER.debug("Created reference panel %s with %s references (%s bytes)", shm.name, len(ids), shm.size)
+
+    @classmethod
+    def attach(cls, name: str, ids: list[str], offsets: list[int], molecule_type: str) -> ReferencePanel:
+        """Attach to a panel created by another process, this process will never unlink it"""
+        panel = cls.__new__(cls)
+        panel._setup(shared_memory.SharedMemory(name=name), ids, offsets, molecule_type, owner=False)
+        return panel
+
+    def _setup(
+        self, shm: shared_memory.SharedMemory, ids: list[str], offsets: list[int], molecule_type: str, owner: bool
+    ) -> None:
+        if len(set(ids)) != len(ids):
+            shm.close()
+            if owner:
+                shm.unlink()
+
+            raise ValueError("Reference ids of a ReferencePanel must be unique")
+
+        self._shm = shm
+        self._owner = owner
+        self._buffer: memoryview | None = shm.buf.toreadonly()
+        self.name = shm.name
+        self.ids = ids
+        self.offsets = offsets
+        self.molecule_type = molecule_type
+        self._index = {seq_id: index for index, seq_id in enumerate(ids)}
+        _ATTACHED_PANELS[self.name] = self
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[SeqRecord]:
+        for index in range(len(self)):
+            yield self.seq_record(index)
+
+    def __contains__(self, seq_id: object) -> bool:
+        return seq_id in self._index
+
+    def index(self, seq_id: str) -> int:
+        """Position of the reference with the given id"""
+        if (index := self._index.get(seq_id)) is None:
+            raise KeyError(f"Reference not found in panel: {seq_id}")
+
+        return index
+
+    def _view(self, start: int, end: int) -> memoryview:
+        if self._buffer is None:
+            raise ValueError(f"Reference panel {self.name} is closed")
+
+        return self._buffer[start:end]
+
+    def sequence(self, index: int) -> memoryview:
+        """Read only view of the encoded reference at index"""
+        return self._view(self.offsets[index], self.offsets[index + 1])
+
+    def reversed_sequence(self, index: int) -> memoryview:
+        """Read only view of the encoded reference at index, reversed"""
+        return self._view(self.offsets[-1] + self.offsets[index], self.offsets[-1] + self.offsets[index + 1])
+
+    def seq_record(self, key: int | str) -> SeqRecord:
+        """
+        SeqRecord of the reference at an index or with an id, usable anywhere a reference SeqRecord is, its sequence
+        data is read from the shared memory block.
+        """
+        index = self.index(key) if isinstance(key, str) else key
+        return SeqRecord(
+            Seq(SharedSequenceData(self, index)),
+            id=self.ids[index],
+            annotations={MOLECULE_TYPE_ANNOTATION_KEY: self.molecule_type},
+        )
+
+    def close(self) -> None:
+        """Detach from the shared memory, and unlink it if this process created the panel"""
+        if self._buffer is None:
+            return
+
+        self._buffer.release()
+        self._buffer = None
+        _ATTACHED_PANELS.pop(self.name, None)
+        try:
+            self._shm.close()
+        except BufferError:
+            # views handed out by sequence and reversed_sequence are still alive, the mapping goes away with them
+            LOGGER.debug("Reference panel %s still has exported views, leaving it mapped", self.name)
+
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> ReferencePanel:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return attach_reference_panel, (self.name, self.ids, self.offsets, self.molecule_type)
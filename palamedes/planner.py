@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import logging
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+from palamedes import generate_variant_records
+from palamedes.align import make_aligner
+from palamedes.config import (
+    ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING,
+    ALIGNMENT_STRATEGY_IDENTICAL,
+    ALIGNMENT_STRATEGY_REFUSED,
+    ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY,
+    ALIGNMENT_STRATEGY_UNGAPPED,
+    DEFAULT_BATCH_CHUNK_SIZE,
+    DEFAULT_KMER_SIZE,
+    DP_BYTES_PER_CELL,
+    EXECUTOR_TYPE_THREAD,
+    GLOBAL_ALIGN_MODE,
+    MOLECULE_TYPE_PROTEIN,
+)
+from palamedes.kmers import distinct_kmers, encode_sequence
+from palamedes.models import AlignmentPlan, PlannedPairResult, SequencePair
+
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+
+    from palamedes.models import VariantRecord
+
+LOGGER = logging.getLogger(__name__)
+
+GAP_SCORE_ATTRIBUTES = tuple(
+    f"{side}_{position}_{kind}_gap_score"
+    for side in ("target", "query")
+    for position in ("internal", "left", "right")
+    for kind in ("open", "extend")
+)
+
+
+def kmer_similarity(reference: bytes, alternate: bytes, k: int = DEFAULT_KMER_SIZE) -> float:
+    """Jaccard similarity of the distinct k-mers of two encoded sequences, 1.0 when both are shorter than k"""
+    reference_kmers = distinct_kmers(reference, k)
+    alternate_kmers = distinct_kmers(alternate, k)
+    if not reference_kmers and not alternate_kmers:
+        return 1.0
+
+    return len(reference_kmers & alternate_kmers) / len(reference_kmers | alternate_kmers)
+
+
+def is_ungapped_alignment_optimal(reference: bytes, alternate: bytes, aligner: PairwiseAligner) -> bool:
+    """
+    Whether the ungapped alignment of two sequences of the same length L is the only optimal global alignment, so
+    aligning them would return it. Any gapped alignment of such a pair needs at least one gap in each sequence, leaving
+    at most L - 1 aligned columns, so it cannot score more than (L - 1) * max(match, mismatch, 0) + 2 * (the highest
+    gap open score) when extending gaps never scores positive (with negative match and mismatch scores, fewer aligned
+    columns score higher, down to none). When the ungapped score is higher than that, no gapped
+    alignment can tie or beat it. Only aligners with match and mismatch scores (no substitution matrix) qualify.
+    """
+    if aligner.mode != GLOBAL_ALIGN_MODE or aligner.substitution_matrix is not None:
+        return False
+
+    gap_scores = [getattr(aligner, attribute) for attribute in GAP_SCORE_ATTRIBUTES]
+    if any(gap_score > 0 for gap_score in gap_scores):
+        return False
+
+    matches = sum(reference_base == alternate_base for reference_base, alternate_base in zip(reference, alternate))
+    ungapped_score = matches * aligner.match_score + (len(reference) - matches) * aligner.mismatch_score
+    gapped_bound = (len(reference) - 1) * max(aligner.match_score, aligner.mismatch_score, 0) + 2 * max(
+        getattr(aligner, attribute) for attribute in GAP_SCORE_ATTRIBUTES if "_open_" in attribute
+    )
+    return ungapped_score > gapped_bound + aligner.epsilon
+
+
+def plan_alignment(
+    reference: str | SeqRecord,
+    alternate: str | SeqRecord,
+    aligner: PairwiseAligner | None = None,
+    memory_budget_bytes: int | None = None,
+    degrade: bool = False,
+    k: int = DEFAULT_KMER_SIZE,
+) -> AlignmentPlan:
+    """
+    Pick the cheapest strategy giving exactly the variants of `generate_hgvs_variants` for a pair, from its dynamic
+    programming cell count and memory estimate, its length difference and the similarity of its k-mers:
+
+    - identical: the sequences are the same, there are no variants and nothing to align.
+    - substitution_only: the sequences have the same length and the ungapped alignment is provably the optimal one
+      (see is_ungapped_alignment_optimal), variants are read off it in linear time.
+    - dynamic_programming: the full global alignment.
+
+    When the estimated memory of the full alignment is over memory_budget_bytes, the pair is refused, or with
+    `degrade=True` compared with the approximate ungapped strategy when its sequences have the same length (see
+    palamedes.align.generate_ungapped_variant_records), which is not exact. The plan records the strategy and the
+    signals for auditing.
+
+    .. code-block:: python
+
+        >>> from palamedes.planner import plan_alignment
+        >>> plan_alignment("PFKISIHL", "PFKISIHA")
+        AlignmentPlan(strategy='substitution_only', exact=True, dp_cells=81, estimated_memory_bytes=405,
+                      length_delta=0, kmer_similarity=0.714...)
+    """
+    aligner = aligner if aligner is not None else make_aligner()
+    reference_bytes = encode_sequence(reference)
+    alternate_bytes = encode_sequence(alternate)
+    dp_cells = (len(reference_bytes) + 1) * (len(alternate_bytes) + 1)
+    estimated_memory_bytes = dp_cells * DP_BYTES_PER_CELL
+    length_delta = len(alternate_bytes) - len(reference_bytes)
+    make_plan = partial(
+        AlignmentPlan,
+        dp_cells=dp_cells,
+        estimated_memory_bytes=estimated_memory_bytes,
+        length_delta=length_delta,
+        kmer_similarity=kmer_similarity(reference_bytes, alternate_bytes, k),
+    )
+
+    if reference_bytes == alternate_bytes:
+        return make_plan(ALIGNMENT_STRATEGY_IDENTICAL, exact=True)
+
+    if length_delta == 0 and is_ungapped_alignment_optimal(reference_bytes, alternate_bytes, aligner):
+        return make_plan(ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY, exact=True)
+
+    if memory_budget_bytes is not None and estimated_memory_bytes > memory_budget_bytes:
+        if degrade and length_delta == 0:
+            return make_plan(ALIGNMENT_STRATEGY_UNGAPPED, exact=False)
+
+        return make_plan(ALIGNMENT_STRATEGY_REFUSED, exact=False)
+
+    return make_plan(ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING, exact=True)
+
+
+def run_alignment_plan(
+    plan: AlignmentPlan,
+    reference: str | SeqRecord,
+    alternate: str | SeqRecord,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+) -> list[VariantRecord]:
+    """Generate the VariantRecords of a pair with the strategy of its plan, a ValueError is raised for refused pairs"""
+    from palamedes.align import generate_ungapped_variant_records
+
+    if plan.strategy == ALIGNMENT_STRATEGY_IDENTICAL:
+        return []
+
+    if plan.strategy == ALIGNMENT_STRATEGY_REFUSED:
+        raise ValueError(
+            f"Refusing to align a pair needing an estimated {plan.estimated_memory_bytes} bytes, over the memory budget"
+        )
+
+    generate_func: Callable[..., list[VariantRecord]] = generate_variant_records
+    if plan.strategy != ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING:
+        generate_func = generate_ungapped_variant_records
+
+    return generate_func(
+        reference,
+        alternate,
+        molecule_type=molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+    )
+
+
+def generate_planned_variant_records(
+    reference: str | SeqRecord,
+    alternate: str | SeqRecord,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    memory_budget_bytes: int | None = None,
+    degrade: bool = False,
+) -> tuple[AlignmentPlan, list[VariantRecord]]:
+    """
+    Plan a pair with `plan_alignment` and run the strategy picked, returning the plan along with the VariantRecords.
+    A ValueError is raised for refused pairs.
+    """
+    aligner = aligner if aligner is not None else make_aligner()
+    plan = plan_alignment(
+        reference, alternate, aligner=aligner, memory_budget_bytes=memory_budget_bytes, degrade=degrade
+    )
+    return plan, run_alignment_plan(
+        plan,
+        reference,
+        alternate,
+        molecule_type=molecule_type,
+        aligner=aligner,
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+    )
+
+
+def generate_chunk_planned_results(
+    chunk: list[SequencePair],
+    molecule_type: str,
+    aligner: PairwiseAligner,
+    use_non_standard_substitution_rules: bool,
+    memory_budget_bytes: int | None,
+    degrade: bool,
+    compact: bool,
+) -> list[PlannedPairResult]:
+    """
+    Worker function of iter_planned_hgvs_variants_batch, refused pairs get a result without variants. This runs in a
+    thread or a worker process, so it must stay a picklable module level function.
+    """
+    results = []
+    for pair in chunk:
+        plan = plan_alignment(
+            pair.reference, pair.alternate, aligner=aligner, memory_budget_bytes=memory_budget_bytes, degrade=degrade
+        )
+        records = (
+            []
+            if plan.strategy == ALIGNMENT_STRATEGY_REFUSED
+            else run_alignment_plan(
+                plan,
+                pair.reference,
+                pair.alternate,
+                molecule_type=molecule_type,
+                aligner=aligner,
+                use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            )
+        )
+        results.append(
+            PlannedPairResult(pair.pair_id, plan, records if compact else [record.to_hgvs() for record in records])
+        )
+
+    return results
+
+
+def iter_planned_hgvs_variants_batch(
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+    memory_budget_bytes: int | None = None,
+    degrade: bool = False,
+    compact: bool = False,
+) -> Iterator[PlannedPairResult]:
+    """
+    Planned counterpart of `iter_hgvs_variants_batch`, running every pair with the strategy picked by `plan_alignment`
+    and yielding a `palamedes.models.PlannedPairResult` per pair, in input order, with the plan used for auditing.
+    Pairs over memory_budget_bytes are refused (yielded without variants) or, with `degrade=True`, approximated when
+    possible, see `plan_alignment`.
+
+    .. code-block:: python
+
+        >>> from collections import Counter
+        >>> from palamedes.planner import iter_planned_hgvs_variants_batch
+        >>> results = list(iter_planned_hgvs_variants_batch(pairs, memory_budget_bytes=1024**3, compact=True))
+        >>> Counter(result.plan.strategy for result in results)
+        Counter({'substitution_only': 9120, 'dynamic_programming': 846, 'identical': 34})
+    """
+    from palamedes.batch import chunk_pairs, run_chunks
+
+    job = partial(
+        generate_chunk_planned_results,
+        molecule_type=molecule_type,
+        aligner=aligner if aligner is not None else make_aligner(),
+        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+        memory_budget_bytes=memory_budget_bytes,
+        degrade=degrade,
+        compact=compact,
+    )
+    yield from run_chunks(
+        chunk_pairs(pairs, chunk_size),
+        lambda chunk, submit: submit(job, chunk).result,
+        executor_type,
+        max_workers,
+    )
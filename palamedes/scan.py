@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import logging
+import random
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from palamedes.config import (
+    DEFAULT_SCAN_CHECK_SAMPLE_SIZE,
+    HGVS_VARIANT_TYPE_CODES,
+    HGVS_VARIANT_TYPE_DELETION,
+    HGVS_VARIANT_TYPE_DUPLICATION,
+    HGVS_VARIANT_TYPE_EXTENSION,
+    HGVS_VARIANT_TYPE_INSERTION,
+    HGVS_VARIANT_TYPE_REPEAT,
+    HGVS_VARIANT_TYPE_SUBSTITUTION,
+    MOLECULE_TYPE_PROTEIN,
+    REF_SEQUENCE_ID,
+)
+from palamedes.hgvs.utils import categorize_insertion
+from palamedes.models import MutationScanSpec, ScanVariant, VariantRecord
+from palamedes.utils import yield_repeating_substrings
+
+if TYPE_CHECKING:
+    import numpy as np
+    from Bio.Align import PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+
+LOGGER = logging.getLogger(__name__)
+
+
+def encode_residues(sequence: str) -> np.ndarray:
+    import numpy as np
+
+    return np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)
+
+
+def count_runs(mask: np.ndarray) -> np.ndarray:
+    """
+    Number of consecutive True values starting at every index of a boolean array, with an extra 0 for the index past
+    the end, from the position of the next False value.
+    """
+    import numpy as np
+
+    indices = np.arange(len(mask) + 1)
+    false_positions = np.append(np.flatnonzero(~mask), len(mask))
+    return false_positions[np.searchsorted(false_positions, indices)] - indices
+
+
+def iter_substitution_scan(
+    reference: str, accession: str, alternate_residues: str
+) -> Iterator[tuple[str, str, VariantRecord]]:
+    """
+    Every single residue substitution of the reference to one of alternate_residues, as (alternate id, alternate
+    sequence, record) tuples, by position then residue. Substitutions to the reference residue are skipped.
+    """
+    import numpy as np
+
+    residues = encode_residues(reference)
+    alternates = encode_residues(alternate_residues)
+    positions, alternate_indices = np.nonzero(residues[:, np.newaxis] != alternates[np.newaxis, :])
+    substitution_code = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_SUBSTITUTION]
+    for position, alternate_index in zip(positions.tolist(), alternate_indices.tolist()):
+        alternate_residue = alternate_residues[alternate_index]
+        yield (
+            f"sub-{position + 1}-{alternate_residue}",
+            reference[:position] + alternate_residue + reference[position + 1 :],
+            VariantRecord(
+                accession, substitution_code, position + 1, position + 1, reference[position], alternate_residue
+            ),
+        )
+
+
+def iter_deletion_scan(reference: str, accession: str, length: int) -> Iterator[tuple[str, str, VariantRecord]]:
+    """
+    Every deletion of length consecutive residues of the reference, as (alternate id, alternate sequence, record)
+    tuples, by position. Deletions are shifted to their 3' most equivalent position (the HGVS rule), so deleting any
+    residue of a run gives the same alternate, which is only yielded once, under the id of its first designed position.
+    """
+    import numpy as np
+
+    if not 0 < length < len(reference):
+        return
+
+    residues = encode_residues(reference)
+    # a deletion at start can shift by one when the residue it removes is the one following it
+    shifts = count_runs(residues[:-length] == residues[length:])
+    starts = np.arange(len(reference) - length + 1) + shifts
+    _, first_indices = np.unique(starts, return_index=True)
+    deletion_code = HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_DELETION]
+    for designed_start in np.sort(first_indices).tolist():
+        start = int(starts[designed_start])
+        yield (
+            f"del-{designed_start + 1}-{length}",
+            reference[:start] + reference[start + length :],
+            VariantRecord(accession, deletion_code, start + 1, start + length, reference[start : start + length], ""),
+        )
+
+
+def make_insertion_record(reference: str, accession: str, position: int, inserted: str) -> VariantRecord:
+    """
+    Record of inserting residues before the reference index position, already shifted to its 3' most position, with
+    the categorization rules of palamedes.hgvs.utils.categorize_variant_block (see HgvsProteinBuilder for the
+    coordinates of each category).
+    """
+    if position == 0 or position == len(reference):
+        is_start = position == 0
+        return VariantRecord(
+            accession,
+            HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_EXTENSION],
+            1 if is_start else len(reference),
+            1 if is_start else len(reference),
+            reference[0] if is_start else reference[-1],
+            inserted,
+            len(inserted) * (-1 if is_start else 1),
+        )
+
+    upstream = reference[:position]
+    hgvs_type = categorize_insertion(inserted, upstream)
+    if hgvs_type == HGVS_VARIANT_TYPE_DUPLICATION:
+        return VariantRecord(
+            accession, HGVS_VARIANT_TYPE_CODES[hgvs_type], position - len(inserted) + 1, position, inserted, ""
+        )
+
+    if hgvs_type == HGVS_VARIANT_TYPE_REPEAT:
+        unit = [substring for substring in yield_repeating_substrings(inserted) if upstream.endswith(substring)][-1]
+        return VariantRecord(
+            accession,
+            HGVS_VARIANT_TYPE_CODES[hgvs_type],
+            position - len(unit) + 1,
+            position,
+            unit,
+            "",
+            len(inserted) // len(unit),
+        )
+
+    return VariantRecord(
+        accession,
+        HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_INSERTION],
+        position,
+        position + 1,
+        reference[position - 1 : position + 1],
+        inserted,
+    )
+
+
+def iter_insertion_scan(reference: str, accession: str, inserted: str) -> Iterator[tuple[str, str, VariantRecord]]:
+    """
+    Every insertion of the inserted residues into the reference (before the first residue, between every two, and
+    after the last), as (alternate id, alternate sequence, record) tuples, by position. Like deletions, insertions are
+    shifted to their 3' most equivalent position, rotating the inserted residues, and equivalent ones are only yielded
+    once. Depending on the flanking residues they are categorized as extensions, duplications, repeats or insertions.
+    """
+    import numpy as np
+
+    if not inserted:
+        return
+
+    residues = encode_residues(reference)
+    inserted_residues = encode_residues(inserted)
+    positions = np.arange(len(reference) + 1)
+    # an insertion before position can shift past the residues continuing the inserted ones periodically, which
+    # depends on the phase of position relative to the length of the insertion
+    shifts = np.zeros(len(positions), dtype=np.int64)
+    for phase in range(len(inserted)):
+        phase_runs = count_runs(residues == inserted_residues[(np.arange(len(reference)) - phase) % len(inserted)])
+        phase_positions = positions[phase :: len(inserted)]
+        shifts[phase_positions] = phase_runs[phase_positions]
+
+    seen = set()
+    for designed_position, shift in enumerate(shifts.tolist()):
+        position = designed_position + shift
+        rotation = shift % len(inserted)
+        shifted_inserted = inserted[rotation:] + inserted[:rotation]
+        if (position, shifted_inserted) in seen:
+            continue
+
+        seen.add((position, shifted_inserted))
+        yield (
+            f"ins-{designed_position}-{inserted}",
+            reference[:position] + shifted_inserted + reference[position:],
+            make_insertion_record(reference, accession, position, shifted_inserted),
+        )
+
+
+def iter_mutation_scan(
+    reference: str | SeqRecord,
+    spec: MutationScanSpec | None = None,
+) -> Iterator[ScanVariant]:
+    """
+    Generate a designed mutational scanning library (site saturation for example) of a reference, yielding every
+    designed alternate sequence together with its protein variant, without aligning anything: substitutions at every
+    position, then deletions of every length in spec.deletion_lengths, then insertions of every sequence in
+    spec.insertions between every two residues and at both ends. Designs giving the same alternate sequence are only
+    yielded once. The positions of the deletions and insertions are computed with array operations over the whole
+    reference, shifting each to its 3' most equivalent position (the HGVS rule), and categorized with the same rules
+    as generate_hgvs_variants.
+
+    The variants are those generate_variant_records finds for these alternates with the default alignment scores,
+    for which check_mutation_scan cross-checks a sample. Aligners with other scores can align some designs differently.
+    String references use the same default id as generate_hgvs_variants.
+
+    .. code-block:: python
+
+        >>> from palamedes.models import MutationScanSpec
+        >>> from palamedes.scan import iter_mutation_scan
+        >>> library = list(iter_mutation_scan("PFKISIHL", MutationScanSpec(deletion_lengths=(1, 2), insertions=("G",))))
+        >>> len(library)
+        175
+        >>> library[-1]
+        ScanVariant(alternate_id='ins-8-G', alternate='PFKISIHLG', variant=VariantRecord(accession='ref', category=2,
+                    start=8, end=8, ref='L', alt='G', length=1))
+    """
+    spec = spec if spec is not None else MutationScanSpec()
+    if isinstance(reference, str):
+        accession, sequence = REF_SEQUENCE_ID, reference
+    else:
+        accession, sequence = str(reference.id), str(reference.seq)
+
+    scans: list[Iterable[tuple[str, str, VariantRecord]]] = [
+        iter_substitution_scan(sequence, accession, spec.substitutions)
+    ]
+    scans += [iter_deletion_scan(sequence, accession, length) for length in spec.deletion_lengths]
+    scans += [iter_insertion_scan(sequence, accession, inserted) for inserted in spec.insertions]
+
+    # records are shifted to their 3' most position, so designs giving the same alternate (inserting "GS" and "SG"
+    # next to each other for example) share a record, which is much smaller to keep than the alternate
+    seen_records = set()
+    for scan in scans:
+        for alternate_id, alternate, record in scan:
+            if record in seen_records:
+                continue
+
+            seen_records.add(record)
+            yield ScanVariant(alternate_id, alternate, record)
+
+
+def check_mutation_scan(
+    reference: str | SeqRecord,
+    scan_variants: Iterable[ScanVariant],
+    sample_size: int | None = DEFAULT_SCAN_CHECK_SAMPLE_SIZE,
+    seed: int = 0,
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+) -> list[tuple[ScanVariant, list[VariantRecord]]]:
+    """
+    Cross-check a random sample of sample_size designs from iter_mutation_scan (all of them when None) against the
+    variants generate_variant_records finds by aligning them, returning the designs which differ along with the
+    aligned variants. An empty list means the whole sample agrees.
+    """
+    from palamedes import generate_variant_records
+
+    scan_variants = list(scan_variants)
+    if sample_size is not None and sample_size < len(scan_variants):
+        scan_variants = random.Random(seed).sample(scan_variants, sample_size)
+
+    mismatches = []
+    for scan_variant in scan_variants:
+        records = generate_variant_records(
+            reference, scan_variant.alternate, molecule_type=molecule_type, aligner=aligner
+        )
+        if records != [scan_variant.variant]:
+            mismatches.append((scan_variant, records))
+
+    LOGGER.debug("Checked %s designs, %s differ from the alignment", len(scan_variants), len(mismatches))
+    return mismatches
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from palamedes.config import SHARD_MANIFEST_FORMAT_VERSION
+from palamedes.models import PairResult, SequencePair, ShardManifest, ShardSpec
+
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner
+
+# pair id digests are summed modulo this, so shard digests add up to the digest of the whole input in any order
+PAIR_IDS_DIGEST_MODULUS = 2**128
+
+
+def parse_shard(shard: str | ShardSpec) -> ShardSpec:
+    """Parse an i/N shard specification (one based, 1/4 through 4/4), ShardSpecs are validated and returned as is"""
+    if isinstance(shard, str):
+        try:
+            number, total = (int(part) for part in shard.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard: {shard}, expected i/N, for example 1/4") from None
+
+        shard = ShardSpec(number, total)
+
+    if not 1 <= shard.number <= shard.total:
+        raise ValueError(f"Invalid shard: {shard}, the shard number must be between 1 and the shard total")
+
+    return shard
+
+
+def shard_of(pair_id: str, count: int) -> int:
+    """
+    One based shard of a pair, from a stable hash of its id, so every machine assigns the same pairs to the same shard
+    without coordinating (unlike the builtin hash, which is salted per process).
+    """
+    return int.from_bytes(hashlib.blake2b(pair_id.encode(), digest_size=8).digest(), "big") % count + 1
+
+
+def filter_shard(pairs: Iterable[SequencePair], shard: str | ShardSpec) -> Iterator[SequencePair]:
+    """Lazily keep the pairs assigned to shard, see shard_of"""
+    shard = parse_shard(shard)
+    for pair in pairs:
+        if shard_of(pair.pair_id, shard.total) == shard.number:
+            yield pair
+
+
+def make_settings_digest(
+    molecule_type: str, aligner: PairwiseAligner, use_non_standard_substitution_rules: bool
+) -> str:
+    """Digest of every setting that changes the variants, shards run with different settings cannot be merged"""
+    from palamedes.cache import aligner_fingerprint
+
+    digest = hashlib.sha256()
+    for part in (molecule_type, str(use_non_standard_substitution_rules), aligner_fingerprint(aligner)):
+        digest.update(part.encode())
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+class ShardManifestRecorder:
+    """
+    Accumulates the ShardManifest of a shard from its results, as they stream out of the batch API.
+
+    .. code-block:: python
+
+        >>> from palamedes.batch import iter_hgvs_variants_batch
+        >>> from palamedes.shards import ShardManifestRecorder, make_settings_digest, write_shard_manifest
+        >>> recorder = ShardManifestRecorder("2/8", make_settings_digest("protein", aligner, False))
+        >>> for pair_result in iter_hgvs_variants_batch(pairs, aligner=aligner, shard="2/8"):
+        ...     recorder.record(pair_result)
+        >>> write_shard_manifest("library.shard-2.json", recorder.manifest())
+    """
+
+    def __init__(self, shard: str | ShardSpec, settings_digest: str) -> None:
+        self.shard = parse_shard(shard)
+        self.settings_digest = settings_digest
+        self.pair_count = 0
+        self.variant_count = 0
+        self._pair_ids_digest = 0
+
+    def record(self, pair_result: PairResult) -> None:
+        self.record_pair(pair_result.pair_id, len(pair_result.variants))
+
+    def record_pair(self, pair_id: str, variant_count: int) -> None:
+        """Record a pair from its id and variant count, for pairs completed by an earlier run, see BatchCheckpoint"""
+        self.pair_count += 1
+        self.variant_count += variant_count
+        pair_id_digest = int.from_bytes(hashlib.blake2b(pair_id.encode(), digest_size=16).digest(), "big")
+        self._pair_ids_digest = (self._pair_ids_digest + pair_id_digest) % PAIR_IDS_DIGEST_MODULUS
+
+    def manifest(self) -> ShardManifest:
+        from palamedes import __version__
+
+        return ShardManifest(
+            format_version=SHARD_MANIFEST_FORMAT_VERSION,
+            palamedes_version=__version__,
+            shard=str(self.shard),
+            settings_digest=self.settings_digest,
+            pair_count=self.pair_count,
+            variant_count=self.variant_count,
+            pair_ids_digest=f"{self._pair_ids_digest:032x}",
+        )
+
+
+def write_shard_manifest(path: str, manifest: ShardManifest) -> None:
+    with open(path, "w") as handle:
+        json.dump(manifest._asdict(), handle, indent=2)
+
+
+def read_shard_manifest(path: str) -> ShardManifest:
+    with open(path) as handle:
+        manifest = ShardManifest(**json.load(handle))
+
+    if manifest.format_version != SHARD_MANIFEST_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported shard manifest format version: {manifest.format_version}, "
+            f"expected: {SHARD_MANIFEST_FORMAT_VERSION}"
+        )
+
+    return manifest
+
+
+def merge_shard_manifests(manifests: Iterable[ShardManifest | str]) -> ShardManifest:
+    """
+    Combine the manifests (or manifest paths) of every shard of a run into the manifest an unsharded (1/1) run would
+    have written, checking that each shard of the same total is present exactly once and that all of them ran with the
+    same palamedes version and settings.
+    """
+    loaded = [read_shard_manifest(manifest) if isinstance(manifest, str) else manifest for manifest in manifests]
+    if not loaded:
+        raise ValueError("No shard manifests to merge")
+
+    shards = [parse_shard(manifest.shard) for manifest in loaded]
+    total = shards[0].total
+    if any(shard.total != total for shard in shards):
+        raise ValueError(f"Cannot merge shards of different totals: {', '.join(map(str, shards))}")
+
+    if sorted(shard.number for shard in shards) != list(range(1, total + 1)):
+        raise ValueError(f"Shards must each be present once, got: {', '.join(map(str, sorted(shards)))}")
+
+    for field in ("palamedes_version", "settings_digest"):
+        if len({getattr(manifest, field) for manifest in loaded}) != 1:
+            raise ValueError(f"Cannot merge shards with different {field}")
+
+    pair_ids_digest = sum(int(manifest.pair_ids_digest, 16) for manifest in loaded) % PAIR_IDS_DIGEST_MODULUS
+    return ShardManifest(
+        format_version=SHARD_MANIFEST_FORMAT_VERSION,
+        palamedes_version=loaded[0].palamedes_version,
+        shard=str(ShardSpec(1, 1)),
+        settings_digest=loaded[0].settings_digest,
+        pair_count=sum(manifest.pair_count for manifest in loaded),
+        variant_count=sum(manifest.variant_count for manifest in loaded),
+        pair_ids_digest=f"{pair_ids_digest:032x}",
+    )
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from array import array
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, BinaryIO, Iterable, Iterator
+
+from palamedes.align import generate_seq_record
+from palamedes.config import (
+    ALIGNMENT_STORE_FORMAT_VERSION,
+    DEFAULT_BATCH_CHUNK_SIZE,
+    EXECUTOR_TYPE_THREAD,
+    MOLECULE_TYPE_PROTEIN,
+)
+from palamedes.models import PairResult, SequencePair
+
+if TYPE_CHECKING:
+    import numpy as np
+    from Bio.Align import Alignment, PairwiseAligner
+    from Bio.SeqRecord import SeqRecord
+
+LOGGER = logging.getLogger(__name__)
+
+METADATA_FILE_NAME = "metadata.json"
+STRING_COLUMNS = (
+    "pair_ids",
+    "reference_ids",
+    "reference_sequences",
+    "alternate_ids",
+    "alternate_sequences",
+)
+
+
+def map_array(path: str, dtype: str) -> np.ndarray:
+    """Memory-map a raw binary file as a read only 1D numpy array, numpy cannot map empty files so these are special"""
+    import numpy as np
+
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+class StringColumnWriter:
+    """
+    Append only writer for a column of strings, stored as one UTF-8 buffer ({name}.bin) and an int64 array of
+    offsets into it ({name}.offsets.bin), where string i spans offsets[i]:offsets[i + 1].
+    """
+
+    def __init__(self, directory: str, name: str) -> None:
+        self._directory = directory
+        self._name = name
+        self._handle: BinaryIO = open(os.path.join(directory, f"{name}.bin"), "wb")
+        self._offsets = array("q", [0])
+
+    def append(self, value: str) -> int:
+        """Append a string, returning its index in the column"""
+        encoded = value.encode()
+        self._handle.write(encoded)
+        self._offsets.append(self._offsets[-1] + len(encoded))
+        return len(self._offsets) - 2
+
+    def close(self) -> None:
+        self._handle.close()
+        with open(os.path.join(self._directory, f"{self._name}.offsets.bin"), "wb") as offsets_handle:
+            self._offsets.tofile(offsets_handle)
+
+
+class StringColumn:
+    """Read side of StringColumnWriter, both files are memory-mapped and strings are decoded on access"""
+
+    def __init__(self, directory: str, name: str) -> None:
+        self._buffer = map_array(os.path.join(directory, f"{name}.bin"), "u1")
+        self._offsets = map_array(os.path.join(directory, f"{name}.offsets.bin"), "i8")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self._buffer[self._offsets[index] : self._offsets[index + 1]].tobytes().decode()
+
+
+class AlignmentStoreWriter:
+    """
+    Writer for an on-disk store of alignments, which can be re-processed into variants later without paying for the
+    alignment again (see AlignmentStore). The store is a directory of raw binary files, each a flat array that can be
+    memory-mapped on read:
+
+    - metadata.json: format version, palamedes version, molecule type and counts.
+    - scores.bin: float64 alignment score per pair.
+    - coordinates.bin: int32 alignment coordinates, per pair the reference row followed by the alternate row.
+    - coordinate_offsets.bin: int64 offsets into the coordinates in columns, pair i spans offsets[i]:offsets[i + 1].
+    - reference_index.bin: int32 index per pair into the reference ids and sequences, which are stored once each.
+    - pair_ids, reference_ids, reference_sequences, alternate_ids, alternate_sequences: string columns, see
+      StringColumnWriter.
+
+    Data is streamed to disk as pairs are added, only the offsets and the reference lookup are held in memory.
+    """
+
+    def __init__(self, path: str, molecule_type: str = MOLECULE_TYPE_PROTEIN) -> None:
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(metadata_path := os.path.join(path, METADATA_FILE_NAME)):
+            os.remove(metadata_path)
+
+        self._path = path
+        self._molecule_type = molecule_type
+        self._columns = {name: StringColumnWriter(path, name) for name in STRING_COLUMNS}
+        self._scores_handle: BinaryIO = open(os.path.join(path, "scores.bin"), "wb")
+        self._coordinates_handle: BinaryIO = open(os.path.join(path, "coordinates.bin"), "wb")
+        self._coordinate_offsets = array("q", [0])
+        self._reference_index = array("i")
+        self._reference_lookup: dict[tuple[str, str], int] = {}
+        self._count = 0
+
+    def add(self, pair_id: str, alignment: Alignment) -> None:
+        """Add an alignment (generated by generate_alignment) to the store, under the given pair_id"""
+        import numpy as np
+
+        reference_seq_record, alternate_seq_record = alignment.sequences
+        reference_key = (str(reference_seq_record.id), str(reference_seq_record.seq))
+        if (reference_index := self._reference_lookup.get(reference_key)) is None:
+            reference_index = self._columns["reference_ids"].append(reference_key[0])
+            self._columns["reference_sequences"].append(reference_key[1])
+            self._reference_lookup[reference_key] = reference_index
+
+        self._reference_index.append(reference_index)
+        self._columns["pair_ids"].append(pair_id)
+        self._columns["alternate_ids"].append(str(alternate_seq_record.id))
+        self._columns["alternate_sequences"].append(str(alternate_seq_record.seq))
+
+        coordinates = np.ascontiguousarray(alignment.coordinates, dtype=np.int32)
+        coordinates.tofile(self._coordinates_handle)
+        self._coordinate_offsets.append(self._coordinate_offsets[-1] + coordinates.shape[1])
+        np.array([getattr(alignment, "score", np.nan)], dtype=np.float64).tofile(self._scores_handle)
+        self._count += 1
+
+    def _close_files(self) -> None:
+        for column in self._columns.values():
+            column.close()
+
+        self._scores_handle.close()
+        self._coordinates_handle.close()
+
+    def close(self) -> None:
+        """
+        Flush everything to disk, the metadata is written last (to a temporary file renamed into place) so a partially
+        written store is never readable
+        """
+        from palamedes import __version__
+
+        self._close_files()
+        with open(os.path.join(self._path, "coordinate_offsets.bin"), "wb") as handle:
+            self._coordinate_offsets.tofile(handle)
+
+        with open(os.path.join(self._path, "reference_index.bin"), "wb") as handle:
+            self._reference_index.tofile(handle)
+
+        temporary_path = os.path.join(self._path, f"{METADATA_FILE_NAME}.tmp")
+        with open(temporary_path, "w") as handle:
+            json.dump(
+                {
+                    "format_version": ALIGNMENT_STORE_FORMAT_VERSION,
+                    "palamedes_version": __version__,
+                    "molecule_type": self._molecule_type,
+                    "count": self._count,
+                    "reference_count": len(self._reference_lookup),
+                },
+                handle,
+            )
+
+        os.replace(temporary_path, os.path.join(self._path, METADATA_FILE_NAME))
+        LOGGER.debug("Wrote %s alignments to store: %s", self._count, self._path)
+
+    def abort(self) -> None:
+        """Close the files without writing the metadata, leaving the store unreadable"""
+        self._close_files()
+        LOGGER.warning("Aborted writing the alignment store after %s alignments: %s", self._count, self._path)
+
+    def __enter__(self) -> AlignmentStoreWriter:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *exc_info: object) -> None:
+        # a store interrupted by an exception is incomplete, it must not look finished
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+class AlignmentStore:
+    """
+    Read side of an alignment store written by AlignmentStoreWriter. Every file is memory-mapped, and alignments are
+    rehydrated one at a time on access, so opening a store is cheap regardless of its size. Reference SeqRecords
+    are shared between the alignments of the same reference.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, METADATA_FILE_NAME)) as handle:
+            self.metadata: dict[str, Any] = json.load(handle)
+
+        if self.metadata["format_version"] != ALIGNMENT_STORE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported alignment store format version: {self.metadata['format_version']}, "
+                f"expected: {ALIGNMENT_STORE_FORMAT_VERSION}"
+            )
+
+        self.molecule_type: str = self.metadata["molecule_type"]
+        self._columns = {name: StringColumn(path, name) for name in STRING_COLUMNS}
+        self._scores = map_array(os.path.join(path, "scores.bin"), "f8")
+        self._coordinates = map_array(os.path.join(path, "coordinates.bin"), "i4")
+        self._coordinate_offsets = map_array(os.path.join(path, "coordinate_offsets.bin"), "i8")
+        self._reference_index = map_array(os.path.join(path, "reference_index.bin"), "i4")
+        self._reference_seq_record = lru_cache(maxsize=None)(self._make_reference_seq_record)
+
+    def __len__(self) -> int:
+        return int(self.metadata["count"])
+
+    def pair_id(self, index: int) -> str:
+        return self._columns["pair_ids"][index]
+
+    def _make_reference_seq_record(self, reference_index: int) -> SeqRecord:
+        return generate_seq_record(
+            self._columns["reference_sequences"][reference_index],
+            self._columns["reference_ids"][reference_index],
+            molecule_type=self.molecule_type,
+        )
+
+    def alignment(self, index: int) -> Alignment:
+        """Rehydrate the alignment at index, equivalent to the one originally added to the store"""
+        import numpy as np
+        from Bio.Align import Alignment
+
+        if not 0 <= index < len(self):
+            raise IndexError(f"Alignment index out of range: {index}")
+
+        start_column, end_column = self._coordinate_offsets[index], self._coordinate_offsets[index + 1]
+        width = end_column - start_column
+        coordinates = np.array(self._coordinates[2 * start_column : 2 * end_column], dtype=np.intp).reshape(2, width)
+
+        alignment = Alignment(
+            [
+                self._reference_seq_record(int(self._reference_index[index])),
+                generate_seq_record(
+                    self._columns["alternate_sequences"][index],
+                    self._columns["alternate_ids"][index],
+                    molecule_type=self.molecule_type,
+                ),
+            ],
+            coordinates,
+        )
+        setattr(alignment, "score", float(self._scores[index]))
+        return alignment
+
+    def __iter__(self) -> Iterator[tuple[str, Alignment]]:
+        for index in range(len(self)):
+            yield self.pair_id(index), self.alignment(index)
+
+
+def write_alignment_store(
+    path: str,
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+) -> None:
+    """
+    Align every pair (see `iter_alignments_batch`) and write the alignments to a new store at path.
+    """
+    from palamedes.batch import iter_alignments_batch
+
+    with AlignmentStoreWriter(path, molecule_type=molecule_type) as writer:
+        for pair_id, alignment in iter_alignments_batch(
+            pairs,
+            molecule_type=molecule_type,
+            aligner=aligner,
+            executor_type=executor_type,
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+        ):
+            writer.add(pair_id, alignment)
+
+
+def iter_hgvs_variants_from_store(
+    store: AlignmentStore | str,
+    use_non_standard_substitution_rules: bool = False,
+) -> Iterator[PairResult]:
+    """
+    Re-derive the variants for every alignment in a store, in the order they were added, without re-aligning. Each
+    alignment is rehydrated lazily and passed to `generate_hgvs_variants_from_alignment`, so only block extraction
+    and building are paid for.
+
+    .. code-block:: python
+
+        >>> from palamedes.store import write_alignment_store, iter_hgvs_variants_from_store
+        >>> write_alignment_store("library.alignments", pairs)
+        >>> for pair_result in iter_hgvs_variants_from_store("library.alignments", use_non_standard_substitution_rules=True):
+        ...     print(pair_result.pair_id, [variant.format() for variant in pair_result.variants])
+    """
+    from palamedes import generate_hgvs_variants_from_alignment
+
+    if isinstance(store, str):
+        store = AlignmentStore(store)
+
+    for pair_id, alignment in store:
+        yield PairResult(
+            pair_id,
+            generate_hgvs_variants_from_alignment(
+                alignment,
+                use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+                molecule_type=store.molecule_type,
+            ),
+        )
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import Connection, wait
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, NamedTuple
+
+from palamedes import generate_variant_records
+from palamedes.align import generate_ungapped_variant_records, make_aligner
+from palamedes.config import (
+    MOLECULE_TYPE_PROTEIN,
+    PAIR_FAILURE_CRASH,
+    PAIR_FAILURE_ERROR,
+    PAIR_FAILURE_MEMORY,
+    PAIR_FAILURE_TIMEOUT,
+)
+from palamedes.models import FallbackPairResult, PairFailure, PairResult, SequencePair
+
+if TYPE_CHECKING:
+    from multiprocessing.process import BaseProcess
+
+    from Bio.Align import PairwiseAligner
+
+    from palamedes.models import VariantRecord
+
+LOGGER = logging.getLogger(__name__)
+
+
+def measure_address_space_bytes() -> int | None:
+    """Size of the address space of the current process, None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def warm_up_worker(molecule_type: str, aligner: PairwiseAligner) -> None:
+    """Import and initialize everything processing a pair needs, an alignment and the hgvs objects of its variants"""
+    for record in generate_variant_records("A", "AC", molecule_type=molecule_type, aligner=aligner):
+        record.to_hgvs()
+
+
+def set_memory_limit(memory_budget_bytes: int) -> None:
+    """
+    Cap the address space of the current process to what it uses now plus memory_budget_bytes, allocations beyond it
+    raise MemoryError. The address space includes the interpreter and every imported library (over 100 MB with
+    numpy, Biopython and hgvs), so the budget is only meaningful on top of that baseline.
+    """
+    try:
+        import resource
+    except ImportError:
+        LOGGER.warning("Memory limits are not supported on this platform, ignoring: %s bytes", memory_budget_bytes)
+        return
+
+    if (baseline_bytes := measure_address_space_bytes()) is None:
+        LOGGER.warning("Cannot measure the address space on this platform, ignoring: %s bytes", memory_budget_bytes)
+        return
+
+    resource.setrlimit(resource.RLIMIT_AS, (baseline_bytes + memory_budget_bytes, baseline_bytes + memory_budget_bytes))
+
+
+def run_supervised_worker(
+    connection: Connection,
+    molecule_type: str,
+    aligner: PairwiseAligner,
+    use_non_standard_substitution_rules: bool,
+    compact: bool,
+    memory_limit_bytes: int | None,
+) -> None:
+    """
+    Worker process loop of iter_hgvs_variants_supervised, processing one (position, pair, fallback) task at a time until
+    it receives None. Errors are sent back as (reason, message) instead of a result, the process itself only dies
+    when it is killed or crashes.
+    """
+    if memory_limit_bytes is not None:
+        # the limit is a budget per pair, on top of the address space of a worker ready to process one
+        warm_up_worker(molecule_type, aligner)
+        set_memory_limit(memory_limit_bytes)
+
+    while (task := connection.recv()) is not None:
+        position, pair, fallback = task
+        generate_func: Callable[..., list[VariantRecord]] = generate_variant_records
+        if fallback:
+            generate_func = generate_ungapped_variant_records
+
+        try:
+            records = generate_func(
+                pair.reference,
+                pair.alternate,
+                molecule_type=molecule_type,
+                aligner=aligner,
+                use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            )
+            connection.send((position, records if compact else [record.to_hgvs() for record in records], None))
+        except MemoryError:
+            connection.send(
+                (position, None, (PAIR_FAILURE_MEMORY, f"Exceeded the memory budget of {memory_limit_bytes} bytes"))
+            )
+        except Exception as error:
+            connection.send((position, None, (PAIR_FAILURE_ERROR, f"{type(error).__name__}: {error}")))
+
+
+class SupervisedTask(NamedTuple):
+    position: int
+    pair: SequencePair
+    # failure of the first attempt, when this is the retry with the fallback
+    failure: PairFailure | None = None
+
+
+class SupervisedWorker:
+    """A worker process of iter_hgvs_variants_supervised with its connection and the task it is running, if any"""
+
+    def __init__(self, context: Any, worker_args: tuple[Any, ...]) -> None:
+        self.connection, worker_connection = context.Pipe()
+        self.process: BaseProcess = context.Process(
+            target=run_supervised_worker, args=(worker_connection, *worker_args), daemon=True
+        )
+        self.process.start()
+        worker_connection.close()
+        self.task: SupervisedTask | None = None
+        self.deadline = float("inf")
+
+    def start(self, task: SupervisedTask, timeout_seconds: float | None) -> None:
+        self.task = task
+        self.deadline = time.monotonic() + timeout_seconds if timeout_seconds is not None else float("inf")
+        self.connection.send((task.position, task.pair, task.failure is not None))
+
+    def stop(self) -> None:
+        if self.task is None and self.process.is_alive():
+            try:
+                self.connection.send(None)
+                self.process.join(timeout=1)
+            except OSError:
+                pass
+
+        if self.process.is_alive():
+            self.process.kill()
+
+        self.process.join()
+        self.connection.close()
+
+
+def iter_hgvs_variants_supervised(
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    max_workers: int | None = None,
+    timeout_seconds: float | None = None,
+    memory_limit_bytes: int | None = None,
+    fallback: bool = False,
+    compact: bool = False,
+) -> Iterator[PairResult | FallbackPairResult | PairFailure]:
+    """
+    Failure isolating counterpart of `iter_hgvs_variants_batch`, for inputs where a single pathological pair (a huge
+    low complexity sequence for example) could otherwise stall or take down a whole run. Pairs are sent one at a time
+    to dedicated worker processes, yielding a `PairResult` per pair, or a `palamedes.models.PairFailure` with the
+    reason for pairs which could not be processed, in input order:
+
+    - timeout: the pair ran for longer than timeout_seconds, its worker is killed and replaced.
+    - memory: the pair needed more than memory_limit_bytes, a budget on top of the address space of a worker process
+      ready to process pairs (with its interpreter and libraries loaded), enforced by capping the address space of
+      each worker process (only supported on Linux).
+    - crash: the worker died while processing the pair, it is replaced.
+    - error: the pair raised an exception.
+
+    With `fallback=True`, failed pairs are retried once with `generate_ungapped_variant_records`, which is linear in
+    the length of the pair but only applies to pairs of the same length, and approximates the alignment by assuming
+    it has no gaps. Pairs it processes are yielded as a `palamedes.models.FallbackPairResult`, carrying the failure of
+    the first attempt so the approximate results can be told apart. Failed pairs of different lengths are not retried,
+    and are reported like pairs which fail both attempts, with the reason of the first one.
+
+    The input is consumed lazily, with at most four pairs per worker waiting to be yielded.
+
+    .. code-block:: python
+
+        >>> from palamedes.models import PairFailure
+        >>> from palamedes.supervisor import iter_hgvs_variants_supervised
+        >>> for result in iter_hgvs_variants_supervised(pairs, timeout_seconds=60, memory_limit_bytes=4 * 1024**3):
+        ...     if isinstance(result, PairFailure):
+        ...         print(f"{result.pair_id} failed ({result.reason}): {result.message}")
+    """
+    from palamedes.batch import register_aligner_reducer
+
+    register_aligner_reducer()
+    worker_count = max_workers or os.cpu_count() or 1
+    worker_args = (
+        molecule_type,
+        aligner if aligner is not None else make_aligner(),
+        use_non_standard_substitution_rules,
+        compact,
+        memory_limit_bytes,
+    )
+    context = multiprocessing.get_context()
+    workers = [SupervisedWorker(context, worker_args) for _ in range(worker_count)]
+    max_buffered = 4 * worker_count
+
+    input_pairs = enumerate(pairs)
+    input_exhausted = False
+    retries: deque[SupervisedTask] = deque()
+    outcomes: dict[int, PairResult | FallbackPairResult | PairFailure] = {}
+    next_index = read_count = 0
+
+    def fail(task: SupervisedTask, reason: str, message: str) -> None:
+        if task.failure is not None:
+            LOGGER.debug("Fallback failed for %s: %s", task.pair.pair_id, message)
+            outcomes[task.position] = task.failure
+        elif fallback and len(task.pair.reference) == len(task.pair.alternate):
+            retries.append(task._replace(failure=PairFailure(task.pair.pair_id, reason, message)))
+        else:
+            outcomes[task.position] = PairFailure(task.pair.pair_id, reason, message)
+
+    def replace(worker_index: int) -> None:
+        workers[worker_index].stop()
+        workers[worker_index] = SupervisedWorker(context, worker_args)
+
+    try:
+        while True:
+            for worker in workers:
+                if worker.task is not None:
+                    continue
+
+                if retries:
+                    worker.start(retries.popleft(), timeout_seconds)
+                elif not input_exhausted and read_count - next_index < max_buffered:
+                    try:
+                        index, pair = next(input_pairs)
+                    except StopIteration:
+                        input_exhausted = True
+                        continue
+
+                    read_count += 1
+                    worker.start(SupervisedTask(index, pair), timeout_seconds)
+
+            busy_workers = [worker for worker in workers if worker.task is not None]
+            if not busy_workers and input_exhausted and not retries:
+                break
+
+            if busy_workers:
+                deadline = min(worker.deadline for worker in busy_workers)
+                wait(
+                    [worker.connection for worker in busy_workers]
+                    + [worker.process.sentinel for worker in busy_workers],
+                    timeout=None if deadline == float("inf") else max(0.0, deadline - time.monotonic()),
+                )
+
+            for worker_index, worker in enumerate(workers):
+                if (task := worker.task) is None:
+                    continue
+
+                if worker.connection.poll():
+                    try:
+                        _, variants, failure = worker.connection.recv()
+                    except (EOFError, OSError):
+                        LOGGER.warning("Worker crashed processing %s, replacing it", task.pair.pair_id)
+                        fail(task, PAIR_FAILURE_CRASH, f"Worker exited with code {worker.process.exitcode}")
+                        replace(worker_index)
+                        continue
+
+                    worker.task = None
+                    if failure is not None:
+                        fail(task, *failure)
+                    elif task.failure is not None:
+                        LOGGER.warning("Used the ungapped fallback for %s: %s", task.pair.pair_id, task.failure)
+                        outcomes[task.position] = FallbackPairResult(task.pair.pair_id, variants, task.failure)
+                    else:
+                        outcomes[task.position] = PairResult(task.pair.pair_id, variants)
+                elif not worker.process.is_alive():
+                    LOGGER.warning("Worker crashed processing %s, replacing it", task.pair.pair_id)
+                    fail(task, PAIR_FAILURE_CRASH, f"Worker exited with code {worker.process.exitcode}")
+                    replace(worker_index)
+                elif time.monotonic() >= worker.deadline:
+                    LOGGER.warning("Pair %s timed out, replacing its worker", task.pair.pair_id)
+                    fail(task, PAIR_FAILURE_TIMEOUT, f"Exceeded the time limit of {timeout_seconds}s")
+                    replace(worker_index)
+
+            while next_index in outcomes:
+                yield outcomes.pop(next_index)
+                next_index += 1
+    finally:
+        for worker in workers:
+            worker.stop()
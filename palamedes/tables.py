@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+
+from palamedes.models import Block, VariantBlock
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# value of the position and category columns when a row has no reference/alternate block, or is not categorized yet
+MISSING_VALUE: int = -1
+
+POSITION_COLUMNS = (
+    "alignment_start",
+    "alignment_end",
+    "reference_start",
+    "reference_end",
+    "alternate_start",
+    "alternate_end",
+)
+
+
+class VariantBlockTable:
+    """
+    Columnar storage for the variant blocks of many alignments, one row per VariantBlock, holding a handful of flat
+    numpy arrays instead of several Python objects per variant:
+
+    - pair_index: int64 index of the alignment (pair) the row belongs to, rows are grouped by pair in input order.
+    - alignment_start, alignment_end, reference_start, reference_end, alternate_start, alternate_end: int64 ZBHO
+      positions of the blocks, the reference/alternate columns are MISSING_VALUE when the row has no such block.
+    - category: int8 HGVS_VARIANT_TYPE_CODES code of the row, MISSING_VALUE until categorized, see
+      palamedes.hgvs.utils.categorize_variant_block_table.
+    - bases: a single str holding, per row, the variant bases followed by the reference bases and the alternate bases.
+      Row i starts at bases_offsets[i], the length of each part is given by the matching start/end columns.
+
+    Rows are read back as VariantBlock objects with table[i] (or by iterating), so existing code can consume them.
+    """
+
+    def __init__(
+        self,
+        pair_index: np.ndarray,
+        alignment_start: np.ndarray,
+        alignment_end: np.ndarray,
+        reference_start: np.ndarray,
+        reference_end: np.ndarray,
+        alternate_start: np.ndarray,
+        alternate_end: np.ndarray,
+        bases: str,
+        bases_offsets: np.ndarray,
+        category: np.ndarray | None = None,
+    ) -> None:
+        import numpy as np
+
+        self.pair_index = pair_index
+        self.alignment_start = alignment_start
+        self.alignment_end = alignment_end
+        self.reference_start = reference_start
+        self.reference_end = reference_end
+        self.alternate_start = alternate_start
+        self.alternate_end = alternate_end
+        self.bases = bases
+        self.bases_offsets = bases_offsets
+        self.category = category if category is not None else np.full(len(pair_index), MISSING_VALUE, dtype=np.int8)
+
+    @classmethod
+    def from_variant_blocks(cls, variant_blocks_per_pair: Iterable[list[VariantBlock]]) -> VariantBlockTable:
+        """Build a table from the VariantBlock lists of each pair, as returned by generate_variant_blocks"""
+        import numpy as np
+
+        pair_index = []
+        positions: list[tuple[int, int, int, int, int, int]] = []
+        bases = []
+        for idx, variant_blocks in enumerate(variant_blocks_per_pair):
+            for variant_block in variant_blocks:
+                reference_block = variant_block.reference_blocks[0] if variant_block.reference_blocks else None
+                alternate_block = variant_block.alternate_blocks[0] if variant_block.alternate_blocks else None
+                pair_index.append(idx)
+                positions.append(
+                    (
+                        variant_block.alignment_block.start,
+                        variant_block.alignment_block.end,
+                        reference_block.start if reference_block else MISSING_VALUE,
+                        reference_block.end if reference_block else MISSING_VALUE,
+                        alternate_block.start if alternate_block else MISSING_VALUE,
+                        alternate_block.end if alternate_block else MISSING_VALUE,
+                    )
+                )
+                bases.append(
+                    variant_block.alignment_block.bases
+                    + (reference_block.bases if reference_block else "")
+                    + (alternate_block.bases if alternate_block else "")
+                )
+
+        alignment_start, alignment_end, reference_start, reference_end, alternate_start, alternate_end = (
+            np.array(positions, dtype=np.int64).reshape(-1, len(POSITION_COLUMNS)).T
+        )
+        return cls(
+            np.array(pair_index, dtype=np.int64),
+            alignment_start,
+            alignment_end,
+            reference_start,
+            reference_end,
+            alternate_start,
+            alternate_end,
+            bases="".join(bases),
+            bases_offsets=np.cumsum([0] + [len(row_bases) for row_bases in bases], dtype=np.int64),
+        )
+
+    @classmethod
+    def concatenate(cls, tables: Sequence[VariantBlockTable]) -> VariantBlockTable:
+        """Concatenate tables into one, pair indices are kept as is so they should already be distinct and ordered"""
+        import numpy as np
+
+        def concatenate_column(name: str) -> np.ndarray:
+            return np.concatenate([getattr(table, name) for table in tables] + [np.empty(0, dtype=np.int64)])
+
+        bases_offsets = np.cumsum([0] + [len(table.bases) for table in tables], dtype=np.int64)
+        return cls(
+            concatenate_column("pair_index"),
+            concatenate_column("alignment_start"),
+            concatenate_column("alignment_end"),
+            concatenate_column("reference_start"),
+            concatenate_column("reference_end"),
+            concatenate_column("alternate_start"),
+            concatenate_column("alternate_end"),
+            bases="".join(table.bases for table in tables),
+            bases_offsets=np.concatenate(
+                [table.bases_offsets[:-1] + bases_offset for table, bases_offset in zip(tables, bases_offsets)]
+                + [bases_offsets[-1:]]
+            ),
+            category=np.concatenate([table.category for table in tables] + [np.empty(0, dtype=np.int8)]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.pair_index)
+
+    def alignment_bases(self, row: int) -> str:
+        start = int(self.bases_offsets[row])
+        return self.bases[start : start + int(self.alignment_end[row] - self.alignment_start[row])]
+
+    def reference_bases(self, row: int) -> str:
+        if self.reference_start[row] == MISSING_VALUE:
+            return ""
+
+        start = int(self.bases_offsets[row] + self.alignment_end[row] - self.alignment_start[row])
+        return self.bases[start : start + int(self.reference_end[row] - self.reference_start[row])]
+
+    def alternate_bases(self, row: int) -> str:
+        if self.alternate_start[row] == MISSING_VALUE:
+            return ""
+
+        end = int(self.bases_offsets[row + 1])
+        return self.bases[end - int(self.alternate_end[row] - self.alternate_start[row]) : end]
+
+    def __getitem__(self, row: int) -> VariantBlock:
+        """Row view, the VariantBlock for the given row"""
+        if not -len(self) <= row < len(self):
+            raise IndexError(f"VariantBlockTable row out of range: {row}")
+
+        row %= len(self)
+        return VariantBlock(
+            Block(int(self.alignment_start[row]), int(self.alignment_end[row]), self.alignment_bases(row)),
+            []
+            if self.reference_start[row] == MISSING_VALUE
+            else [Block(int(self.reference_start[row]), int(self.reference_end[row]), self.reference_bases(row))],
+            []
+            if self.alternate_start[row] == MISSING_VALUE
+            else [Block(int(self.alternate_start[row]), int(self.alternate_end[row]), self.alternate_bases(row))],
+        )
+
+    def __iter__(self) -> Iterator[VariantBlock]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def pair_rows(self, pair_index: int) -> range:
+        """Range of the rows belonging to the given pair, empty if it has no variant blocks"""
+        import numpy as np
+
+        return range(
+            int(np.searchsorted(self.pair_index, pair_index, side="left")),
+            int(np.searchsorted(self.pair_index, pair_index, side="right")),
+        )
+
+    def variant_blocks(self, pair_index: int) -> list[VariantBlock]:
+        """The VariantBlock list of the given pair, same as generate_variant_blocks returns for its alignment"""
+        return [self[row] for row in self.pair_rows(pair_index)]
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from palamedes.config import (
+    DEFAULT_BATCH_CHUNK_SIZE,
+    DEFAULT_VARIANT_INDEX_COMMIT_SIZE,
+    EXECUTOR_TYPE_THREAD,
+    HGVS_VARIANT_TYPE_CODES,
+    HGVS_VARIANT_TYPES,
+    MOLECULE_TYPE_PROTEIN,
+    VARIANT_INDEX_FORMAT_VERSION,
+)
+from palamedes.models import IndexedVariant, SequencePair, VariantRecord
+
+if TYPE_CHECKING:
+    from Bio.Align import PairwiseAligner
+
+LOGGER = logging.getLogger(__name__)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS samples (id INTEGER PRIMARY KEY, sample_id TEXT NOT NULL UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS variants "
+    "(id INTEGER PRIMARY KEY, accession TEXT NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL, "
+    "category INTEGER NOT NULL, hgvs TEXT NOT NULL UNIQUE)",
+    "CREATE INDEX IF NOT EXISTS variants_position ON variants (accession, start, category)",
+    "CREATE TABLE IF NOT EXISTS occurrences "
+    "(variant INTEGER NOT NULL, sample INTEGER NOT NULL, PRIMARY KEY (variant, sample)) WITHOUT ROWID",
+)
+
+
+class VariantIndex:
+    """
+    Inverted index from variants to the ids of the inputs (pair ids) carrying them, stored in a SQLite database at
+    path, for repeated queries on the results of a run without scanning its output:
+
+    - samples: the input ids, stored once each.
+    - variants: every distinct variant with its reference accession, one based closed position range, category
+      (an index into HGVS_VARIANT_TYPES) and HGVS string, indexed by reference and start position.
+    - occurrences: (variant, sample) rows, clustered by variant so the samples of a variant are read in one range.
+
+    Region queries look up variants by start position, from the start of the region minus the longest variant span
+    indexed, so overlapping variants are found through the index rather than a scan. Adding results to an existing
+    index extends it, and adding the same sample again is a no-op for the variants it already has. Writes are
+    committed every commit_size samples and on close.
+    """
+
+    def __init__(self, path: str, commit_size: int = DEFAULT_VARIANT_INDEX_COMMIT_SIZE) -> None:
+        self._connection = sqlite3.connect(path)
+        for statement in SCHEMA:
+            self._connection.execute(statement)
+
+        metadata = dict(self._connection.execute("SELECT key, value FROM metadata").fetchall())
+        if metadata and int(metadata["format_version"]) != VARIANT_INDEX_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported variant index format version: {metadata['format_version']}, expected: "
+                f"{VARIANT_INDEX_FORMAT_VERSION}"
+            )
+
+        self._max_span = int(metadata.get("max_span", 0))
+        self._connection.execute(
+            "INSERT OR IGNORE INTO metadata (key, value) VALUES ('format_version', ?)",
+            (str(VARIANT_INDEX_FORMAT_VERSION),),
+        )
+        self._connection.commit()
+        self._commit_size = commit_size
+        self._pending = 0
+
+    def add(self, sample_id: str, variants: Iterable[VariantRecord]) -> None:
+        """Index the VariantRecords of one input"""
+        connection = self._connection
+        connection.execute("INSERT OR IGNORE INTO samples (sample_id) VALUES (?)", (sample_id,))
+        (sample,) = connection.execute("SELECT id FROM samples WHERE sample_id = ?", (sample_id,)).fetchone()
+        for record in variants:
+            hgvs = record.format()
+            connection.execute(
+                "INSERT OR IGNORE INTO variants (accession, start, end, category, hgvs) VALUES (?, ?, ?, ?, ?)",
+                (record.accession, record.start, record.end, record.category, hgvs),
+            )
+            (variant,) = connection.execute("SELECT id FROM variants WHERE hgvs = ?", (hgvs,)).fetchone()
+            connection.execute("INSERT OR IGNORE INTO occurrences (variant, sample) VALUES (?, ?)", (variant, sample))
+            self._max_span = max(self._max_span, record.end - record.start)
+
+        self._pending += 1
+        if self._pending >= self._commit_size:
+            self.commit()
+
+    def commit(self) -> None:
+        """Commit the inputs added so far"""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO metadata (key, value) VALUES ('max_span', ?)", (str(self._max_span),)
+        )
+        self._connection.commit()
+        self._pending = 0
+
+    def sample_ids(self, hgvs: str | VariantRecord) -> list[str]:
+        """Ids of the inputs carrying a variant, given as its HGVS string (for example ref:p.Leu8Ala) or a record"""
+        if isinstance(hgvs, VariantRecord):
+            hgvs = hgvs.format()
+
+        rows = self._connection.execute(
+            "SELECT samples.sample_id FROM variants "
+            "JOIN occurrences ON occurrences.variant = variants.id "
+            "JOIN samples ON samples.id = occurrences.sample "
+            "WHERE variants.hgvs = ? ORDER BY samples.id",
+            (hgvs,),
+        )
+        return [sample_id for (sample_id,) in rows]
+
+    def _region_filter(self, accession: str, start: int, end: int, hgvs_type: str | None) -> tuple[str, list[Any]]:
+        where = "variants.accession = ? AND variants.start BETWEEN ? AND ? AND variants.end >= ?"
+        params: list[Any] = [accession, start - self._max_span, end, start]
+        if hgvs_type is not None:
+            where += " AND variants.category = ?"
+            params.append(HGVS_VARIANT_TYPE_CODES[hgvs_type])
+
+        return where, params
+
+    def iter_region(
+        self, accession: str, start: int, end: int, hgvs_type: str | None = None
+    ) -> Iterator[IndexedVariant]:
+        """
+        Stream the variants of a reference overlapping the one based closed range start..end, optionally only those
+        of one HGVS variant type, ordered by position, each with the ids of the inputs carrying it.
+        """
+        where, params = self._region_filter(accession, start, end, hgvs_type)
+        variants = self._connection.execute(
+            "SELECT id, accession, start, end, category, hgvs FROM variants "
+            f"WHERE {where} ORDER BY start, end, category, hgvs",
+            params,
+        ).fetchall()
+        for variant, variant_accession, variant_start, variant_end, category, hgvs in variants:
+            sample_ids = [
+                sample_id
+                for (sample_id,) in self._connection.execute(
+                    "SELECT samples.sample_id FROM occurrences JOIN samples ON samples.id = occurrences.sample "
+                    "WHERE occurrences.variant = ? ORDER BY samples.id",
+                    (variant,),
+                )
+            ]
+            yield IndexedVariant(
+                variant_accession, variant_start, variant_end, HGVS_VARIANT_TYPES[category], hgvs, sample_ids
+            )
+
+    def region_sample_ids(self, accession: str, start: int, end: int, hgvs_type: str | None = None) -> list[str]:
+        """Ids of the inputs carrying any variant overlapping the one based closed range start..end of a reference"""
+        where, params = self._region_filter(accession, start, end, hgvs_type)
+        rows = self._connection.execute(
+            "SELECT DISTINCT samples.id, samples.sample_id FROM variants "
+            "JOIN occurrences ON occurrences.variant = variants.id "
+            "JOIN samples ON samples.id = occurrences.sample "
+            f"WHERE {where} ORDER BY samples.id",
+            params,
+        )
+        return [sample_id for _, sample_id in rows]
+
+    def close(self) -> None:
+        self.commit()
+        self._connection.close()
+
+    def __enter__(self) -> VariantIndex:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def write_variant_index(
+    path: str,
+    pairs: Iterable[SequencePair],
+    molecule_type: str = MOLECULE_TYPE_PROTEIN,
+    aligner: PairwiseAligner | None = None,
+    use_non_standard_substitution_rules: bool = False,
+    executor_type: str = EXECUTOR_TYPE_THREAD,
+    max_workers: int | None = None,
+    chunk_size: int = DEFAULT_BATCH_CHUNK_SIZE,
+) -> None:
+    """
+    Run every pair through `iter_hgvs_variants_batch` and add its variants to the `VariantIndex` at path, under its
+    pair_id.
+
+    .. code-block:: python
+
+        >>> from palamedes.variant_index import VariantIndex, write_variant_index
+        >>> write_variant_index("library.sqlite", pairs)
+        >>> with VariantIndex("library.sqlite") as index:
+        ...     index.sample_ids("ref:p.Leu8Ala")
+        ...     [variant.hgvs for variant in index.iter_region("ref", 1, 3)]
+        ['read-17', 'read-912']
+        ['ref:p.Pro1extThr-1', 'ref:p.Lys3Arg']
+    """
+    from palamedes.batch import iter_hgvs_variants_batch
+
+    with VariantIndex(path) as index:
+        for pair_result in iter_hgvs_variants_batch(
+            pairs,
+            molecule_type=molecule_type,
+            aligner=aligner,
+            use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+            executor_type=executor_type,
+            max_workers=max_workers,
+            chunk_size=chunk_size,
+            compact=True,
+        ):
+            index.add(pair_result.pair_id, pair_result.variants)
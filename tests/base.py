@@ -1,9 +1,16 @@
+import io
+import random
+import sys
+from contextlib import redirect_stdout
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
 from Bio.Align import Alignment
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 
+from palamedes.__main__ import main
 from palamedes.config import (
     MOLECULE_TYPE_PROTEIN,
     MOLECULE_TYPE_ANNOTATION_KEY,
@@ -11,6 +18,31 @@ from palamedes.config import (
     ALT_SEQUENCE_ID,
     ALIGNMENT_GAP_CHAR,
 )
+from palamedes.models import SequencePair
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def make_random_pairs(count: int, length: int = 60, seed: int = 42) -> list[SequencePair]:
+    """Generate reproducible pairs of random proteins with a few substitutions, insertions and deletions"""
+    rng = random.Random(seed)
+    pairs = []
+    for idx in range(count):
+        reference = "".join(rng.choices(AMINO_ACIDS, k=length))
+        alternate = list(reference)
+        for _ in range(rng.randint(0, 4)):
+            position = rng.randrange(len(alternate))
+            operation = rng.choice(["sub", "ins", "del"])
+            if operation == "sub":
+                alternate[position] = rng.choice(AMINO_ACIDS)
+            elif operation == "ins":
+                alternate.insert(position, rng.choice(AMINO_ACIDS))
+            elif len(alternate) > 1:
+                del alternate[position]
+
+        pairs.append(SequencePair(f"pair-{idx}", reference, "".join(alternate)))
+
+    return pairs
 
 
 class PalamedesBaseCase(TestCase):
@@ -27,3 +59,17 @@ class PalamedesBaseCase(TestCase):
             ref_aligned_bases.replace(ALIGNMENT_GAP_CHAR, ""), alt_aligned_bases.replace(ALIGNMENT_GAP_CHAR, "")
         )
         return Alignment([ref, alt], coords)
+
+    def make_tmp_dir(self) -> str:
+        """Create a temporary directory, removed when the test ends"""
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return tmp_dir.name
+
+    def run_cli(self, argv: list[str]) -> str:
+        """Run the palamedes command line with argv and return what it printed"""
+        stdout = io.StringIO()
+        with patch.object(sys, "argv", argv), redirect_stdout(stdout):
+            main()
+
+        return stdout.getvalue()
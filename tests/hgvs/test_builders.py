@@ -1,6 +1,8 @@
 from hgvs.sequencevariant import SequenceVariant
 
+from palamedes.align import generate_variant_blocks
 from palamedes.hgvs.builders import HgvsProteinBuilder
+from palamedes.hgvs.utils import categorize_variant_block
 from palamedes.models import VariantBlock, Block
 from palamedes.config import (
     VARIANT_BASE_MISMATCH,
@@ -297,3 +299,37 @@ class HgvsProteinBuilderTestCase(PalamedesBaseCase):
 
         as_hgvs = HgvsProteinBuilder(alignment).build(variant_block, HGVS_VARIANT_TYPE_DELETION_INSERTION)
         self.assert_variant_string_matches(as_hgvs, "L2_S3delinsKA")
+
+    def test_hgvs_protein_builder_record_builders(self):
+        self.assertEqual(
+            set(HgvsProteinBuilder.RECORD_BUILDERS),
+            {
+                HGVS_VARIANT_TYPE_SUBSTITUTION,
+                HGVS_VARIANT_TYPE_DELETION,
+                HGVS_VARIANT_TYPE_INSERTION,
+                HGVS_VARIANT_TYPE_EXTENSION,
+                HGVS_VARIANT_TYPE_DUPLICATION,
+                HGVS_VARIANT_TYPE_REPEAT,
+                HGVS_VARIANT_TYPE_DELETION_INSERTION,
+            },
+        )
+
+    def test_hgvs_protein_builder_build_many(self):
+        """
+         A T C T - - T - - - -
+         A - C G A A T C C C C
+        0 1 2 3 4 5 6 7 8 9 10 11 ALIGNMENT
+        """
+        alignment = self.make_alignment("ATCT--T----", "A-CGAATCCCC")
+        variant_blocks = generate_variant_blocks(alignment)
+        hgvs_types = [categorize_variant_block(variant_block, alignment) for variant_block in variant_blocks]
+        builder = HgvsProteinBuilder(alignment)
+
+        records = builder.build_many(variant_blocks, hgvs_types)
+        self.assertEqual(records, [builder.build_record(*args) for args in zip(variant_blocks, hgvs_types)])
+        for record, variant_string in zip(records, ["T2del", "T4delinsGAA", "T5extCCCC4"]):
+            self.assert_variant_string_matches(record.to_hgvs(), variant_string)
+
+        self.assertEqual(builder.build_many([], []), [])
+        with self.assertRaises(ValueError):
+            builder.build_many(variant_blocks, hgvs_types[:1])
@@ -1,4 +1,8 @@
-from palamedes.hgvs.utils import categorize_variant_block
+import random
+
+from palamedes import generate_alignment
+from palamedes.align import generate_variant_block_table, generate_variant_blocks
+from palamedes.hgvs.utils import categorize_variant_block, categorize_variant_block_table
 from palamedes.config import (
     HGVS_VARIANT_TYPE_SUBSTITUTION,
     HGVS_VARIANT_TYPE_DELETION,
@@ -7,13 +11,15 @@ from palamedes.config import (
     HGVS_VARIANT_TYPE_REPEAT,
     HGVS_VARIANT_TYPE_INSERTION,
     HGVS_VARIANT_TYPE_DELETION_INSERTION,
+    HGVS_VARIANT_TYPE_CODES,
     VARIANT_BASE_MATCH,
     VARIANT_BASE_MISMATCH,
     VARIANT_BASE_DELETION,
     VARIANT_BASE_INSERTION,
 )
 from palamedes.models import Block, VariantBlock
-from tests.base import PalamedesBaseCase
+from palamedes.tables import VariantBlockTable
+from tests.base import PalamedesBaseCase, make_random_pairs
 
 
 class CategorizeVariantBlockTestCase(PalamedesBaseCase):
@@ -261,3 +267,57 @@ class CategorizeVariantBlockTestCase(PalamedesBaseCase):
         alignment = self.make_alignment("A----ATG", "ATTTTATG")
 
         self.assertEqual(categorize_variant_block(variant_block, alignment), HGVS_VARIANT_TYPE_INSERTION)
+
+
+class CategorizeVariantBlockTableTestCase(PalamedesBaseCase):
+    def test_categorize_variant_block_table(self):
+        alignments = [
+            generate_alignment(*self.make_seq_records(pair.reference, pair.alternate))
+            for pair in make_random_pairs(50, length=30)
+        ]
+        table = generate_variant_block_table(alignments)
+        categories = categorize_variant_block_table(table, alignments)
+
+        self.assertIs(categories, table.category)
+        self.assertEqual(
+            categories.tolist(),
+            [
+                HGVS_VARIANT_TYPE_CODES[categorize_variant_block(variant_block, alignment)]
+                for alignment in alignments
+                for variant_block in generate_variant_blocks(alignment)
+            ],
+        )
+
+    def test_categorize_variant_block_table_all_types(self):
+        rng = random.Random(7)
+        alignments = [
+            generate_alignment(
+                *self.make_seq_records(
+                    "".join(rng.choices("AC", k=rng.randint(1, 14))),
+                    "".join(rng.choices("ACG", k=rng.randint(1, 14))),
+                )
+            )
+            for _ in range(500)
+        ]
+        for split_consecutive_mismatches in (False, True):
+            table = generate_variant_block_table(alignments, split_consecutive_mismatches)
+            expected = [
+                categorize_variant_block(variant_block, alignment)
+                for alignment in alignments
+                for variant_block in generate_variant_blocks(alignment, split_consecutive_mismatches)
+            ]
+
+            # sanity check that the random alignments cover every category
+            self.assertEqual(len(set(expected)), 7)
+            self.assertEqual(
+                categorize_variant_block_table(table, alignments).tolist(),
+                [HGVS_VARIANT_TYPE_CODES[hgvs_type] for hgvs_type in expected],
+            )
+
+    def test_categorize_variant_block_table_match_error(self):
+        alignment = self.make_alignment("AAC", "TAG")
+        table = VariantBlockTable.from_variant_blocks(
+            [[VariantBlock(Block(0, 3, VARIANT_BASE_MISMATCH + VARIANT_BASE_MATCH + VARIANT_BASE_MISMATCH), [], [])]]
+        )
+        with self.assertRaisesRegex(ValueError, "with matching bases"):
+            categorize_variant_block_table(table, [alignment])
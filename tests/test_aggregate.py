@@ -0,0 +1,87 @@
+import os
+from collections import Counter
+
+from palamedes import generate_variant_records
+from palamedes.aggregate import VariantCounter, aggregate_hgvs_variants_batch, variant_sort_key
+from palamedes.config import AGGREGATE_BYTES_PER_ENTRY, EXECUTOR_TYPE_PROCESS, EXECUTOR_TYPE_SERIAL
+from palamedes.models import PositionSpectrum, SequencePair, VariantCount
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class AggregateTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.tmp_dir = self.make_tmp_dir()
+        # duplicates, so variants occur more than once
+        self.pairs = make_random_pairs(30, length=20) * 2
+        expected = Counter()
+        for pair in self.pairs:
+            expected.update(generate_variant_records(pair.reference, pair.alternate))
+
+        self.expected = [VariantCount(record, expected[record]) for record in sorted(expected, key=variant_sort_key)]
+
+    def test_variant_counter(self):
+        with VariantCounter() as counter:
+            for pair in self.pairs:
+                counter.add(generate_variant_records(pair.reference, pair.alternate))
+
+            self.assertEqual(list(counter.iter_counts()), self.expected)
+            self.assertEqual((counter.pair_count, counter.spill_count), (60, 0))
+
+    def test_spill(self):
+        # room for about 10 distinct variants
+        with VariantCounter(10 * AGGREGATE_BYTES_PER_ENTRY, spill_directory=self.tmp_dir) as counter:
+            for pair in self.pairs:
+                counter.add(generate_variant_records(pair.reference, pair.alternate))
+
+            self.assertGreater(counter.spill_count, 1)
+            self.assertEqual(len(os.listdir(self.tmp_dir)), 1)
+            self.assertEqual(list(counter.iter_counts()), self.expected)
+
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_position_spectra(self):
+        pairs = [
+            SequencePair("a", "PFKISIHL", "PFKISIHA"),
+            SequencePair("b", "PFKISIHL", "PFKISIHW"),
+            SequencePair("c", "PFKISIHL", "PFKISIHA"),
+            SequencePair("d", "PFKISIHL", "PFKISIH"),
+            SequencePair("e", "PFKISIHL", "PFRISIHL"),
+        ]
+        with aggregate_hgvs_variants_batch(pairs, executor_type=EXECUTOR_TYPE_SERIAL) as counter:
+            self.assertEqual(
+                list(counter.iter_position_spectra()),
+                [
+                    PositionSpectrum("ref", 3, {"substitution": 1}, {"R": 1}),
+                    PositionSpectrum("ref", 8, {"substitution": 3, "deletion": 1}, {"A": 2, "W": 1}),
+                ],
+            )
+
+    def test_aggregate_batch(self):
+        for executor_type in ("serial", "thread", EXECUTOR_TYPE_PROCESS):
+            with self.subTest(executor_type=executor_type):
+                with aggregate_hgvs_variants_batch(
+                    self.pairs,
+                    executor_type=executor_type,
+                    max_workers=2,
+                    chunk_size=7,
+                    memory_budget_bytes=10 * AGGREGATE_BYTES_PER_ENTRY,
+                ) as counter:
+                    self.assertEqual(list(counter.iter_counts()), self.expected)
+                    self.assertEqual(counter.pair_count, 60)
+
+        with aggregate_hgvs_variants_batch(self.pairs, shard="1/2") as first, aggregate_hgvs_variants_batch(
+            self.pairs, shard="2/2"
+        ) as second:
+            self.assertEqual(first.pair_count + second.pair_count, 60)
+
+    def test_cli_aggregate(self):
+        fasta_path = os.path.join(self.tmp_dir, "alts.fa")
+        with open(fasta_path, "w") as handle:
+            handle.write("".join(f">alt-{idx}\nPFKISIH{'LAG'[idx % 3]}\n" for idx in range(9)))
+
+        argv = ["palamedes", "PFKISIHL", "--alt-fasta", fasta_path, "--aggregate", "--aggregate-memory-budget", "1"]
+        self.assertEqual(self.run_cli(argv), "ref:p.Leu8Ala\t3\nref:p.Leu8Gly\t3\n")
+
+        for extra_args in (["--deduplicate"], ["--schedule-by-cost"]):
+            with self.subTest(extra_args=extra_args), self.assertRaises(SystemExit):
+                self.run_cli(argv + extra_args)
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from palamedes import agenerate_hgvs_variants, aiter_hgvs_variants, generate_hgvs_variants
+from palamedes.align import make_aligner
+from palamedes.batch import register_aligner_reducer
+from tests.base import make_random_pairs
+
+
+class AGenerateHgvsVariantsTestCase(IsolatedAsyncioTestCase):
+    async def test_agenerate_hgvs_variants(self):
+        variants = await agenerate_hgvs_variants("PFKISIHL", "TPFKISIH")
+        self.assertEqual(variants, generate_hgvs_variants("PFKISIHL", "TPFKISIH"))
+
+    async def test_agenerate_hgvs_variants_process_executor(self):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            variants = await agenerate_hgvs_variants("PFKISIHL", "TPFKISIH", executor=executor)
+
+        self.assertEqual(
+            [variant.format() for variant in variants],
+            ["ref:p.Pro1extThr-1", "ref:p.Leu8del"],
+        )
+
+    async def test_agenerate_hgvs_variants_process_executor_ties(self):
+        # with a large epsilon more alignments score equally, which the worker must break the same way
+        aligner = make_aligner(extend_gap_score=-0.5)
+        aligner.epsilon = 0.5
+        pairs = [
+            (reference.reference, alternate.alternate)
+            for reference in make_random_pairs(4, length=30)
+            for alternate in make_random_pairs(4, length=30, seed=7)
+        ]
+        with (
+            patch("palamedes.batch.register_aligner_reducer", wraps=register_aligner_reducer) as register_mock,
+            ProcessPoolExecutor(max_workers=1) as executor,
+        ):
+            results = [
+                await agenerate_hgvs_variants(reference, alternate, aligner=aligner, executor=executor)
+                for reference, alternate in pairs
+            ]
+
+        register_mock.assert_called()
+        self.assertEqual(
+            [[variant.format() for variant in variants] for variants in results],
+            [
+                [variant.format() for variant in generate_hgvs_variants(reference, alternate, aligner=aligner)]
+                for reference, alternate in pairs
+            ],
+        )
+
+    async def test_agenerate_hgvs_variants_timeout(self):
+        def slow_generate_hgvs_variants(*args, **kwargs):
+            time.sleep(0.5)
+            return []
+
+        with (
+            patch("palamedes.aio.generate_hgvs_variants", slow_generate_hgvs_variants),
+            ThreadPoolExecutor(max_workers=1) as executor,
+        ):
+            with self.assertRaises(asyncio.TimeoutError):
+                await agenerate_hgvs_variants("A", "T", executor=executor, timeout=0.01)
+
+
+class AIterHgvsVariantsTestCase(IsolatedAsyncioTestCase):
+    pairs = [("PFKISIHL", "TPFKISIH"), ("PFKISIHL", "PFKISIHL"), ("FFF", "FSF")]
+
+    async def test_aiter_hgvs_variants_input_order(self):
+        results = [variants async for variants in aiter_hgvs_variants(self.pairs, max_concurrency=2)]
+        self.assertEqual(results, [generate_hgvs_variants(ref, alt) for ref, alt in self.pairs])
+
+    async def test_aiter_hgvs_variants_async_input(self):
+        async def produce():
+            for pair in self.pairs:
+                yield pair
+
+        results = [variants async for variants in aiter_hgvs_variants(produce())]
+        self.assertEqual(len(results), len(self.pairs))
+
+    async def test_aiter_hgvs_variants_max_concurrency(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def tracking_generate_hgvs_variants(*args, **kwargs):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.01)
+            with lock:
+                state["running"] -= 1
+            return []
+
+        with (
+            patch("palamedes.aio.generate_hgvs_variants", tracking_generate_hgvs_variants),
+            ThreadPoolExecutor(max_workers=8) as executor,
+        ):
+            results = [
+                variants async for variants in aiter_hgvs_variants(self.pairs * 5, executor=executor, max_concurrency=2)
+            ]
+
+        self.assertEqual(len(results), 15)
+        self.assertLessEqual(state["peak"], 2)
+
+    async def test_aiter_hgvs_variants_max_concurrency_error(self):
+        with self.assertRaisesRegex(ValueError, "got: 0"):
+            async for _ in aiter_hgvs_variants(self.pairs, max_concurrency=0):
+                pass
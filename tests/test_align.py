@@ -1,12 +1,21 @@
+from palamedes import generate_alignment
 from palamedes.align import (
     make_variant_base,
     can_merge_variant_blocks,
     merge_variant_blocks,
     generate_seq_record,
     generate_variant_blocks,
+    generate_variant_block_table,
+    get_alignment_column_offsets,
+    get_upstream_reference_position,
+    get_upstream_reference_sequence,
+    generate_seq_records,
+    iter_alignment_columns,
+    iter_variant_blocks,
 )
 from palamedes.config import (
     REF_SEQUENCE_ID,
+    ALT_SEQUENCE_ID,
     VARIANT_BASE_MATCH,
     ALIGNMENT_GAP_CHAR,
     VARIANT_BASE_INSERTION,
@@ -16,7 +25,7 @@ from palamedes.config import (
     MOLECULE_TYPE_ANNOTATION_KEY,
 )
 from palamedes.models import VariantBlock, Block
-from tests.base import PalamedesBaseCase
+from tests.base import PalamedesBaseCase, make_random_pairs
 
 
 class GenerateSeqRecordsTestCase(PalamedesBaseCase):
@@ -267,3 +276,108 @@ class GenerateVariantBlocksTestCase(PalamedesBaseCase):
                 ),
             ),
         )
+
+
+class GenerateVariantBlockTableTestCase(PalamedesBaseCase):
+    def test_generate_variant_block_table_complex(self):
+        alignment = self.make_alignment(
+            "ATCT--T",
+            "A-CGAAT",
+        )
+        table = generate_variant_block_table([alignment])
+        self.assertEqual(list(table), generate_variant_blocks(alignment))
+        self.assertEqual(table.pair_index.tolist(), [0, 0])
+
+    def test_generate_variant_block_table_split_subs(self):
+        for ref_aligned_bases, alt_aligned_bases in [
+            ("AAAA", "TTTT"),
+            ("AAAAA", "TT-TT"),
+            ("AAA-A", "TTTTT"),
+            ("AAAA---", "---TTTT"),
+        ]:
+            alignment = self.make_alignment(ref_aligned_bases, alt_aligned_bases)
+            for split_consecutive_mismatches in (False, True):
+                table = generate_variant_block_table([alignment], split_consecutive_mismatches)
+                self.assertEqual(list(table), generate_variant_blocks(alignment, split_consecutive_mismatches))
+
+    def test_generate_variant_block_table_many(self):
+        alignments = [
+            self.make_alignment("AAAA", "AAAA"),
+            *(
+                generate_alignment(*self.make_seq_records(pair.reference, pair.alternate))
+                for pair in make_random_pairs(50, length=30)
+            ),
+        ]
+        for split_consecutive_mismatches in (False, True):
+            table = generate_variant_block_table(alignments, split_consecutive_mismatches)
+            self.assertEqual(table.variant_blocks(0), [])
+            for pair_index, alignment in enumerate(alignments):
+                self.assertEqual(
+                    table.variant_blocks(pair_index), generate_variant_blocks(alignment, split_consecutive_mismatches)
+                )
+
+
+class UpstreamReferencePositionTestCase(PalamedesBaseCase):
+    def test_get_upstream_reference_position(self):
+        for ref_aligned_bases, alt_aligned_bases in [
+            ("ATCT--T", "A-CGAAT"),
+            ("--AAAA", "TTAAAA"),
+            ("AAAA--", "AAAATT"),
+            ("A-A-A-", "ATATAT"),
+        ]:
+            alignment = self.make_alignment(ref_aligned_bases, alt_aligned_bases)
+            column_offsets = get_alignment_column_offsets(alignment)
+            self.assertEqual(column_offsets[-1], len(ref_aligned_bases))
+
+            for anchor_position in range(len(ref_aligned_bases) + 1):
+                position = get_upstream_reference_position(alignment, column_offsets, anchor_position)
+                self.assertEqual(
+                    str(alignment.target.seq[:position]),
+                    get_upstream_reference_sequence(alignment, anchor_position, len(ref_aligned_bases)),
+                )
+
+
+class IterVariantBlocksTestCase(PalamedesBaseCase):
+    def test_generate_seq_records(self):
+        ref, alt = generate_seq_records("AAA", "AAT")
+        self.assertEqual((ref.id, str(ref.seq)), (REF_SEQUENCE_ID, "AAA"))
+        self.assertEqual((alt.id, str(alt.seq)), (ALT_SEQUENCE_ID, "AAT"))
+
+        seq_records = self.make_seq_records("AAA", "AAT")
+        self.assertEqual(generate_seq_records(*seq_records), seq_records)
+
+    def test_iter_alignment_columns(self):
+        alignment = self.make_alignment("ATCT--T", "A-CGAAT")
+        self.assertEqual(
+            list(iter_alignment_columns(alignment)),
+            [
+                (idx, reference_index, reference_base, alternate_index, alternate_base)
+                for idx, (reference_index, reference_base, alternate_index, alternate_base) in enumerate(
+                    zip(alignment.indices[0].tolist(), alignment[0], alignment.indices[1].tolist(), alignment[1])
+                )
+            ],
+        )
+
+    def test_iter_variant_blocks(self):
+        for ref_aligned_bases, alt_aligned_bases in [
+            ("ATCT--T", "A-CGAAT"),
+            ("AAAA", "TTTT"),
+            ("AAAA", "AAAA"),
+            ("AAAA---", "---TTTT"),
+            ("AAA-AC", "TTTTAG"),
+        ]:
+            alignment = self.make_alignment(ref_aligned_bases, alt_aligned_bases)
+            for split_consecutive_mismatches in (False, True):
+                self.assertEqual(
+                    list(iter_variant_blocks(alignment, split_consecutive_mismatches)),
+                    generate_variant_blocks(alignment, split_consecutive_mismatches),
+                )
+
+    def test_iter_variant_blocks_early_stop(self):
+        alignment = self.make_alignment("A" * 10_000, "T" + "A" * 9_999)
+        variant_blocks = iter_variant_blocks(alignment)
+        self.assertEqual(
+            next(variant_blocks),
+            VariantBlock(Block(0, 1, VARIANT_BASE_MISMATCH), [Block(0, 1, "A")], [Block(0, 1, "T")]),
+        )
+        self.assertIsNone(next(variant_blocks, None))
@@ -0,0 +1,291 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from palamedes import generate_alignment, generate_hgvs_variants
+from palamedes.align import generate_variant_blocks, make_aligner
+from palamedes.batch import (
+    chunk_pairs,
+    collapse_pairs,
+    generate_hgvs_variants_batch,
+    iter_collapsed_hgvs_variants_batch,
+    iter_hgvs_variants_batch,
+    make_executor,
+    make_pair_digest,
+    reduce_aligner,
+    run_scheduled_chunks,
+    schedule_chunks,
+)
+from palamedes.config import (
+    EXECUTOR_TYPE_PROCESS,
+    EXECUTOR_TYPE_SERIAL,
+    EXECUTOR_TYPE_THREAD,
+)
+from palamedes.hgvs.builders import HgvsProteinBuilder
+from palamedes.hgvs.utils import categorize_variant_block
+from palamedes.models import CollapsedPairResult, PairResult, SequencePair
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class ThreadSafetyTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.pairs = make_random_pairs(64)
+        self.expected = [generate_hgvs_variants(pair.reference, pair.alternate) for pair in self.pairs]
+
+    def test_shared_aligner_across_threads(self):
+        aligner = make_aligner()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(
+                    lambda pair: generate_hgvs_variants(pair.reference, pair.alternate, aligner=aligner), self.pairs
+                )
+            )
+
+        self.assertEqual(results, self.expected)
+
+    def test_shared_builder_across_threads(self):
+        ref, alt = self.make_seq_records("PFKISIHLAAAGGGWWW", "TPFKISIHAAAAGGWYW")
+        alignment = generate_alignment(ref, alt)
+        variant_blocks = generate_variant_blocks(alignment) * 50
+        builder = HgvsProteinBuilder(alignment)
+
+        def build(variant_block):
+            return builder.build(variant_block, categorize_variant_block(variant_block, alignment))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(build, variant_blocks))
+
+        self.assertEqual(results, [build(variant_block) for variant_block in variant_blocks])
+
+
+class BatchTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.pairs = make_random_pairs(20)
+        self.expected = [
+            PairResult(pair.pair_id, generate_hgvs_variants(pair.reference, pair.alternate)) for pair in self.pairs
+        ]
+
+    def test_generate_hgvs_variants_batch_thread(self):
+        results = generate_hgvs_variants_batch(self.pairs, executor_type=EXECUTOR_TYPE_THREAD, chunk_size=3)
+        self.assertEqual(results, self.expected)
+
+    def test_generate_hgvs_variants_batch_process(self):
+        results = generate_hgvs_variants_batch(
+            self.pairs, executor_type=EXECUTOR_TYPE_PROCESS, max_workers=2, chunk_size=3
+        )
+        self.assertEqual(
+            [(result.pair_id, [str(variant) for variant in result.variants]) for result in results],
+            [(result.pair_id, [str(variant) for variant in result.variants]) for result in self.expected],
+        )
+
+    def test_generate_hgvs_variants_batch_process_ties(self):
+        # longer unrelated sequences have many equally scoring alignments, which the worker must break the same way
+        pairs = [
+            SequencePair(f"{reference.pair_id}-{alternate.pair_id}", reference.reference, alternate.alternate)
+            for reference in make_random_pairs(4, length=30)
+            for alternate in make_random_pairs(4, length=30, seed=7)
+        ]
+        results = generate_hgvs_variants_batch(pairs, executor_type=EXECUTOR_TYPE_PROCESS, max_workers=2)
+        self.assertEqual(
+            [[str(variant) for variant in result.variants] for result in results],
+            [[str(variant) for variant in generate_hgvs_variants(pair.reference, pair.alternate)] for pair in pairs],
+        )
+
+    def test_reduce_aligner(self):
+        aligner = make_aligner(extend_gap_score=-0.5)
+        aligner.epsilon = 1e-3
+        restore, args = reduce_aligner(aligner)
+        restored = restore(*args)
+        self.assertEqual(restored.epsilon, 1e-3)
+        self.assertEqual(str(restored), str(aligner))
+
+    def test_register_aligner_reducer(self):
+        # the pickler of multiprocessing is process wide, only creating a process pool may register the reducer
+        code = """
+from multiprocessing.reduction import ForkingPickler
+from Bio.Align import PairwiseAligner
+from palamedes.batch import make_executor, reduce_aligner
+make_executor("thread").shutdown()
+print(PairwiseAligner in ForkingPickler._extra_reducers)
+make_executor("process").shutdown()
+make_executor("process").shutdown()
+print(ForkingPickler._extra_reducers.get(PairwiseAligner) is reduce_aligner)
+"""
+        result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+        self.assertEqual(result.stdout.split(), ["False", "True"])
+
+    def test_generate_hgvs_variants_batch_serial(self):
+        results = generate_hgvs_variants_batch(self.pairs, executor_type=EXECUTOR_TYPE_SERIAL)
+        self.assertEqual(results, self.expected)
+
+    def test_generate_hgvs_variants_batch_compact(self):
+        for executor_type in (EXECUTOR_TYPE_THREAD, EXECUTOR_TYPE_PROCESS):
+            results = generate_hgvs_variants_batch(
+                self.pairs, executor_type=executor_type, max_workers=2, chunk_size=3, compact=True
+            )
+            self.assertEqual(
+                [PairResult(result.pair_id, [record.to_hgvs() for record in result.variants]) for result in results],
+                self.expected,
+            )
+
+    def test_iter_hgvs_variants_batch_lazy_input(self):
+        consumed = []
+
+        def produce():
+            for pair in self.pairs:
+                consumed.append(pair.pair_id)
+                yield pair
+
+        results = iter_hgvs_variants_batch(produce(), executor_type=EXECUTOR_TYPE_THREAD, max_workers=1, chunk_size=2)
+        self.assertEqual(next(results), self.expected[0])
+        results.close()
+
+        # 2 chunks in flight for the single worker, plus the one being built when the limit was hit
+        self.assertLess(len(consumed), len(self.pairs))
+
+    def test_iter_hgvs_variants_batch_executor_type_error(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported executor_type: foo"):
+            list(iter_hgvs_variants_batch(self.pairs, executor_type="foo"))
+
+    def test_make_executor_type_error(self):
+        with self.assertRaisesRegex(ValueError, "Cannot create executor for type: foo"):
+            make_executor("foo")
+
+    def test_chunk_pairs(self):
+        chunks = list(chunk_pairs(self.pairs, 8))
+        self.assertEqual([len(chunk) for chunk in chunks], [8, 8, 4])
+
+    def test_chunk_pairs_size_error(self):
+        with self.assertRaisesRegex(ValueError, "got: 0"):
+            list(chunk_pairs(self.pairs, 0))
+
+
+class ScheduleTestCase(PalamedesBaseCase):
+    def setUp(self):
+        # short peptides with a few long proteins, one at the end of the input
+        self.pairs = make_random_pairs(30, length=8)
+        for idx, length in ((3, 300), (17, 200), (30, 400)):
+            self.pairs.insert(idx, make_random_pairs(1, length=length, seed=idx)[0]._replace(pair_id=f"long-{idx}"))
+
+        self.expected = [
+            PairResult(pair.pair_id, generate_hgvs_variants(pair.reference, pair.alternate)) for pair in self.pairs
+        ]
+
+    def test_schedule_chunks(self):
+        costs = [1] * 10 + [100, 1, 50]
+        chunks = schedule_chunks(costs, worker_count=2)
+        self.assertEqual(chunks[:2], [[10], [12]])
+        self.assertEqual(sorted(index for chunk in chunks for index in chunk), list(range(len(costs))))
+        chunk_costs = [sum(costs[index] for index in chunk) for chunk in chunks]
+        self.assertEqual(chunk_costs, sorted(chunk_costs, reverse=True))
+
+        self.assertEqual(schedule_chunks([0, 0, 0], worker_count=4), [[0, 1, 2]])
+        self.assertEqual(schedule_chunks([], worker_count=4), [])
+
+    def test_schedule_by_cost(self):
+        for executor_type in (EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_THREAD, EXECUTOR_TYPE_PROCESS):
+            with self.subTest(executor_type=executor_type):
+                results = generate_hgvs_variants_batch(
+                    self.pairs, executor_type=executor_type, max_workers=2, compact=True, schedule_by_cost=True
+                )
+                self.assertEqual(
+                    [
+                        PairResult(result.pair_id, [record.to_hgvs() for record in result.variants])
+                        for result in results
+                    ],
+                    self.expected,
+                )
+
+    def test_run_scheduled_chunks_windows(self):
+        dispatched = []
+
+        def dispatch(chunk, submit):
+            dispatched.append([pair.pair_id for pair in chunk])
+            return submit(lambda: [pair.pair_id for pair in chunk]).result
+
+        pair_ids = list(run_scheduled_chunks(self.pairs, dispatch, EXECUTOR_TYPE_THREAD, max_workers=2, window_size=10))
+        self.assertEqual(pair_ids, [pair.pair_id for pair in self.pairs])
+        # the long pairs are dispatched first and alone in their windows
+        self.assertEqual([dispatched[0], dispatched[len(dispatched) - 2]], [["long-3"], ["long-30"]])
+
+
+class DeduplicateTestCase(PalamedesBaseCase):
+    def setUp(self):
+        unique_pairs = make_random_pairs(5)
+        self.pairs = [
+            SequencePair(f"{pair.pair_id}-copy-{copy}", pair.reference, pair.alternate)
+            for copy in range(3)
+            for pair in unique_pairs
+        ]
+        self.expected = [
+            PairResult(pair.pair_id, generate_hgvs_variants(pair.reference, pair.alternate)) for pair in self.pairs
+        ]
+
+    def test_make_pair_digest(self):
+        ref, alt = self.make_seq_records("PFKISIHL", "TPFKISIH")
+        self.assertEqual(
+            make_pair_digest(SequencePair("a", ref, alt)), make_pair_digest(SequencePair("b", "PFKISIHL", "TPFKISIH"))
+        )
+        ref.id = "another-reference"
+        self.assertNotEqual(
+            make_pair_digest(SequencePair("a", ref, alt)), make_pair_digest(SequencePair("b", "PFKISIHL", "TPFKISIH"))
+        )
+
+    def test_generate_hgvs_variants_batch_deduplicate(self):
+        with patch("palamedes.batch.generate_hgvs_variants", wraps=generate_hgvs_variants) as generate_mock:
+            results = generate_hgvs_variants_batch(
+                self.pairs, executor_type=EXECUTOR_TYPE_THREAD, max_workers=2, chunk_size=2, deduplicate=True
+            )
+
+        self.assertEqual(results, self.expected)
+        self.assertEqual(generate_mock.call_count, 5)
+
+    def test_deduplicate_max_results(self):
+        # copies of a pair are 5 pairs apart, so with fewer than 5 results kept every copy is aligned again, chunks of
+        # one pair make sure the first copy is done before the next is read
+        for max_results, call_count in ((0, 15), (4, 15), (5, 5)):
+            with self.subTest(max_results=max_results):
+                with patch("palamedes.batch.generate_hgvs_variants", wraps=generate_hgvs_variants) as generate_mock:
+                    results = generate_hgvs_variants_batch(
+                        self.pairs,
+                        executor_type=EXECUTOR_TYPE_SERIAL,
+                        chunk_size=1,
+                        deduplicate=True,
+                        deduplicate_max_results=max_results,
+                    )
+
+                self.assertEqual(results, self.expected)
+                self.assertEqual(generate_mock.call_count, call_count)
+
+    def test_cli_collapse_duplicates(self):
+        with TemporaryDirectory() as tmp_dir:
+            fasta_path = os.path.join(tmp_dir, "alts.fa")
+            with open(fasta_path, "w") as handle:
+                handle.write(">alt-1\nPFKISIHA\n>same-1\nPFKISIHL\n>alt-2\nPFKISIHA\n>same-2\nPFKISIHL\n")
+
+            stdout = self.run_cli(["palamedes", "PFKISIHL", "--alt-fasta", fasta_path, "--collapse-duplicates"])
+
+        self.assertEqual(stdout, "alt-1\t2\tref:p.Leu8Ala\nsame-1\t2\t\n")
+
+    def test_collapse_pairs(self):
+        collapsed = collapse_pairs(self.pairs)
+        self.assertEqual(len(collapsed), 5)
+        self.assertEqual(collapsed[0][0], self.pairs[0])
+        self.assertEqual(collapsed[0][1], ["pair-0-copy-0", "pair-0-copy-1", "pair-0-copy-2"])
+
+    def test_iter_collapsed_hgvs_variants_batch(self):
+        results = list(iter_collapsed_hgvs_variants_batch(self.pairs, executor_type=EXECUTOR_TYPE_SERIAL))
+
+        self.assertEqual([result.multiplicity for result in results], [3] * 5)
+        self.assertEqual(
+            [CollapsedPairResult(result.pair_ids, result.variants) for result in results],
+            [
+                CollapsedPairResult(
+                    [pair_result.pair_id for pair_result in self.expected[idx::5]], self.expected[idx].variants
+                )
+                for idx in range(5)
+            ],
+        )
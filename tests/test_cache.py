@@ -0,0 +1,168 @@
+import os
+import sqlite3
+from contextlib import closing
+from unittest.mock import patch
+
+from palamedes import generate_hgvs_variants
+from palamedes.align import make_aligner
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.cache import ResultCache, make_cache_key
+from palamedes.config import EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_THREAD
+from palamedes.models import CacheStats, SequencePair
+from tests.base import PalamedesBaseCase
+
+
+class MakeCacheKeyTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.ref, self.alt = self.make_seq_records("PFKISIHL", "TPFKISIH")
+        self.key = make_cache_key(self.ref, self.alt, "protein", make_aligner(), False)
+
+    def test_make_cache_key_stable(self):
+        ref, alt = self.make_seq_records("PFKISIHL", "TPFKISIH")
+        alt.id = "another-id"
+        self.assertEqual(make_cache_key(ref, alt, "protein", make_aligner(), False), self.key)
+
+    def test_make_cache_key_sequences(self):
+        ref, alt = self.make_seq_records("PFKISIHL", "TPFKISIL")
+        self.assertNotEqual(make_cache_key(ref, alt, "protein", make_aligner(), False), self.key)
+
+    def test_make_cache_key_reference_id(self):
+        self.ref.id = "another-id"
+        self.assertNotEqual(make_cache_key(self.ref, self.alt, "protein", make_aligner(), False), self.key)
+
+    def test_make_cache_key_aligner_params(self):
+        aligner = make_aligner(open_gap_score=-2)
+        self.assertNotEqual(make_cache_key(self.ref, self.alt, "protein", aligner, False), self.key)
+
+    def test_make_cache_key_substitution_rules(self):
+        self.assertNotEqual(make_cache_key(self.ref, self.alt, "protein", make_aligner(), True), self.key)
+
+    def test_make_cache_key_version(self):
+        with patch("palamedes.__version__", "0.0.0"):
+            self.assertNotEqual(make_cache_key(self.ref, self.alt, "protein", make_aligner(), False), self.key)
+
+
+class ResultCacheTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.variants = generate_hgvs_variants("PFKISIHL", "TPFKISIH")
+        self.path = os.path.join(self.make_tmp_dir(), "cache.sqlite")
+
+    def test_result_cache_memory(self):
+        cache = ResultCache()
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", self.variants)
+        self.assertEqual(cache.get("key"), self.variants)
+        self.assertEqual(cache.stats, CacheStats(memory_hits=1, disk_hits=0, misses=1, memory_entries=1, disk_bytes=0))
+
+    def test_result_cache_memory_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", [])
+        cache.put("b", [])
+        cache.get("a")
+        cache.put("c", [])
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [])
+        self.assertEqual(cache.get("c"), [])
+
+    def test_result_cache_disk_persists(self):
+        with ResultCache(path=self.path) as cache:
+            cache.put("key", self.variants)
+
+        with ResultCache(path=self.path) as cache:
+            self.assertEqual(cache.get("key"), self.variants)
+            self.assertEqual(cache.get("key"), self.variants)
+            stats = cache.stats
+
+        self.assertEqual((stats.memory_hits, stats.disk_hits, stats.misses), (1, 1, 0))
+        self.assertGreater(stats.disk_bytes, 0)
+
+    def test_result_cache_disk_size_eviction(self):
+        with ResultCache(max_entries=0, path=self.path) as cache:
+            cache.put("first", self.variants)
+            entry_bytes = cache.stats.disk_bytes
+
+        with ResultCache(max_entries=0, path=self.path, max_disk_bytes=int(entry_bytes * 2.5)) as cache:
+            cache.put("second", self.variants)
+            cache.get("first")
+            cache.put("third", self.variants)
+
+            self.assertIsNone(cache.get("second"))
+            self.assertEqual(cache.get("first"), self.variants)
+            self.assertEqual(cache.get("third"), self.variants)
+            self.assertLessEqual(cache.stats.disk_bytes, entry_bytes * 2.5)
+
+    def test_result_cache_returns_copies(self):
+        variants = list(self.variants)
+        with ResultCache(path=self.path) as cache:
+            cache.put("key", variants)
+            variants.clear()
+            cache.get("key").clear()
+            self.assertEqual(cache.get("key"), self.variants)
+
+        with ResultCache(path=self.path) as cache:
+            cache.get("key").clear()
+            self.assertEqual(cache.get("key"), self.variants)
+
+    def test_result_cache_disk_commit_size(self):
+        def count_committed():
+            with closing(sqlite3.connect(self.path)) as connection:
+                return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+        with ResultCache(max_entries=0, path=self.path, commit_size=2) as cache:
+            cache.put("a", self.variants)
+            self.assertEqual(count_committed(), 0)
+            self.assertEqual(cache.get("a"), self.variants)
+            self.assertEqual(count_committed(), 1)
+            cache.put("b", self.variants)
+
+        self.assertEqual(count_committed(), 2)
+
+    def test_result_cache_clear(self):
+        with ResultCache(path=self.path) as cache:
+            cache.put("key", self.variants)
+            cache.clear()
+            self.assertIsNone(cache.get("key"))
+            self.assertEqual(cache.stats.disk_bytes, 0)
+
+    def test_result_cache_negative_max_entries_error(self):
+        with self.assertRaisesRegex(ValueError, "got: -1"):
+            ResultCache(max_entries=-1)
+
+
+class CachedGenerateHgvsVariantsTestCase(PalamedesBaseCase):
+    def test_generate_hgvs_variants_cache_hit_skips_alignment(self):
+        cache = ResultCache()
+        expected = generate_hgvs_variants("PFKISIHL", "TPFKISIH", cache=cache)
+
+        with patch("palamedes.generate_alignment") as generate_alignment_mock:
+            self.assertEqual(generate_hgvs_variants("PFKISIHL", "TPFKISIH", cache=cache), expected)
+
+        generate_alignment_mock.assert_not_called()
+        self.assertEqual(cache.stats.memory_hits, 1)
+
+    def test_generate_hgvs_variants_batch_cache(self):
+        pairs = [SequencePair("a", "PFKISIHL", "TPFKISIH"), SequencePair("b", "PFKISIHL", "PFKISIHA")]
+        cache = ResultCache()
+        expected = generate_hgvs_variants_batch(pairs, executor_type=EXECUTOR_TYPE_SERIAL)
+
+        self.assertEqual(
+            generate_hgvs_variants_batch(pairs[:1], executor_type=EXECUTOR_TYPE_SERIAL, cache=cache), expected[:1]
+        )
+        self.assertEqual(generate_hgvs_variants_batch(pairs, executor_type=EXECUTOR_TYPE_THREAD, cache=cache), expected)
+        self.assertEqual(cache.stats.misses, 2)
+        self.assertEqual(cache.stats.memory_hits, 1)
+
+        # the batch API and the single pair API share cache entries
+        generate_hgvs_variants("PFKISIHL", "PFKISIHA", cache=cache)
+        self.assertEqual(cache.stats.memory_hits, 2)
+
+        # cached entries are records, returned as is in compact mode
+        compact_results = generate_hgvs_variants_batch(
+            pairs, executor_type=EXECUTOR_TYPE_SERIAL, cache=cache, compact=True
+        )
+        self.assertEqual(cache.stats.memory_hits, 4)
+        self.assertEqual(
+            [[record.to_hgvs() for record in result.variants] for result in compact_results],
+            [result.variants for result in expected],
+        )
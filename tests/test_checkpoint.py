@@ -0,0 +1,99 @@
+import json
+import os
+
+from palamedes.checkpoint import JOURNAL_FILE_NAME, METADATA_FILE_NAME, BatchCheckpoint
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class BatchCheckpointTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.tmp_dir = self.make_tmp_dir()
+        self.directory = os.path.join(self.tmp_dir, "checkpoint")
+
+    def add_pairs(self, checkpoint, pair_ids):
+        for pair_id in pair_ids:
+            checkpoint.add([pair_id], [f"{pair_id}\tvariant\n"], 1)
+
+    def test_commit_segments(self):
+        with BatchCheckpoint(self.directory, segment_size=2) as checkpoint:
+            self.add_pairs(checkpoint, ["a", "b", "c"])
+            self.assertEqual(checkpoint.segments, ["segment-00000000.tsv"])
+            self.assertTrue(checkpoint.is_completed("b"))
+            self.assertFalse(checkpoint.is_completed("c"))
+
+        self.assertEqual(checkpoint.segments, ["segment-00000000.tsv", "segment-00000001.tsv"])
+        self.assertEqual(list(checkpoint.iter_output_lines()), ["a\tvariant\n", "b\tvariant\n", "c\tvariant\n"])
+        self.assertEqual(sorted(os.listdir(self.directory))[-2:], checkpoint.segments)
+
+    def test_commit_interval(self):
+        with BatchCheckpoint(self.directory, interval_seconds=0) as checkpoint:
+            self.add_pairs(checkpoint, ["a", "b"])
+            self.assertEqual(len(checkpoint.segments), 2)
+
+    def test_resume(self):
+        pairs = make_random_pairs(6)
+        with BatchCheckpoint(self.directory, settings={"shard": "1/2"}) as checkpoint:
+            self.add_pairs(checkpoint, [pair.pair_id for pair in pairs[:3]])
+            checkpoint.add([pairs[3].pair_id, pairs[4].pair_id], [], 0)
+
+        with self.assertRaisesRegex(ValueError, "already holds a checkpoint"):
+            BatchCheckpoint(self.directory, settings={"shard": "1/2"})
+
+        with self.assertRaisesRegex(ValueError, "different settings"):
+            BatchCheckpoint(self.directory, settings={"shard": "2/2"}, resume=True)
+
+        with BatchCheckpoint(self.directory, settings={"shard": "1/2"}, resume=True) as checkpoint:
+            self.assertEqual(list(checkpoint.skip_completed(pairs)), pairs[5:])
+            self.assertEqual(checkpoint.completed[pairs[3].pair_id], 0)
+            self.add_pairs(checkpoint, [pairs[5].pair_id])
+
+        self.assertEqual(len(checkpoint.segments), 2)
+        self.assertEqual(
+            list(checkpoint.iter_output_lines()), [f"{pair.pair_id}\tvariant\n" for pair in pairs[:3] + pairs[5:]]
+        )
+
+    def test_resume_torn_journal(self):
+        with BatchCheckpoint(self.directory, segment_size=1) as checkpoint:
+            self.add_pairs(checkpoint, ["a", "b"])
+
+        journal_path = os.path.join(self.directory, JOURNAL_FILE_NAME)
+        with open(journal_path, "a") as handle:
+            handle.write('{"segment": "segment-00000002.tsv", "pairs": [["c"')
+
+        with BatchCheckpoint(self.directory, resume=True, segment_size=1) as checkpoint:
+            self.assertEqual(list(checkpoint.completed), ["a", "b"])
+            self.add_pairs(checkpoint, ["c"])
+
+        with BatchCheckpoint(self.directory, resume=True) as checkpoint:
+            self.assertEqual(list(checkpoint.completed), ["a", "b", "c"])
+            self.assertEqual(len(list(checkpoint.iter_output_lines())), 3)
+
+    def test_cli_resume(self):
+        fasta_path = os.path.join(self.tmp_dir, "alts.fa")
+        with open(fasta_path, "w") as handle:
+            handle.write("".join(f">alt-{idx}\nPFKISIH{'LAG'[idx % 3]}\n" for idx in range(9)))
+
+        def run_cli(*extra_args):
+            return self.run_cli(["palamedes", "PFKISIHL", "--alt-fasta", fasta_path, *extra_args]).splitlines()
+
+        expected = run_cli()
+        self.assertEqual(run_cli("--checkpoint-dir", self.directory), expected)
+        with self.assertRaisesRegex(ValueError, "already holds a checkpoint"):
+            run_cli("--checkpoint-dir", self.directory)
+
+        # an interrupted run, which completed the first alternates
+        resumed_directory = os.path.join(self.tmp_dir, "resumed")
+        with open(os.path.join(self.directory, METADATA_FILE_NAME)) as handle:
+            settings = json.load(handle)["settings"]
+
+        with BatchCheckpoint(resumed_directory, settings=settings) as checkpoint:
+            checkpoint.add(["alt-0", "alt-1"], ["alt-1\tcheckpointed\n"], 1)
+
+        self.assertEqual(
+            run_cli("--checkpoint-dir", resumed_directory, "--resume"),
+            ["alt-1\tcheckpointed"] + [line for line in expected if not line.startswith("alt-1\t")],
+        )
+
+        # groups of duplicates could be split across the interruption
+        with self.assertRaises(SystemExit):
+            run_cli("--checkpoint-dir", resumed_directory, "--resume", "--collapse-duplicates")
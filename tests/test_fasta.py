@@ -0,0 +1,184 @@
+import os
+import pickle
+from unittest.mock import patch
+
+from palamedes import generate_hgvs_variants
+from palamedes.align import generate_seq_record, get_reversed_sequence
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.config import EXECUTOR_TYPE_PROCESS, EXECUTOR_TYPE_THREAD
+from palamedes.fasta import (
+    FASTA_INDEX_SUFFIX,
+    IndexedFasta,
+    build_fasta_index,
+    open_indexed_fasta,
+    read_fasta_index,
+)
+from palamedes.models import FastaIndexEntry, SequencePair
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+FASTA = ">Jelleine-I some description\nPFKI\nSIHL\n>short\nMAG\n>empty\n>Jelleine-IV\nTPFKISIH\n"
+
+
+class IndexedFastaTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.tmp_dir = self.make_tmp_dir()
+        self.path = self.write_fasta("references.fa", FASTA)
+
+    def write_fasta(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w", newline="") as handle:
+            handle.write(content)
+
+        return path
+
+    def open_fasta(self, path):
+        fasta = IndexedFasta(path)
+        self.addCleanup(fasta.close)
+        return fasta
+
+    def test_build_fasta_index(self):
+        self.assertEqual(
+            build_fasta_index(self.path),
+            [
+                FastaIndexEntry("Jelleine-I", 8, 29, 4, 5),
+                FastaIndexEntry("short", 3, 46, 3, 4),
+                FastaIndexEntry("empty", 0, 57, 0, 0),
+                FastaIndexEntry("Jelleine-IV", 8, 70, 8, 9),
+            ],
+        )
+
+    def test_build_fasta_index_windows_line_ends(self):
+        path = self.write_fasta("crlf.fa", FASTA.replace("\n", "\r\n"))
+        self.assertEqual(build_fasta_index(path)[0], FastaIndexEntry("Jelleine-I", 8, 30, 4, 6))
+        self.assertEqual(str(self.open_fasta(path).seq_record("Jelleine-I").seq), "PFKISIHL")
+
+    def test_build_fasta_index_irregular_lines(self):
+        for content in (">a\nPFK\nISIHL\n", ">a\nPFKI\nSI\nHL\n", ">a\nPFKI\n\nSIHL\n"):
+            with self.subTest(content=content), self.assertRaisesRegex(ValueError, "lines of different lengths"):
+                build_fasta_index(self.write_fasta("irregular.fa", content))
+
+        with self.assertRaisesRegex(ValueError, "record ids must be unique"):
+            build_fasta_index(self.write_fasta("duplicate.fa", ">a\nPF\n>a x\nKI\n"))
+
+        with self.assertRaisesRegex(ValueError, "before the first title line"):
+            build_fasta_index(self.write_fasta("headless.fa", "PFKI\n>a\nPF\n"))
+
+    def test_indexed_fasta_records(self):
+        fasta = self.open_fasta(self.path)
+        self.assertEqual(fasta.ids, ["Jelleine-I", "short", "empty", "Jelleine-IV"])
+        self.assertIn("short", fasta)
+        self.assertEqual(len(fasta), 4)
+        self.assertEqual(
+            [(seq_record.id, str(seq_record.seq)) for seq_record in fasta],
+            [("Jelleine-I", "PFKISIHL"), ("short", "MAG"), ("empty", ""), ("Jelleine-IV", "TPFKISIH")],
+        )
+        with self.assertRaisesRegex(KeyError, "Record not found"):
+            fasta.seq_record("missing")
+
+    def test_indexed_fasta_reads(self):
+        fasta = self.open_fasta(self.path)
+        self.assertIsInstance(fasta.sequence("Jelleine-IV"), memoryview)
+        self.assertEqual(bytes(fasta.sequence("Jelleine-IV")), b"TPFKISIH")
+        self.assertEqual(bytes(fasta.sequence("Jelleine-I")), b"PFKISIHL")
+
+        seq = fasta.seq_record("Jelleine-I").seq
+        sequence = "PFKISIHL"
+        for key in (slice(0, 4), slice(2, 7), slice(3, 5), slice(-3, None), slice(None, None, -1), slice(5, 2)):
+            with self.subTest(key=key):
+                self.assertEqual(str(seq[key]), sequence[key])
+
+        self.assertEqual([seq[index] for index in range(-8, 8)], list(sequence * 2))
+        with self.assertRaises(IndexError):
+            seq[8]
+
+    def test_indexed_fasta_saves_index(self):
+        fasta = self.open_fasta(self.path)
+        index_path = self.path + FASTA_INDEX_SUFFIX
+        self.assertEqual(read_fasta_index(index_path), fasta.entries)
+
+        with patch("palamedes.fasta.build_fasta_index") as build_mock:
+            self.assertEqual(self.open_fasta(self.path).entries, fasta.entries)
+
+        build_mock.assert_not_called()
+
+    def test_indexed_fasta_variants(self):
+        fasta = self.open_fasta(self.path)
+        reference = generate_seq_record("PFKISIHL", "Jelleine-I")
+        self.assertEqual(
+            generate_hgvs_variants(fasta.seq_record("Jelleine-I"), "TPFKISIH"),
+            generate_hgvs_variants(reference, "TPFKISIH"),
+        )
+
+    def test_indexed_fasta_pickle(self):
+        fasta = self.open_fasta(self.path)
+        seq_record = pickle.loads(pickle.dumps(fasta.seq_record("Jelleine-I")))
+        self.assertIs(seq_record.seq._data.fasta, fasta)
+        self.assertEqual(str(seq_record.seq), "PFKISIHL")
+
+    def test_indexed_fasta_closed(self):
+        fasta = IndexedFasta(self.path)
+        seq_record = fasta.seq_record("short")
+        fasta.close()
+        fasta.close()
+        with self.assertRaisesRegex(ValueError, "is closed"):
+            str(seq_record.seq)
+
+    def test_open_fasta_files_bounded(self):
+        paths = [self.write_fasta(f"references-{idx}.fa", FASTA) for idx in range(3)]
+        with patch("palamedes.fasta.MAX_OPEN_FASTA_FILES", 2):
+            first = self.open_fasta(paths[0])
+            self.assertIs(open_indexed_fasta(paths[0]), first)
+            for path in paths[1:]:
+                self.open_fasta(path)
+
+        # the oldest file is dropped from the registry but left open for whoever still holds it
+        self.assertEqual(str(first.seq_record("short").seq), "MAG")
+        reopened = open_indexed_fasta(paths[0])
+        self.addCleanup(reopened.close)
+        self.assertIsNot(reopened, first)
+
+        # closing the dropped file leaves the one opened since registered
+        first.close()
+        self.assertIs(open_indexed_fasta(paths[0]), reopened)
+
+    def test_reversed_sequence(self):
+        fasta = IndexedFasta(self.path, reversed_cache_max_bytes=12)
+        self.addCleanup(fasta.close)
+        reversed_data = get_reversed_sequence(fasta.seq_record("Jelleine-I"))
+        self.assertEqual(reversed_data, b"LHISIKFP")
+        self.assertIs(get_reversed_sequence(fasta.seq_record("Jelleine-I")), reversed_data)
+
+        # past the byte budget the least recently used record is dropped
+        get_reversed_sequence(fasta.seq_record("Jelleine-IV"))
+        self.assertIsNot(get_reversed_sequence(fasta.seq_record("Jelleine-I")), reversed_data)
+        self.assertEqual(get_reversed_sequence(fasta.seq_record("short")), b"GAM")
+
+    def test_batch_reference_fasta(self):
+        pairs = make_random_pairs(12)
+        path = self.write_fasta(
+            "library.fa", "".join(f">reference-{idx}\n{pair.reference}\n" for idx, pair in enumerate(pairs))
+        )
+        expected = [
+            [
+                variant.format()
+                for variant in generate_hgvs_variants(
+                    generate_seq_record(pair.reference, f"reference-{idx}"), pair.alternate
+                )
+            ]
+            for idx, pair in enumerate(pairs)
+        ]
+
+        for executor_type in (EXECUTOR_TYPE_THREAD, EXECUTOR_TYPE_PROCESS):
+            with self.subTest(executor_type=executor_type):
+                results = generate_hgvs_variants_batch(
+                    [SequencePair(pair.pair_id, f"reference-{idx}", pair.alternate) for idx, pair in enumerate(pairs)],
+                    executor_type=executor_type,
+                    max_workers=2,
+                    chunk_size=5,
+                    reference_fasta=path,
+                )
+                self.assertEqual([[variant.format() for variant in result.variants] for result in results], expected)
+
+    def test_cli_ref_fasta(self):
+        stdout = self.run_cli(["palamedes", "Jelleine-I", "TPFKISIH", "--ref-fasta", self.path])
+        self.assertEqual(stdout.splitlines(), ["Jelleine-I:p.Pro1extThr-1", "Jelleine-I:p.Leu8del"])
@@ -0,0 +1,105 @@
+import gzip
+import os
+import time
+from tempfile import TemporaryDirectory
+
+from palamedes.config import MOLECULE_TYPE_ANNOTATION_KEY, MOLECULE_TYPE_PROTEIN
+from palamedes.inputs import PrefetchingReader, iter_fasta_seq_records, iter_seq_records
+from tests.base import PalamedesBaseCase
+
+
+class IterFastaSeqRecordsTestCase(PalamedesBaseCase):
+    def test_iter_fasta_seq_records(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "alts.fa")
+            with open(path, "w") as handle:
+                handle.write(">alt-1 some description\nPFKI\nSIHL\n>alt-2\nTPFKISIH\n")
+
+            seq_records = list(iter_fasta_seq_records(path))
+
+        self.assertEqual([seq_record.id for seq_record in seq_records], ["alt-1", "alt-2"])
+        self.assertEqual([str(seq_record.seq) for seq_record in seq_records], ["PFKISIHL", "TPFKISIH"])
+        self.assertEqual(seq_records[0].annotations, {MOLECULE_TYPE_ANNOTATION_KEY: MOLECULE_TYPE_PROTEIN})
+
+    def test_iter_seq_records_gzip_fastq(self):
+        with TemporaryDirectory() as tmp_dir:
+            fasta_path = os.path.join(tmp_dir, "alts.fa.gz")
+            with gzip.open(fasta_path, "wt") as handle:
+                handle.write(">alt-1\nPFKI\nSIHL\n>alt-2\nTPFKISIH\n")
+
+            fastq_path = os.path.join(tmp_dir, "alts.fq")
+            with open(fastq_path, "w") as handle:
+                handle.write("@alt-1 read\nPFKISIHL\n+\nIIIIIIII\n@alt-2\nTPFKISIH\n+\nIIIIIIII\n")
+
+            for path in (fasta_path, fastq_path):
+                with self.subTest(path=path):
+                    seq_records = list(iter_seq_records(path))
+                    self.assertEqual([seq_record.id for seq_record in seq_records], ["alt-1", "alt-2"])
+                    self.assertEqual([str(seq_record.seq) for seq_record in seq_records], ["PFKISIHL", "TPFKISIH"])
+
+
+class PrefetchingReaderTestCase(PalamedesBaseCase):
+    def test_prefetching_reader(self):
+        reader = PrefetchingReader(range(1000), batch_size=64, max_batches=2)
+        self.assertEqual(list(reader), list(range(1000)))
+        stats = reader.stats
+        self.assertEqual(stats.records, 1000)
+        self.assertEqual(stats.batches, 16)
+        self.assertGreaterEqual(stats.read_seconds, 0)
+        self.assertEqual(list(PrefetchingReader([])), [])
+
+    def test_prefetching_reader_backpressure(self):
+        produced = []
+        closed = []
+
+        def produce():
+            try:
+                for idx in range(100):
+                    produced.append(idx)
+                    yield idx
+            finally:
+                closed.append(True)
+
+        records = iter(PrefetchingReader(produce(), batch_size=5, max_batches=2))
+        self.assertEqual(next(records), 0)
+        time.sleep(0.2)
+        # the batch being consumed, two queued batches and the one the reader is blocked on
+        self.assertLessEqual(len(produced), 20)
+        records.close()
+        self.assertLess(len(produced), 100)
+        # the reader closed the input generator, which would close its file
+        self.assertEqual(closed, [True])
+
+    def test_prefetching_reader_bottleneck(self):
+        def slow_input():
+            for idx in range(4):
+                time.sleep(0.02)
+                yield idx
+
+        reader = PrefetchingReader(slow_input(), batch_size=1)
+        self.assertEqual(list(reader), [0, 1, 2, 3])
+        self.assertEqual(reader.stats.bottleneck, "input")
+
+        reader = PrefetchingReader(range(4), batch_size=1, max_batches=1)
+        for _ in reader:
+            time.sleep(0.02)
+
+        self.assertEqual(reader.stats.bottleneck, "compute")
+
+    def test_prefetching_reader_error(self):
+        def failing():
+            yield 1
+            raise ValueError("corrupt input")
+
+        with self.assertRaisesRegex(ValueError, "corrupt input"):
+            list(PrefetchingReader(failing(), batch_size=1))
+
+    def test_prefetching_reader_reuse_error(self):
+        reader = PrefetchingReader(range(10))
+        self.assertEqual(list(reader), list(range(10)))
+        with self.assertRaisesRegex(RuntimeError, "only be iterated once"):
+            iter(reader)
+
+    def test_prefetching_reader_invalid(self):
+        with self.assertRaisesRegex(ValueError, "must be at least 1"):
+            PrefetchingReader([], batch_size=0)
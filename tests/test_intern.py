@@ -0,0 +1,69 @@
+from palamedes import generate_variant_records
+from palamedes.batch import generate_hgvs_variants_batch, iter_collapsed_hgvs_variants_batch
+from palamedes.cache import ResultCache
+from palamedes.config import EXECUTOR_TYPE_PROCESS, EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_THREAD
+from palamedes.intern import VariantInternTable
+from palamedes.models import InternStats, SequencePair
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+PAIRS = [SequencePair(f"read-{idx}", "PFKISIHL", "TPFKISIH" if idx % 2 else "PFKISIHA") for idx in range(6)]
+
+
+class VariantInternTableTestCase(PalamedesBaseCase):
+    def test_intern(self):
+        table = VariantInternTable()
+        first = generate_variant_records("PFKISIHL", "PFKISIHA")[0]
+        second = generate_variant_records("PFKISIHL", "PFKISIHA")[0]
+        self.assertIsNot(first, second)
+        self.assertIs(table.intern(first), first)
+        self.assertIs(table.intern(second), first)
+        self.assertIs(table.to_hgvs(second), table.to_hgvs(first))
+        self.assertEqual(table.to_hgvs(first), first.to_hgvs())
+
+        other_reference = first._replace(accession="other")
+        self.assertIs(table.intern(other_reference), other_reference)
+        self.assertEqual(table.stats, InternStats(hits=1, misses=2, references=2, entries=2))
+
+        table.clear()
+        self.assertIs(table.intern(second), second)
+
+    def test_max_entries(self):
+        table = VariantInternTable(max_entries=1)
+        first, second = generate_variant_records("PFKISIHL", "TPFKISIH")
+        table.intern_all([first, second])
+        self.assertIs(table.intern(first._replace()), first)
+        self.assertIsNot(table.intern(copy := second._replace()), second)
+        self.assertIs(table.intern(copy), copy)
+        self.assertEqual(table.stats.entries, 1)
+
+    def test_batch(self):
+        expected = generate_hgvs_variants_batch(PAIRS, executor_type=EXECUTOR_TYPE_SERIAL)
+        for executor_type in (EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_THREAD, EXECUTOR_TYPE_PROCESS):
+            with self.subTest(executor_type=executor_type):
+                table = VariantInternTable()
+                results = generate_hgvs_variants_batch(
+                    PAIRS, executor_type=executor_type, max_workers=2, chunk_size=2, intern_table=table
+                )
+                self.assertEqual(results, expected)
+                self.assertIs(results[0].variants[0], results[2].variants[0])
+                self.assertIs(results[1].variants[1], results[5].variants[1])
+                self.assertEqual(table.stats, InternStats(hits=6, misses=3, references=1, entries=3))
+
+        compact_results = generate_hgvs_variants_batch(PAIRS, compact=True, intern_table=VariantInternTable())
+        self.assertIs(compact_results[1].variants[0], compact_results[3].variants[0])
+
+    def test_batch_with_cache(self):
+        pairs = make_random_pairs(20, length=20) * 2
+        expected = generate_hgvs_variants_batch(pairs, executor_type=EXECUTOR_TYPE_SERIAL)
+        table = VariantInternTable()
+        with ResultCache() as cache:
+            results = generate_hgvs_variants_batch(
+                pairs, executor_type=EXECUTOR_TYPE_SERIAL, cache=cache, intern_table=table
+            )
+            self.assertEqual(cache.stats.memory_hits, 20)
+
+        self.assertEqual(results, expected)
+        self.assertIs(results[0].variants[0], results[20].variants[0])
+
+        collapsed = list(iter_collapsed_hgvs_variants_batch(pairs, intern_table=table))
+        self.assertIs(collapsed[0].variants[0], results[0].variants[0])
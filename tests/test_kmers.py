@@ -0,0 +1,79 @@
+from palamedes.align import generate_seq_record, make_aligner
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.kmers import KmerIndex, distinct_kmers, iter_nearest_reference_pairs
+from palamedes.models import SequencePair
+from palamedes.panel import ReferencePanel
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class KmerIndexTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.pairs = make_random_pairs(40, length=120)
+        self.references = [
+            generate_seq_record(pair.reference, f"reference-{idx}") for idx, pair in enumerate(self.pairs)
+        ]
+        self.index = KmerIndex(self.references)
+
+    def test_distinct_kmers(self):
+        self.assertEqual(distinct_kmers(b"AAAAC", 3), {b"AAA", b"AAC"})
+        self.assertEqual(distinct_kmers(b"AC", 3), set())
+
+    def test_kmer_index_shared_kmer_counts(self):
+        index = KmerIndex([generate_seq_record("PFKISIHL", "a"), generate_seq_record("MAGIC", "b")])
+        self.assertEqual(index.shared_kmer_counts("PFKIMAG").tolist(), [2, 1])
+        self.assertEqual(index.shared_kmer_counts("WW").tolist(), [0, 0])
+        self.assertEqual(index.shortlist("MAGICPF", size=1), [1])
+        self.assertEqual(index.shortlist("WW"), [0, 1])
+
+    def test_kmer_index_assign(self):
+        for idx, pair in enumerate(self.pairs):
+            assignment = self.index.assign(pair.alternate)
+            self.assertEqual(assignment.reference_id, f"reference-{idx}")
+            self.assertEqual(assignment.candidates[0], f"reference-{idx}")
+            self.assertEqual(assignment.score, make_aligner().score(pair.reference, pair.alternate))
+
+    def test_kmer_index_assign_confirms_shortlist(self):
+        # both share every k-mer of the alternate, the alignment score breaks the tie
+        index = KmerIndex([generate_seq_record("PFKISIHLPFKISIHL", "repeat"), generate_seq_record("PFKISIHL", "exact")])
+        assignment = index.assign("PFKISIHL")
+        self.assertEqual(assignment.candidates, ["repeat", "exact"])
+        self.assertEqual(assignment.reference_id, "exact")
+        self.assertEqual(assignment.score, 8)
+
+    def test_kmer_index_errors(self):
+        with self.assertRaisesRegex(ValueError, "k must be positive"):
+            KmerIndex(self.references, k=0)
+
+        with self.assertRaisesRegex(ValueError, "must be unique"):
+            KmerIndex(self.references[:1] * 2)
+
+        with self.assertRaisesRegex(ValueError, "empty KmerIndex"):
+            KmerIndex([]).assign("PFKISIHL")
+
+        aligner = make_aligner()
+        aligner.mode = "local"
+        with self.assertRaisesRegex(ValueError, "global mode, got: local"):
+            self.index.assign("PFKISIHL", aligner=aligner)
+
+    def test_iter_nearest_reference_pairs(self):
+        alternates = [generate_seq_record(pair.alternate, pair.pair_id) for pair in reversed(self.pairs)]
+        nearest_pairs = list(iter_nearest_reference_pairs(alternates, self.index))
+        self.assertEqual([pair.pair_id for pair in nearest_pairs], [pair.pair_id for pair in reversed(self.pairs)])
+        self.assertEqual(
+            [pair.reference.id for pair in nearest_pairs],
+            [f"reference-{idx}" for idx in reversed(range(len(self.pairs)))],
+        )
+
+        results = generate_hgvs_variants_batch(nearest_pairs)
+        expected = generate_hgvs_variants_batch(
+            [SequencePair(pair.pair_id, self.references[idx], pair.alternate) for idx, pair in enumerate(self.pairs)]
+        )
+        self.assertEqual(
+            sorted((result.pair_id, [variant.format() for variant in result.variants]) for result in results),
+            sorted((result.pair_id, [variant.format() for variant in result.variants]) for result in expected),
+        )
+
+    def test_kmer_index_reference_panel(self):
+        with ReferencePanel(self.references) as panel:
+            index = KmerIndex(panel)
+            self.assertEqual(index.assign(self.pairs[3].alternate).reference_id, "reference-3")
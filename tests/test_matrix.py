@@ -0,0 +1,130 @@
+import io
+import pickle
+
+from palamedes import generate_hgvs_variants
+from palamedes.align import generate_seq_record, get_reversed_sequence
+from palamedes.config import EXECUTOR_TYPE_PROCESS, EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_THREAD
+from palamedes.matrix import (
+    iter_all_vs_all_hgvs_variants,
+    make_reversible_seq_record,
+    plan_tiles,
+    write_all_vs_all_hgvs_variants,
+)
+from palamedes.models import MatrixTile
+from palamedes.panel import ReferencePanel
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class PlanTilesTestCase(PalamedesBaseCase):
+    def test_plan_tiles(self):
+        tiles = plan_tiles([10, 20, 30], [1, 2], tile_size=2)
+        self.assertEqual(tiles, [MatrixTile(0, 2, 0, 2, 90), MatrixTile(2, 3, 0, 2, 90)])
+
+    def test_plan_tiles_cost_order(self):
+        tiles = plan_tiles([5, 100, 1, 1], [5, 100, 1], tile_size=1)
+        self.assertEqual(len(tiles), 12)
+        self.assertEqual(tiles[0], MatrixTile(1, 2, 1, 2, 10_000))
+        self.assertEqual([tile.cost for tile in tiles], sorted((tile.cost for tile in tiles), reverse=True))
+
+    def test_plan_tiles_skip_symmetric(self):
+        lengths = [3, 4, 5, 6, 7]
+        tiles = plan_tiles(lengths, lengths, tile_size=2, skip_symmetric=True)
+        self.assertEqual(
+            sorted(tiles),
+            [
+                MatrixTile(0, 2, 0, 2, 12),
+                MatrixTile(0, 2, 2, 4, 77),
+                MatrixTile(0, 2, 4, 5, 49),
+                MatrixTile(2, 4, 2, 4, 30),
+                MatrixTile(2, 4, 4, 5, 77),
+            ],
+        )
+        self.assertEqual(
+            sum(tile.cost for tile in tiles),
+            sum(lengths[i] * lengths[j] for i in range(len(lengths)) for j in range(i + 1, len(lengths))),
+        )
+
+    def test_plan_tiles_invalid_size(self):
+        with self.assertRaisesRegex(ValueError, "tile_size must be at least 1, got: 0"):
+            plan_tiles([1], [1], tile_size=0)
+
+
+class ReversibleSeqRecordTestCase(PalamedesBaseCase):
+    def test_make_reversible_seq_record(self):
+        reference = generate_seq_record("PFKISIHL", "Jelleine-I")
+        seq_record = make_reversible_seq_record(reference)
+        self.assertEqual((seq_record.id, str(seq_record.seq)), ("Jelleine-I", "PFKISIHL"))
+        self.assertEqual(seq_record.annotations, reference.annotations)
+        self.assertIs(get_reversed_sequence(seq_record), get_reversed_sequence(seq_record))
+        self.assertEqual(get_reversed_sequence(seq_record), b"LHISIKFP")
+        self.assertEqual(str(pickle.loads(pickle.dumps(seq_record)).seq), "PFKISIHL")
+        self.assertIs(make_reversible_seq_record(seq_record), seq_record)
+        with ReferencePanel([reference]) as panel:
+            self.assertIs(make_reversible_seq_record(panel_record := panel.seq_record(0)), panel_record)
+
+        alternate = generate_seq_record("TPFKISIH", "Jelleine-IV")
+        self.assertEqual(
+            generate_hgvs_variants(seq_record, make_reversible_seq_record(alternate)),
+            generate_hgvs_variants(reference, alternate),
+        )
+
+
+class AllVsAllTestCase(PalamedesBaseCase):
+    def setUp(self):
+        pairs = make_random_pairs(6, length=30)
+        self.references = [generate_seq_record(pair.reference, f"reference-{idx}") for idx, pair in enumerate(pairs)]
+        self.alternates = [generate_seq_record(pair.alternate, pair.pair_id) for pair in pairs]
+
+    def expected(self, references, alternates, skip_symmetric=False):
+        return sorted(
+            (reference.id, alternate.id, [variant.format() for variant in generate_hgvs_variants(reference, alternate)])
+            for reference_index, reference in enumerate(references)
+            for alternate_index, alternate in enumerate(alternates)
+            if not skip_symmetric or reference_index < alternate_index
+        )
+
+    def format_results(self, results):
+        return sorted(
+            (result.reference_id, result.alternate_id, [variant.format() for variant in result.variants])
+            for result in results
+        )
+
+    def test_all_vs_all_matrix(self):
+        for executor_type in (EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_THREAD, EXECUTOR_TYPE_PROCESS):
+            with self.subTest(executor_type=executor_type):
+                results = iter_all_vs_all_hgvs_variants(
+                    self.references, self.alternates, executor_type=executor_type, max_workers=2, tile_size=4
+                )
+                self.assertEqual(self.format_results(results), self.expected(self.references, self.alternates))
+
+    def test_all_vs_all_set(self):
+        results = list(iter_all_vs_all_hgvs_variants(self.references, max_workers=1, tile_size=4))
+        self.assertEqual(len(results), 36)
+        self.assertEqual(self.format_results(results), self.expected(self.references, self.references))
+
+    def test_all_vs_all_skip_symmetric(self):
+        results = list(iter_all_vs_all_hgvs_variants(self.references, skip_symmetric=True, tile_size=4, compact=True))
+        self.assertEqual(len(results), 15)
+        self.assertEqual(
+            self.format_results(results), self.expected(self.references, self.references, skip_symmetric=True)
+        )
+
+    def test_all_vs_all_errors(self):
+        with self.assertRaisesRegex(ValueError, "omit alternates"):
+            next(iter_all_vs_all_hgvs_variants(self.references, self.alternates, skip_symmetric=True))
+
+        with self.assertRaisesRegex(ValueError, "Unsupported executor_type: nope"):
+            next(iter_all_vs_all_hgvs_variants(self.references, executor_type="nope"))
+
+    def test_write_all_vs_all(self):
+        handle = io.StringIO()
+        pair_count = write_all_vs_all_hgvs_variants(handle, self.references, self.alternates, tile_size=5)
+        self.assertEqual(pair_count, 36)
+        self.assertEqual(
+            sorted(handle.getvalue().splitlines()),
+            sorted(
+                f"{reference_id}\t{alternate_id}\t{hgvs}"
+                for reference_id, alternate_id, variants in self.expected(self.references, self.alternates)
+                for hgvs in variants
+            ),
+        )
@@ -1,6 +1,10 @@
+import pickle
 from unittest import TestCase
 
-from palamedes.models import Block
+from palamedes import generate_hgvs_variants, generate_variant_records
+from palamedes.config import HGVS_VARIANT_TYPE_CODES, HGVS_VARIANT_TYPE_DELETION
+from palamedes.models import Block, VariantRecord
+from tests.base import make_random_pairs
 
 
 class BlockTestCase(TestCase):
@@ -50,3 +54,27 @@ class BlockTestCase(TestCase):
         self.assertEqual(collapsed_block.start, first_block.start)
         self.assertEqual(collapsed_block.end, third_block.end)
         self.assertEqual(collapsed_block.bases, "A" * 4 + "G" * 6 + "C" * 5)
+
+
+class VariantRecordTestCase(TestCase):
+    def test_variant_record_hgvs_type(self):
+        record = VariantRecord("ref", HGVS_VARIANT_TYPE_CODES[HGVS_VARIANT_TYPE_DELETION], 8, 8, "L", "")
+        self.assertEqual(record.hgvs_type, HGVS_VARIANT_TYPE_DELETION)
+        self.assertEqual(record.format(), "ref:p.Leu8del")
+
+    def test_variant_record_to_hgvs(self):
+        for pair in make_random_pairs(50):
+            records = generate_variant_records(pair.reference, pair.alternate)
+            variants = generate_hgvs_variants(pair.reference, pair.alternate)
+            self.assertEqual([record.to_hgvs() for record in records], variants)
+            self.assertEqual([record.format() for record in records], [variant.format() for variant in variants])
+
+    def test_variant_record_pickle_size(self):
+        records = []
+        variants = []
+        for pair in make_random_pairs(50):
+            records.extend(generate_variant_records(pair.reference, pair.alternate))
+            variants.extend(generate_hgvs_variants(pair.reference, pair.alternate))
+
+        self.assertEqual(pickle.loads(pickle.dumps(records)), records)
+        self.assertLess(len(pickle.dumps(records)) * 3, len(pickle.dumps(variants)))
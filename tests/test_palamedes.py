@@ -1,11 +1,22 @@
-from palamedes import generate_alignment, generate_hgvs_variants_from_alignment
+from itertools import islice
+from unittest.mock import patch
+
+from palamedes import (
+    generate_alignment,
+    generate_hgvs_variants,
+    generate_hgvs_variants_from_alignment,
+    generate_variant_records_from_alignment,
+    iter_hgvs_variants,
+    iter_hgvs_variants_from_alignment,
+)
 from palamedes.config import (
     MOLECULE_TYPE_PROTEIN,
     MOLECULE_TYPE_ANNOTATION_KEY,
     GLOBAL_ALIGN_MODE,
+    HGVS_VARIANT_TYPE_DUPLICATION,
 )
 from Bio.Align import Alignment, PairwiseAligner
-from tests.base import PalamedesBaseCase
+from tests.base import PalamedesBaseCase, make_random_pairs
 from tests.hgvs.test_builders import HgvsProteinBuilderTestCase
 
 
@@ -34,6 +45,38 @@ class GenerateHGVSVariantsFromAlignmentTestCase(HgvsProteinBuilderTestCase):
             "C4dup",
         )
 
+    def test_generate_variant_records_from_alignment(self):
+        ref, alt = self.make_seq_records(
+            "ATGCA",
+            "ATTGCCA",
+        )
+        alignment = generate_alignment(ref, alt)
+
+        records = generate_variant_records_from_alignment(alignment)
+        self.assertEqual([record.to_hgvs() for record in records], generate_hgvs_variants_from_alignment(alignment))
+        self.assert_variant_string_matches(records[0].to_hgvs(), "T2dup")
+
+    def test_generate_variant_records_from_alignment_table(self):
+        # long alignments go through the array based variant block table, which must agree with the column walk
+        alignments = [
+            generate_alignment(*self.make_seq_records(pair.reference, pair.alternate))
+            for pair in make_random_pairs(30) + make_random_pairs(2, length=2500, seed=3)
+        ]
+        for use_non_standard_substitution_rules in (False, True):
+            with patch("palamedes.config.VARIANT_BLOCK_TABLE_MIN_COLUMNS", 10**9):
+                expected = [
+                    generate_variant_records_from_alignment(alignment, use_non_standard_substitution_rules)
+                    for alignment in alignments
+                ]
+
+            with patch("palamedes.config.VARIANT_BLOCK_TABLE_MIN_COLUMNS", 0):
+                records = [
+                    generate_variant_records_from_alignment(alignment, use_non_standard_substitution_rules)
+                    for alignment in alignments
+                ]
+
+            self.assertEqual(records, expected)
+
     def test_generate_hgvs_variants_from_alignment_molecule_type_error(self):
         bad_molecule_type = "FAKE"
         with self.assertRaisesRegex(
@@ -47,6 +90,49 @@ class GenerateHGVSVariantsFromAlignmentTestCase(HgvsProteinBuilderTestCase):
             generate_hgvs_variants_from_alignment(alignment, molecule_type=bad_molecule_type)
 
 
+class IterHGVSVariantsTestCase(PalamedesBaseCase):
+    def test_iter_hgvs_variants_from_alignment(self):
+        alignment = generate_alignment(*self.make_seq_records("ATGCA", "ATTGCCA"))
+        triples = list(iter_hgvs_variants_from_alignment(alignment))
+
+        self.assertEqual([variant for _, _, variant in triples], generate_hgvs_variants_from_alignment(alignment))
+        self.assertEqual([hgvs_type for _, hgvs_type, _ in triples], [HGVS_VARIANT_TYPE_DUPLICATION] * 2)
+        self.assertEqual(triples[0][0].alignment_block.start, 2)
+
+    def test_iter_hgvs_variants(self):
+        for pair in make_random_pairs(20):
+            for use_non_standard_substitution_rules in (False, True):
+                self.assertEqual(
+                    [
+                        variant
+                        for _, _, variant in iter_hgvs_variants(
+                            pair.reference,
+                            pair.alternate,
+                            use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+                        )
+                    ],
+                    generate_hgvs_variants(
+                        pair.reference,
+                        pair.alternate,
+                        use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+                    ),
+                )
+
+    def test_iter_hgvs_variants_early_stop(self):
+        reference = "PFKISIHL" * 100
+        alternate = "".join(reference[idx] if idx % 16 else "W" for idx in range(len(reference)))
+        first_variants = [variant.format() for _, _, variant in islice(iter_hgvs_variants(reference, alternate), 2)]
+        self.assertEqual(first_variants, ["ref:p.Pro1Trp", "ref:p.Pro17Trp"])
+
+    def test_iter_hgvs_variants_molecule_type_error(self):
+        with self.assertRaisesRegex(NotImplementedError, "Type FAKE unsupported or unrecognized!"):
+            iter_hgvs_variants("ATGCA", "ATTGCCA", molecule_type="FAKE")
+
+        alignment = generate_alignment(*self.make_seq_records("ATGCA", "ATTGCCA"))
+        with self.assertRaisesRegex(NotImplementedError, "No HGVS builder is defined for molecule_type: FAKE!"):
+            iter_hgvs_variants_from_alignment(alignment, molecule_type="FAKE")
+
+
 class GenerateAlignmentTestCase(PalamedesBaseCase):
     def test_generate_alignment_missing_molecule_type_error(self):
         ref, alt = self.make_seq_records("A", "A", molecule_type="foobar")
@@ -0,0 +1,110 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from palamedes import generate_alignment, generate_hgvs_variants
+from palamedes.align import generate_seq_record, get_reversed_sequence
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.config import EXECUTOR_TYPE_PROCESS, REF_SEQUENCE_ID
+from palamedes.models import SequencePair
+from palamedes.panel import ReferencePanel
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+def read_panel_sequence(seq_record_pickle: bytes) -> tuple[str, bool]:
+    """Run in a spawned process, which can only get at the sequence by attaching to the shared memory"""
+    from palamedes.panel import _ATTACHED_PANELS
+
+    seq_record = pickle.loads(seq_record_pickle)
+    return str(seq_record.seq), seq_record.seq._data.panel.name in _ATTACHED_PANELS
+
+
+class ReferencePanelTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.references = [generate_seq_record("PFKISIHL", "Jelleine-I"), generate_seq_record("MAGIC", "magic")]
+        self.panel = ReferencePanel(self.references)
+        self.addCleanup(self.panel.close)
+
+    def test_reference_panel_sequences(self):
+        self.assertEqual(len(self.panel), 2)
+        self.assertIn("magic", self.panel)
+        self.assertEqual(self.panel.index("magic"), 1)
+        self.assertEqual(bytes(self.panel.sequence(0)), b"PFKISIHL")
+        self.assertEqual(bytes(self.panel.reversed_sequence(0)), b"LHISIKFP")
+        self.assertEqual(bytes(self.panel.sequence(1)), b"MAGIC")
+        self.assertEqual(bytes(self.panel.reversed_sequence(1)), b"CIGAM")
+        self.assertTrue(self.panel.sequence(0).readonly)
+
+    def test_reference_panel_seq_record(self):
+        for reference, seq_record in zip(self.references, self.panel):
+            self.assertEqual(seq_record.id, reference.id)
+            self.assertEqual(seq_record.seq, reference.seq)
+            self.assertEqual(str(seq_record.seq), str(reference.seq))
+            self.assertEqual(len(seq_record), len(reference))
+            self.assertEqual(seq_record.annotations, reference.annotations)
+
+        self.assertEqual(str(self.panel.seq_record("magic").seq[1:4]), "AGI")
+        self.assertEqual(bytes(get_reversed_sequence(self.panel.seq_record(1))), b"CIGAM")
+        self.assertEqual(get_reversed_sequence(self.references[1]), b"CIGAM")
+
+    def test_reference_panel_unknown_id(self):
+        with self.assertRaisesRegex(KeyError, "not found in panel: missing"):
+            self.panel.seq_record("missing")
+
+    def test_reference_panel_duplicate_ids(self):
+        with self.assertRaisesRegex(ValueError, "must be unique"):
+            ReferencePanel(self.references + self.references[:1])
+
+    def test_reference_panel_variants(self):
+        seq_record = self.panel.seq_record("Jelleine-I")
+        alignment = generate_alignment(seq_record, generate_seq_record("TPFKISIH", "Jelleine-IV"))
+        expected = generate_alignment(self.references[0], generate_seq_record("TPFKISIH", "Jelleine-IV"))
+        self.assertEqual(alignment[0], expected[0])
+        self.assertEqual(alignment[1], expected[1])
+        self.assertEqual(
+            generate_hgvs_variants(seq_record, "PFKIGSIHL"), generate_hgvs_variants(self.references[0], "PFKIGSIHL")
+        )
+
+    def test_reference_panel_pickle(self):
+        seq_record = pickle.loads(pickle.dumps(self.panel.seq_record(0)))
+        self.assertIs(seq_record.seq._data.panel, self.panel)
+        self.assertEqual(seq_record.seq, self.references[0].seq)
+        self.assertLess(len(pickle.dumps(self.panel.seq_record(0).seq)), 200 + len(self.panel.name))
+
+    def test_reference_panel_spawned_worker(self):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            future = executor.submit(read_panel_sequence, pickle.dumps(self.panel.seq_record("magic")))
+            self.assertEqual(future.result(), ("MAGIC", True))
+
+    def test_reference_panel_batch(self):
+        pairs = make_random_pairs(24)
+        with ReferencePanel(
+            generate_seq_record(pair.reference, f"reference-{idx}") for idx, pair in enumerate(pairs)
+        ) as panel:
+            panel_pairs = [
+                SequencePair(pair.pair_id, panel.seq_record(idx), pair.alternate) for idx, pair in enumerate(pairs)
+            ]
+            results = generate_hgvs_variants_batch(
+                panel_pairs, executor_type=EXECUTOR_TYPE_PROCESS, max_workers=2, chunk_size=5
+            )
+
+        self.assertEqual(
+            [[variant.format() for variant in result.variants] for result in results],
+            [
+                [
+                    variant.format().replace(REF_SEQUENCE_ID, f"reference-{idx}", 1)
+                    for variant in generate_hgvs_variants(pair.reference, pair.alternate)
+                ]
+                for idx, pair in enumerate(pairs)
+            ],
+        )
+
+    def test_reference_panel_close(self):
+        panel = ReferencePanel(self.references)
+        panel.close()
+        panel.close()
+        with self.assertRaisesRegex(ValueError, "is closed"):
+            panel.sequence(0)
+
+        with self.assertRaises(FileNotFoundError):
+            ReferencePanel.attach(panel.name, panel.ids, panel.offsets, panel.molecule_type)
@@ -0,0 +1,137 @@
+import random
+
+from palamedes import generate_variant_records
+from palamedes.align import generate_ungapped_variant_records, make_aligner
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.config import (
+    ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING,
+    ALIGNMENT_STRATEGY_IDENTICAL,
+    ALIGNMENT_STRATEGY_REFUSED,
+    ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY,
+    ALIGNMENT_STRATEGY_UNGAPPED,
+    EXECUTOR_TYPE_PROCESS,
+    EXECUTOR_TYPE_SERIAL,
+)
+from palamedes.models import AlignmentPlan, SequencePair
+from palamedes.planner import (
+    generate_planned_variant_records,
+    is_ungapped_alignment_optimal,
+    iter_planned_hgvs_variants_batch,
+    kmer_similarity,
+    plan_alignment,
+)
+from tests.base import AMINO_ACIDS, PalamedesBaseCase, make_random_pairs
+
+
+def make_substituted_pairs(count: int, seed: int = 7) -> list[SequencePair]:
+    """Pairs of the same length, with anywhere from no substitutions to every position substituted"""
+    rng = random.Random(seed)
+    pairs = []
+    for idx in range(count):
+        reference = "".join(rng.choices(AMINO_ACIDS, k=rng.randint(1, 40)))
+        alternate = list(reference)
+        for _ in range(rng.randint(0, len(reference))):
+            alternate[rng.randrange(len(alternate))] = rng.choice(AMINO_ACIDS)
+
+        pairs.append(SequencePair(f"pair-{idx}", reference, "".join(alternate)))
+
+    return pairs
+
+
+class PlannerTestCase(PalamedesBaseCase):
+    def test_plan_alignment(self):
+        self.assertEqual(
+            plan_alignment("PFKISIHL", "PFKISIHL"),
+            AlignmentPlan(ALIGNMENT_STRATEGY_IDENTICAL, True, 81, 405, 0, 1.0),
+        )
+        self.assertEqual(plan_alignment("PFKISIHL", "PFKISIHA").strategy, ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY)
+        # same length, but aligning with gaps scores better
+        self.assertEqual(plan_alignment("PFKISIHL", "TPFKISIH").strategy, ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING)
+
+        plan = plan_alignment("PFKISIHL", "PFKIGSIHL")
+        self.assertEqual(plan.strategy, ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING)
+        self.assertEqual((plan.dp_cells, plan.length_delta), (90, 1))
+
+    def test_memory_budget(self):
+        self.assertEqual(
+            plan_alignment("PFKISIHL", "TPFKISIH", memory_budget_bytes=100).strategy, ALIGNMENT_STRATEGY_REFUSED
+        )
+        self.assertEqual(
+            plan_alignment("PFKISIHL", "TPFKISIH", memory_budget_bytes=100, degrade=True),
+            AlignmentPlan(ALIGNMENT_STRATEGY_UNGAPPED, False, 81, 405, 0, plan_alignment("PFKISIHL", "TPFKISIH")[-1]),
+        )
+        self.assertEqual(
+            plan_alignment("PFKISIHL", "PFKIGSIHL", memory_budget_bytes=100, degrade=True).strategy,
+            ALIGNMENT_STRATEGY_REFUSED,
+        )
+        # exact strategies without a full alignment are not limited by the budget
+        self.assertEqual(
+            plan_alignment("PFKISIHL", "PFKISIHA", memory_budget_bytes=100).strategy,
+            ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY,
+        )
+
+        with self.assertRaisesRegex(ValueError, "over the memory budget"):
+            generate_planned_variant_records("PFKISIHL", "TPFKISIH", memory_budget_bytes=100)
+
+        plan, records = generate_planned_variant_records("PFKISIHL", "TPFKISIH", memory_budget_bytes=100, degrade=True)
+        self.assertFalse(plan.exact)
+        self.assertEqual(records, generate_ungapped_variant_records("PFKISIHL", "TPFKISIH"))
+
+    def test_exact_strategies(self):
+        aligners = [
+            make_aligner(),
+            make_aligner(open_gap_score=-3, extend_gap_score=-0.5),
+            make_aligner(mismatch_score=0),
+        ]
+        for aligner in aligners:
+            strategies = set()
+            for pair in make_substituted_pairs(500) + make_random_pairs(50, length=20):
+                plan, records = generate_planned_variant_records(pair.reference, pair.alternate, aligner=aligner)
+                strategies.add(plan.strategy)
+                self.assertTrue(plan.exact)
+                self.assertEqual(records, generate_variant_records(pair.reference, pair.alternate, aligner=aligner))
+
+            self.assertEqual(
+                strategies,
+                {
+                    ALIGNMENT_STRATEGY_IDENTICAL,
+                    ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY,
+                    ALIGNMENT_STRATEGY_DYNAMIC_PROGRAMMING,
+                },
+            )
+
+    def test_is_ungapped_alignment_optimal(self):
+        aligner = make_aligner()
+        self.assertTrue(is_ungapped_alignment_optimal(b"PFKISIHL", b"PFKISIHA", aligner))
+        self.assertFalse(is_ungapped_alignment_optimal(b"PFKISIHL", b"TPFKISIH", aligner))
+
+        aligner.mode = "local"
+        self.assertFalse(is_ungapped_alignment_optimal(b"PFKISIHL", b"PFKISIHA", aligner))
+
+        # with only negative scores a gapped alignment has fewer scored columns, "AB-C"/"ABD-" beats the ungapped one
+        aligner = make_aligner()
+        aligner.match_score = aligner.mismatch_score = aligner.open_gap_score = -1
+        aligner.extend_gap_score = 0
+        self.assertFalse(is_ungapped_alignment_optimal(b"ABC", b"ABD", aligner))
+        self.assertNotEqual(plan_alignment("ABC", "ABD", aligner).strategy, ALIGNMENT_STRATEGY_SUBSTITUTION_ONLY)
+        self.assertGreater(aligner.score("ABC", "ABD"), -3)
+
+    def test_kmer_similarity(self):
+        self.assertEqual(kmer_similarity(b"PFKISIHL", b"PFKISIHL"), 1.0)
+        self.assertEqual(kmer_similarity(b"PFKISIHL", b"WWWWWWWW"), 0.0)
+        self.assertEqual(kmer_similarity(b"PF", b"PF"), 1.0)
+        self.assertAlmostEqual(kmer_similarity(b"PFKISIHL", b"PFKISIHA"), 5 / 7)
+
+    def test_planned_batch(self):
+        pairs = make_substituted_pairs(40) + [SequencePair("long", "PFKISIHL" * 10, "TPFKISIH" * 10)]
+        expected = generate_hgvs_variants_batch(pairs, executor_type=EXECUTOR_TYPE_SERIAL)
+        for executor_type in (EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_PROCESS):
+            with self.subTest(executor_type=executor_type):
+                results = list(
+                    iter_planned_hgvs_variants_batch(pairs, executor_type=executor_type, max_workers=2, chunk_size=8)
+                )
+                self.assertEqual([(result.pair_id, result.variants) for result in results], expected)
+
+        results = list(iter_planned_hgvs_variants_batch(pairs, memory_budget_bytes=1000, compact=True))
+        self.assertEqual(results[-1].plan.strategy, ALIGNMENT_STRATEGY_REFUSED)
+        self.assertEqual(results[-1].variants, [])
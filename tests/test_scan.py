@@ -0,0 +1,68 @@
+import random
+
+from palamedes import generate_hgvs_variants
+from palamedes.config import STANDARD_AMINO_ACIDS
+from palamedes.models import MutationScanSpec, ScanVariant, VariantRecord
+from palamedes.scan import check_mutation_scan, count_runs, iter_mutation_scan
+from tests.base import PalamedesBaseCase
+
+INDEL_SPEC = MutationScanSpec(deletion_lengths=(1, 2, 3), insertions=("G", "K", "KK", "GS", "AKA"))
+
+
+class MutationScanTestCase(PalamedesBaseCase):
+    def test_count_runs(self):
+        import numpy as np
+
+        self.assertEqual(count_runs(np.array([True, True, False, True])).tolist(), [2, 1, 0, 1, 0])
+        self.assertEqual(count_runs(np.array([], dtype=bool)).tolist(), [0])
+
+    def test_substitutions(self):
+        library = list(iter_mutation_scan("PFKISIHL"))
+        self.assertEqual(len(library), 8 * 19)
+        self.assertEqual(library[0], ScanVariant("sub-1-A", "AFKISIHL", VariantRecord("ref", 0, 1, 1, "P", "A")))
+        self.assertEqual(
+            [variant.format() for variant in generate_hgvs_variants("PFKISIHL", library[-1].alternate)],
+            [library[-1].variant.format()],
+        )
+
+        ref, _ = self.make_seq_records("PFKISIHL", "PFKISIHL")
+        ref.id = "Jelleine-I"
+        library = list(iter_mutation_scan(ref, MutationScanSpec(substitutions="AP")))
+        self.assertEqual([scan_variant.alternate_id for scan_variant in library[:2]], ["sub-1-A", "sub-2-A"])
+        self.assertEqual({scan_variant.variant.accession for scan_variant in library}, {"Jelleine-I"})
+
+    def test_indels(self):
+        library = list(iter_mutation_scan("PFKKISIHL", INDEL_SPEC._replace(substitutions="")))
+        by_id = {scan_variant.alternate_id: scan_variant for scan_variant in library}
+        # deleting either lysine gives the same alternate, reported at the 3' most one
+        self.assertNotIn("del-4-1", by_id)
+        self.assertEqual(by_id["del-3-1"].variant.format(), "ref:p.Lys4del")
+        self.assertEqual(by_id["ins-2-K"].variant.format(), "ref:p.Lys4dup")
+        self.assertEqual(by_id["ins-2-KK"].variant.format(), "ref:p.Lys3_Lys4dup")
+        self.assertEqual(by_id["ins-0-G"].variant.format(), "ref:p.Pro1extGly-1")
+        self.assertEqual(by_id["ins-5-GS"].variant.format(), "ref:p.Ile5_Ser6insGlySer")
+        self.assertEqual(len({scan_variant.alternate for scan_variant in library}), len(library))
+
+        # inserting "SG" after the glycine gives the same alternate as inserting "GS" before it
+        library = list(iter_mutation_scan("PFGSKL", MutationScanSpec(substitutions="", insertions=("GS", "SG"))))
+        alternate_ids = [scan_variant.alternate_id for scan_variant in library]
+        self.assertIn("ins-2-GS", alternate_ids)
+        self.assertNotIn("ins-3-SG", alternate_ids)
+        self.assertEqual(len({scan_variant.alternate for scan_variant in library}), len(library))
+
+    def test_matches_alignment(self):
+        rng = random.Random(3)
+        references = ["PFKISIHL", "MKKKLLLAAAGSGSGSWW", "AAAAAA", "GSGSGSGS", "MAKAKAKAKQ"]
+        references += ["".join(rng.choices(STANDARD_AMINO_ACIDS, k=rng.randint(2, 30))) for _ in range(5)]
+        references += ["".join(rng.choices("AKG", k=rng.randint(2, 20))) for _ in range(5)]
+        for reference in references:
+            with self.subTest(reference=reference):
+                library = list(iter_mutation_scan(reference, INDEL_SPEC))
+                self.assertEqual(check_mutation_scan(reference, library, sample_size=None), [])
+
+    def test_check_mutation_scan(self):
+        library = list(iter_mutation_scan("PFKISIHL"))
+        wrong = library[0]._replace(variant=library[1].variant)
+        mismatches = check_mutation_scan("PFKISIHL", [wrong] + library, sample_size=None)
+        self.assertEqual(mismatches, [(wrong, [library[0].variant])])
+        self.assertEqual(check_mutation_scan("PFKISIHL", library, sample_size=10), [])
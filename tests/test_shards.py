@@ -0,0 +1,117 @@
+import os
+from tempfile import TemporaryDirectory
+
+from palamedes.align import make_aligner
+from palamedes.batch import generate_hgvs_variants_batch, iter_collapsed_hgvs_variants_batch
+from palamedes.config import MOLECULE_TYPE_PROTEIN
+from palamedes.models import ShardSpec
+from palamedes.shards import (
+    ShardManifestRecorder,
+    filter_shard,
+    make_settings_digest,
+    merge_shard_manifests,
+    parse_shard,
+    read_shard_manifest,
+    shard_of,
+    write_shard_manifest,
+)
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class ShardsTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.pairs = make_random_pairs(40, length=20)
+        self.settings_digest = make_settings_digest(MOLECULE_TYPE_PROTEIN, make_aligner(), False)
+
+    def record_shard(self, shard):
+        recorder = ShardManifestRecorder(shard, self.settings_digest)
+        for pair_result in generate_hgvs_variants_batch(self.pairs, executor_type="serial", shard=shard):
+            recorder.record(pair_result)
+
+        return recorder.manifest()
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/8"), ShardSpec(2, 8))
+        self.assertEqual(str(parse_shard(ShardSpec(1, 1))), "1/1")
+        for shard in ("0/4", "5/4", "1/0", "1", "a/4", "1/2/3", ""):
+            with self.subTest(shard=shard), self.assertRaisesRegex(ValueError, "Invalid shard"):
+                parse_shard(shard)
+
+    def test_shards_partition_pairs(self):
+        shard_pair_ids = [[pair.pair_id for pair in filter_shard(self.pairs, f"{number}/4")] for number in range(1, 5)]
+        self.assertEqual(sorted(sum(shard_pair_ids, [])), sorted(pair.pair_id for pair in self.pairs))
+        self.assertTrue(all(shard_pair_ids))
+        # stable across processes and runs, unlike the builtin hash
+        self.assertEqual(shard_of("pair-0", 4), shard_of("pair-0", 4))
+        self.assertEqual([shard_of(f"pair-{idx}", 1) for idx in range(10)], [1] * 10)
+
+    def test_batch_shard(self):
+        unsharded = {result.pair_id: result.variants for result in generate_hgvs_variants_batch(self.pairs)}
+        sharded = {}
+        for number in range(1, 4):
+            results = generate_hgvs_variants_batch(self.pairs, shard=ShardSpec(number, 3), max_workers=2)
+            self.assertTrue(all(shard_of(result.pair_id, 3) == number for result in results))
+            sharded.update((result.pair_id, result.variants) for result in results)
+
+        self.assertEqual(sharded, unsharded)
+
+        collapsed = list(iter_collapsed_hgvs_variants_batch(self.pairs + self.pairs, shard="1/3"))
+        self.assertEqual(
+            sorted(pair_id for result in collapsed for pair_id in result.pair_ids),
+            sorted(pair.pair_id for pair in self.pairs + self.pairs if shard_of(pair.pair_id, 3) == 1),
+        )
+
+    def test_merge_shard_manifests(self):
+        manifests = [self.record_shard(f"{number}/3") for number in range(1, 4)]
+        self.assertEqual(merge_shard_manifests(reversed(manifests)), self.record_shard("1/1"))
+        self.assertEqual(sum(manifest.pair_count for manifest in manifests), len(self.pairs))
+
+        with TemporaryDirectory() as tmp_dir:
+            paths = []
+            for manifest in manifests:
+                paths.append(os.path.join(tmp_dir, f"shard-{manifest.shard.replace('/', '-')}.json"))
+                write_shard_manifest(paths[-1], manifest)
+
+            self.assertEqual(read_shard_manifest(paths[0]), manifests[0])
+            self.assertEqual(merge_shard_manifests(paths), self.record_shard("1/1"))
+
+    def test_merge_shard_manifests_errors(self):
+        manifests = [self.record_shard(f"{number}/3") for number in range(1, 4)]
+        for invalid_manifests, message in (
+            ([], "No shard manifests"),
+            (manifests[:2], "each be present once"),
+            (manifests + [manifests[0]], "each be present once"),
+            (manifests[:2] + [self.record_shard("3/4")], "different totals"),
+            (manifests[:2] + [manifests[2]._replace(settings_digest="other")], "different settings_digest"),
+        ):
+            with self.subTest(message=message), self.assertRaisesRegex(ValueError, message):
+                merge_shard_manifests(invalid_manifests)
+
+    def test_settings_digest(self):
+        aligner = make_aligner()
+        aligner.mismatch_score = -2
+        self.assertNotEqual(make_settings_digest(MOLECULE_TYPE_PROTEIN, aligner, False), self.settings_digest)
+        self.assertNotEqual(make_settings_digest(MOLECULE_TYPE_PROTEIN, make_aligner(), True), self.settings_digest)
+
+    def test_cli_shard(self):
+        with TemporaryDirectory() as tmp_dir:
+            fasta_path = os.path.join(tmp_dir, "alts.fa")
+            with open(fasta_path, "w") as handle:
+                handle.write("".join(f">alt-{idx}\nPFKISIH{'LAG'[idx % 3]}\n" for idx in range(12)))
+
+            pair_ids = []
+            for number in (1, 2):
+                manifest_path = os.path.join(tmp_dir, f"shard-{number}.json")
+                argv = ["palamedes", "PFKISIHL", "--alt-fasta", fasta_path]
+                argv += ["--shard", f"{number}/2", "--shard-manifest", manifest_path]
+                pair_ids.extend(line.split("\t")[0] for line in self.run_cli(argv).splitlines())
+
+            merged = merge_shard_manifests([os.path.join(tmp_dir, f"shard-{number}.json") for number in (1, 2)])
+
+        self.assertEqual(sorted(pair_ids), sorted(f"alt-{idx}" for idx in range(12) if idx % 3))
+        self.assertEqual(merged.pair_count, 12)
+        self.assertEqual(merged.variant_count, 8)
+        self.assertEqual(merged.shard, "1/1")
+
+        with self.assertRaises(SystemExit):
+            self.run_cli(["palamedes", "PFKISIHL", "--alt-fasta", "alts.fa", "--shard", "3/2"])
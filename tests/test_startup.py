@@ -0,0 +1,56 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+HEAVY_MODULES = ("hgvs", "Bio", "numpy")
+
+CHECK_MODULES_CODE = f"""
+import sys
+print(",".join(module for module in {HEAVY_MODULES!r} if module in sys.modules))
+"""
+
+
+class StartupTestCase(TestCase):
+    def loaded_heavy_modules(self, code: str) -> list[str]:
+        result = subprocess.run(
+            [sys.executable, "-c", code + CHECK_MODULES_CODE], check=True, capture_output=True, text=True
+        )
+        return [module for module in result.stdout.splitlines()[-1].split(",") if module]
+
+    def test_import_palamedes_is_lazy(self):
+        self.assertEqual(self.loaded_heavy_modules("import palamedes"), [])
+
+    def test_import_variant_block_modules_is_lazy(self):
+        self.assertEqual(self.loaded_heavy_modules("import palamedes.align, palamedes.hgvs.utils"), [])
+
+    def test_cli_version_is_lazy(self):
+        code = """
+import sys
+from palamedes.__main__ import main
+sys.argv = ["palamedes", "--version"]
+try:
+    main()
+except SystemExit:
+    pass
+"""
+        self.assertEqual(self.loaded_heavy_modules(code), [])
+
+    def test_lazy_attributes(self):
+        import palamedes
+        from palamedes import config
+        from palamedes.align import generate_variant_blocks
+
+        self.assertIs(palamedes.generate_variant_blocks, generate_variant_blocks)
+        # constants which used to be imported into the package namespace
+        for name in (
+            "DEFAULT_MATCH_SCORE",
+            "DEFAULT_MISMATCH_SCORE",
+            "DEFAULT_OPEN_GAP_SCORE",
+            "DEFAULT_EXTEND_GAP_SCORE",
+            "REF_SEQUENCE_ID",
+            "ALT_SEQUENCE_ID",
+        ):
+            self.assertEqual(getattr(palamedes, name), getattr(config, name))
+
+        with self.assertRaises(AttributeError):
+            palamedes.not_a_real_attribute
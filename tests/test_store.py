@@ -0,0 +1,85 @@
+import os
+
+from palamedes import generate_alignment, generate_hgvs_variants_from_alignment
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.config import EXECUTOR_TYPE_SERIAL, EXECUTOR_TYPE_THREAD
+from palamedes.models import SequencePair
+from palamedes.store import AlignmentStore, AlignmentStoreWriter, iter_hgvs_variants_from_store, write_alignment_store
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class AlignmentStoreTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.path = os.path.join(self.make_tmp_dir(), "library.alignments")
+
+    def test_alignment_store_round_trip(self):
+        ref, alt = self.make_seq_records("PFKISIHL", "TPFKISIH")
+        alignment = generate_alignment(ref, alt)
+        with AlignmentStoreWriter(self.path) as writer:
+            writer.add("pair-1", alignment)
+
+        store = AlignmentStore(self.path)
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.pair_id(0), "pair-1")
+
+        rehydrated = store.alignment(0)
+        self.assertEqual(rehydrated[0], alignment[0])
+        self.assertEqual(rehydrated[1], alignment[1])
+        self.assertEqual(rehydrated.target.id, ref.id)
+        self.assertEqual(rehydrated.query.id, alt.id)
+        self.assertEqual(getattr(rehydrated, "score"), getattr(alignment, "score"))
+        self.assertEqual(
+            generate_hgvs_variants_from_alignment(rehydrated), generate_hgvs_variants_from_alignment(alignment)
+        )
+
+    def test_alignment_store_shares_references(self):
+        ref, alt = self.make_seq_records("PFKISIHL", "TPFKISIH")
+        other_ref, other_alt = self.make_seq_records("PFKISIHL", "PFKISIHA")
+        with AlignmentStoreWriter(self.path) as writer:
+            writer.add("pair-1", generate_alignment(ref, alt))
+            writer.add("pair-2", generate_alignment(other_ref, other_alt))
+
+        store = AlignmentStore(self.path)
+        self.assertEqual(store.metadata["reference_count"], 1)
+        self.assertIs(store.alignment(0).target, store.alignment(1).target)
+
+    def test_alignment_store_empty(self):
+        with AlignmentStoreWriter(self.path):
+            pass
+
+        self.assertEqual(list(AlignmentStore(self.path)), [])
+
+    def test_alignment_store_index_error(self):
+        with AlignmentStoreWriter(self.path):
+            pass
+
+        with self.assertRaisesRegex(IndexError, "out of range: 0"):
+            AlignmentStore(self.path).alignment(0)
+
+    def test_alignment_store_incomplete_error(self):
+        AlignmentStoreWriter(self.path)
+        with self.assertRaises(FileNotFoundError):
+            AlignmentStore(self.path)
+
+    def test_alignment_store_interrupted_error(self):
+        ref, alt = self.make_seq_records("PFKISIHL", "TPFKISIH")
+        with self.assertRaisesRegex(RuntimeError, "interrupted"), AlignmentStoreWriter(self.path) as writer:
+            writer.add("pair-1", generate_alignment(ref, alt))
+            raise RuntimeError("interrupted")
+
+        with self.assertRaises(FileNotFoundError):
+            AlignmentStore(self.path)
+
+    def test_iter_hgvs_variants_from_store(self):
+        pairs = make_random_pairs(20) + [SequencePair("identical", "PFKISIHL", "PFKISIHL")]
+        write_alignment_store(self.path, pairs, executor_type=EXECUTOR_TYPE_THREAD, chunk_size=4)
+
+        for use_non_standard_substitution_rules in (False, True):
+            self.assertEqual(
+                list(iter_hgvs_variants_from_store(self.path, use_non_standard_substitution_rules)),
+                generate_hgvs_variants_batch(
+                    pairs,
+                    use_non_standard_substitution_rules=use_non_standard_substitution_rules,
+                    executor_type=EXECUTOR_TYPE_SERIAL,
+                ),
+            )
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+from tempfile import TemporaryDirectory
+from unittest import skipUnless
+from unittest.mock import patch
+
+from palamedes import generate_variant_records
+from palamedes.align import generate_ungapped_variant_records
+from palamedes.batch import generate_hgvs_variants_batch
+from palamedes.config import PAIR_FAILURE_CRASH, PAIR_FAILURE_ERROR, PAIR_FAILURE_MEMORY, PAIR_FAILURE_TIMEOUT
+from palamedes.models import FallbackPairResult, PairFailure, PairResult, SequencePair
+from palamedes.supervisor import iter_hgvs_variants_supervised
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+# a low complexity pair slow enough to align (hundreds of millions of DP cells) to hit any short time limit
+SLOW_PAIR = SequencePair("slow", "A" * 20_000, "AC" * 10_000)
+
+
+def exit_on_slow_pair(reference, alternate, **kwargs):
+    if reference == SLOW_PAIR.reference:
+        os._exit(1)
+
+    return generate_variant_records(reference, alternate, **kwargs)
+
+
+class SupervisorTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.pairs = make_random_pairs(12)
+        self.expected = generate_hgvs_variants_batch(self.pairs, executor_type="serial")
+
+    def test_supervised_results(self):
+        self.assertEqual(list(iter_hgvs_variants_supervised(self.pairs, max_workers=2)), self.expected)
+
+        results = list(iter_hgvs_variants_supervised(self.pairs, max_workers=3, compact=True, timeout_seconds=60))
+        self.assertEqual(
+            [PairResult(result.pair_id, [record.to_hgvs() for record in result.variants]) for result in results],
+            self.expected,
+        )
+
+    def test_timeout(self):
+        pairs = self.pairs[:4] + [SLOW_PAIR] + self.pairs[4:]
+        results = list(iter_hgvs_variants_supervised(pairs, max_workers=2, timeout_seconds=0.5))
+        self.assertEqual(results[:4] + results[5:], self.expected)
+        self.assertEqual(results[4].pair_id, "slow")
+        self.assertEqual(results[4].reason, PAIR_FAILURE_TIMEOUT)
+
+    def test_timeout_fallback(self):
+        pairs = [SLOW_PAIR, self.pairs[0], SequencePair("slow-indel", SLOW_PAIR.reference, "C" + SLOW_PAIR.alternate)]
+        with self.assertLogs("palamedes.supervisor", level="DEBUG") as logs:
+            results = list(
+                iter_hgvs_variants_supervised(pairs, max_workers=2, timeout_seconds=0.5, fallback=True, compact=True)
+            )
+
+        # pairs of different lengths are not retried with the fallback, which only applies to equal lengths
+        self.assertFalse([line for line in logs.output if "Fallback failed" in line])
+        self.assertEqual(
+            results[0],
+            FallbackPairResult(
+                "slow",
+                generate_ungapped_variant_records(SLOW_PAIR.reference, SLOW_PAIR.alternate),
+                PairFailure("slow", PAIR_FAILURE_TIMEOUT, "Exceeded the time limit of 0.5s"),
+            ),
+        )
+        self.assertIsInstance(results[1], PairResult)
+        self.assertEqual([record.to_hgvs() for record in results[1].variants], self.expected[0].variants)
+        self.assertEqual(results[2], PairFailure("slow-indel", PAIR_FAILURE_TIMEOUT, "Exceeded the time limit of 0.5s"))
+
+    def test_error(self):
+        results = list(iter_hgvs_variants_supervised(self.pairs[:2], molecule_type="rna", max_workers=1))
+        self.assertEqual([result.reason for result in results], [PAIR_FAILURE_ERROR] * 2)
+
+    @skipUnless(os.path.exists("/proc/self/statm"), "needs /proc to measure the address space")
+    def test_memory_limit(self):
+        pairs = [self.pairs[0], SLOW_PAIR, self.pairs[1]]
+        results = list(iter_hgvs_variants_supervised(pairs, max_workers=1, memory_limit_bytes=256 * 1024**2))
+        self.assertEqual([results[0], results[2]], self.expected[:2])
+        self.assertEqual(results[1].reason, PAIR_FAILURE_MEMORY)
+
+    @skipUnless(os.path.exists("/proc/self/statm"), "needs /proc to measure the address space")
+    def test_small_memory_limit(self):
+        # the budget is on top of the address space of the worker, which alone is over 100 MB
+        results = list(iter_hgvs_variants_supervised(self.pairs, max_workers=1, memory_limit_bytes=20 * 1024**2))
+        self.assertEqual(results, self.expected)
+
+    @skipUnless(multiprocessing.get_start_method() == "fork", "workers must inherit the patch")
+    def test_crash(self):
+        pairs = self.pairs[:3] + [SLOW_PAIR] + self.pairs[3:]
+        with patch("palamedes.supervisor.generate_variant_records", side_effect=exit_on_slow_pair):
+            results = list(iter_hgvs_variants_supervised(pairs, max_workers=2))
+
+        self.assertEqual(results[:3] + results[4:], self.expected)
+        self.assertEqual(results[3], PairFailure("slow", PAIR_FAILURE_CRASH, "Worker exited with code 1"))
+
+    def test_generate_ungapped_variant_records(self):
+        self.assertEqual(
+            generate_ungapped_variant_records("PFKISIHL", "PFRISIHA"),
+            generate_variant_records("PFKISIHL", "PFRISIHA"),
+        )
+        with self.assertRaisesRegex(ValueError, "same length"):
+            generate_ungapped_variant_records("PFKISIHL", "PFKISIH")
+
+    def test_cli_pair_timeout(self):
+        with TemporaryDirectory() as tmp_dir:
+            fasta_path = os.path.join(tmp_dir, "alts.fa")
+            with open(fasta_path, "w") as handle:
+                handle.write(f">alt-1\nPFKISIHA\n>slow\n{'AC' * 10_000}\n>alt-2\nTPFKISIH\n")
+
+            failed_pairs_path = os.path.join(tmp_dir, "failed.tsv")
+            argv = ["palamedes", "A" * 20_000, "--alt-fasta", fasta_path, "--pair-timeout", "0.5"]
+            argv += ["--failed-pairs", failed_pairs_path, "--workers", "2"]
+            stdout = self.run_cli(argv)
+            with open(failed_pairs_path) as handle:
+                failed_pairs = handle.read()
+
+        self.assertEqual(failed_pairs, "slow\ttimeout\tExceeded the time limit of 0.5s\n")
+        self.assertEqual({line.split("\t")[0] for line in stdout.splitlines()}, {"alt-1", "alt-2"})
+
+        # supervised pairs always run in dedicated worker processes, one at a time
+        for extra_args in (["--deduplicate"], ["--executor", "thread"], ["--schedule-by-cost"]):
+            with self.subTest(extra_args=extra_args):
+                argv = ["palamedes", "PFKISIHL", "--alt-fasta", "alts.fa", "--pair-timeout", "1", *extra_args]
+                with self.assertRaises(SystemExit):
+                    self.run_cli(argv)
+
+    def test_cli_fallback(self):
+        with TemporaryDirectory() as tmp_dir:
+            fasta_path = os.path.join(tmp_dir, "alts.fa")
+            with open(fasta_path, "w") as handle:
+                handle.write(f">alt-1\nPFKISIHA\n>slow\n{SLOW_PAIR.alternate}\n")
+
+            failed_pairs_path = os.path.join(tmp_dir, "failed.tsv")
+            argv = ["palamedes", SLOW_PAIR.reference, "--alt-fasta", fasta_path, "--pair-timeout", "0.5"]
+            argv += ["--fallback", "--failed-pairs", failed_pairs_path, "--workers", "2"]
+            stdout = self.run_cli(argv)
+            with open(failed_pairs_path) as handle:
+                failed_pairs = handle.read()
+
+        self.assertEqual(failed_pairs, "slow\tfallback\ttimeout: Exceeded the time limit of 0.5s\n")
+        self.assertIn("slow", {line.split("\t")[0] for line in stdout.splitlines()})
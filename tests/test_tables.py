@@ -0,0 +1,76 @@
+import pickle
+
+from palamedes import generate_alignment
+from palamedes.align import generate_seq_record, generate_variant_blocks
+from palamedes.config import (
+    ALT_SEQUENCE_ID,
+    REF_SEQUENCE_ID,
+    VARIANT_BASE_DELETION,
+    VARIANT_BASE_INSERTION,
+    VARIANT_BASE_MISMATCH,
+)
+from palamedes.models import Block, VariantBlock
+from palamedes.tables import MISSING_VALUE, VariantBlockTable
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+
+class VariantBlockTableTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.variant_blocks_per_pair = [
+            [
+                VariantBlock(Block(1, 2, VARIANT_BASE_DELETION), [Block(1, 2, "T")], []),
+                VariantBlock(
+                    Block(3, 6, VARIANT_BASE_MISMATCH + VARIANT_BASE_INSERTION * 2),
+                    [Block(3, 4, "T")],
+                    [Block(2, 5, "GAA")],
+                ),
+            ],
+            [],
+            [VariantBlock(Block(0, 1, VARIANT_BASE_INSERTION), [], [Block(0, 1, "M")])],
+        ]
+        self.table = VariantBlockTable.from_variant_blocks(self.variant_blocks_per_pair)
+
+    def test_variant_block_table_columns(self):
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(self.table.pair_index.tolist(), [0, 0, 2])
+        self.assertEqual(self.table.reference_start.tolist(), [1, 3, MISSING_VALUE])
+        self.assertEqual(self.table.alternate_end.tolist(), [MISSING_VALUE, 5, 1])
+        self.assertEqual(self.table.category.tolist(), [MISSING_VALUE] * 3)
+        self.assertEqual(self.table.bases, "dT" + "miiTGAA" + "iM")
+        self.assertEqual(self.table.bases_offsets.tolist(), [0, 2, 9, 11])
+
+    def test_variant_block_table_row_views(self):
+        self.assertEqual(self.table[1], self.variant_blocks_per_pair[0][1])
+        self.assertEqual(self.table[-1], self.variant_blocks_per_pair[2][0])
+        self.assertEqual(list(self.table), [block for blocks in self.variant_blocks_per_pair for block in blocks])
+        for pair_index, variant_blocks in enumerate(self.variant_blocks_per_pair):
+            self.assertEqual(self.table.variant_blocks(pair_index), variant_blocks)
+
+        with self.assertRaisesRegex(IndexError, "out of range"):
+            self.table[3]
+
+    def test_variant_block_table_concatenate(self):
+        other = VariantBlockTable.from_variant_blocks(self.variant_blocks_per_pair)
+        other.pair_index += 3
+        table = VariantBlockTable.concatenate([self.table, other])
+
+        self.assertEqual(len(table), 6)
+        self.assertEqual(table.variant_blocks(5), self.variant_blocks_per_pair[2])
+        self.assertEqual(list(table)[3:], list(self.table))
+        self.assertEqual(len(VariantBlockTable.concatenate([])), 0)
+
+    def test_variant_block_table_pickle(self):
+        table = pickle.loads(pickle.dumps(self.table))
+        self.assertEqual(list(table), list(self.table))
+
+    def test_variant_block_table_matches_generate_variant_blocks(self):
+        alignments = [
+            generate_alignment(
+                generate_seq_record(pair.reference, REF_SEQUENCE_ID),
+                generate_seq_record(pair.alternate, ALT_SEQUENCE_ID),
+            )
+            for pair in make_random_pairs(30)
+        ]
+        table = VariantBlockTable.from_variant_blocks(generate_variant_blocks(alignment) for alignment in alignments)
+        for pair_index, alignment in enumerate(alignments):
+            self.assertEqual(table.variant_blocks(pair_index), generate_variant_blocks(alignment))
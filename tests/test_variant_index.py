@@ -0,0 +1,84 @@
+import os
+import sqlite3
+
+from palamedes import generate_variant_records
+from palamedes.config import EXECUTOR_TYPE_SERIAL
+from palamedes.models import IndexedVariant, SequencePair
+from palamedes.variant_index import VariantIndex, write_variant_index
+from tests.base import PalamedesBaseCase, make_random_pairs
+
+PAIRS = [
+    SequencePair("a", "PFKISIHL", "PFKISIHA"),
+    SequencePair("b", "PFKISIHL", "TPFKISIH"),
+    SequencePair("c", "PFKISIHL", "PFKISIHA"),
+    SequencePair("d", "PFKISIHL", "PFRISIHL"),
+    SequencePair("e", "PFKISIHL", "PFKISIHL"),
+    SequencePair("f", "PFKISIHL", "PFKIGSIHL"),
+]
+
+
+class VariantIndexTestCase(PalamedesBaseCase):
+    def setUp(self):
+        self.tmp_dir = self.make_tmp_dir()
+        self.path = os.path.join(self.tmp_dir, "variants.sqlite")
+
+    def test_sample_ids(self):
+        write_variant_index(self.path, PAIRS, executor_type=EXECUTOR_TYPE_SERIAL)
+        with VariantIndex(self.path) as index:
+            self.assertEqual(index.sample_ids("ref:p.Leu8Ala"), ["a", "c"])
+            self.assertEqual(index.sample_ids(generate_variant_records("PFKISIHL", "PFRISIHL")[0]), ["d"])
+            self.assertEqual(index.sample_ids("ref:p.Leu8Trp"), [])
+
+    def test_region(self):
+        write_variant_index(self.path, PAIRS, executor_type=EXECUTOR_TYPE_SERIAL)
+        with VariantIndex(self.path) as index:
+            self.assertEqual(
+                list(index.iter_region("ref", 3, 4)),
+                [
+                    IndexedVariant("ref", 3, 3, "substitution", "ref:p.Lys3Arg", ["d"]),
+                    IndexedVariant("ref", 4, 5, "insertion", "ref:p.Ile4_Ser5insGly", ["f"]),
+                ],
+            )
+            self.assertEqual(index.region_sample_ids("ref", 5, 8), ["a", "b", "c", "f"])
+            self.assertEqual(index.region_sample_ids("ref", 5, 8, hgvs_type="deletion"), ["b"])
+            self.assertEqual(index.region_sample_ids("other", 1, 8), [])
+
+    def test_region_matches_scan(self):
+        pairs = make_random_pairs(40, length=30)
+        write_variant_index(self.path, pairs, max_workers=2)
+        records = {pair.pair_id: generate_variant_records(pair.reference, pair.alternate) for pair in pairs}
+        with VariantIndex(self.path) as index:
+            for start, end in [(1, 1), (5, 9), (20, 40), (31, 31)]:
+                expected = [
+                    pair.pair_id
+                    for pair in pairs
+                    if any(record.start <= end and record.end >= start for record in records[pair.pair_id])
+                ]
+                self.assertEqual(index.region_sample_ids("ref", start, end), expected)
+
+    def test_extend(self):
+        write_variant_index(self.path, PAIRS[:3], executor_type=EXECUTOR_TYPE_SERIAL)
+        # the overlapping samples are only indexed once
+        write_variant_index(self.path, PAIRS[2:], executor_type=EXECUTOR_TYPE_SERIAL)
+        with VariantIndex(self.path) as index:
+            self.assertEqual(index.sample_ids("ref:p.Leu8Ala"), ["a", "c"])
+            self.assertEqual(index.sample_ids("ref:p.Lys3Arg"), ["d"])
+
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE metadata SET value = '0' WHERE key = 'format_version'")
+
+        with self.assertRaisesRegex(ValueError, "Unsupported variant index format version"):
+            VariantIndex(self.path)
+
+    def test_cli_variant_index(self):
+        fasta_path = os.path.join(self.tmp_dir, "alts.fa")
+        with open(fasta_path, "w") as handle:
+            handle.write("".join(f">{pair.pair_id}\n{pair.alternate}\n" for pair in PAIRS))
+
+        argv = ["palamedes", "PFKISIHL", "--alt-fasta", fasta_path, "--variant-index", self.path]
+        self.assertIn("a\tref:p.Leu8Ala\n", self.run_cli(argv))
+        with VariantIndex(self.path) as index:
+            self.assertEqual(index.sample_ids("ref:p.Leu8Ala"), ["a", "c"])
+
+        with self.assertRaises(SystemExit):
+            self.run_cli(argv + ["--checkpoint-dir", self.tmp_dir, "--resume"])